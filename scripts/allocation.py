@@ -0,0 +1,246 @@
+import math
+import random
+import time
+
+from scripts.simulation import MAX_REWARDS_AVAILABLE, REWARD_INTERVAL, adjust_difficulty
+
+# Splitting a fixed hashrate between the four seasons.
+#
+# _getNewChallengeNumber mixes TOKEN_IDENTIFIER into every challenge, so a
+# hash only counts for one token. The difficulty adjustment holds each
+# season at about one mint per EQUILIBRIUM_INTERVAL whatever hashpower it
+# attracts, so a miner with hashrate h_s on a season that others mine with
+# N_s wins a fraction h_s / (h_s + N_s) of a fixed flow of value E_s. The
+# expected value sum(E_s * h_s / (h_s + N_s)) is concave in the h_s, and
+# with sum(h_s) = H it is maximized where every season mined has the same
+# marginal value E_s * N_s / (h_s + N_s)**2 = lambda, that is by water-filling
+#
+#     h_s = max(0, sqrt(E_s * N_s / lambda) - N_s)
+#
+# E_s is the price of the token times its single reward times the expected
+# number of rewards per mint. A solution earns floor(1/u) rewards for u
+# uniform in (0, 1], so with a rewards available the expected number given
+# is the harmonic number 1 + 1/2 + ... + 1/a. N_s is the hashrate of the
+# other miners, by default what the season's target implies in equilibrium
+# less our own share.
+
+
+EQUILIBRIUM_INTERVAL = REWARD_INTERVAL * 61 / 88 / math.log(2)
+MINIMUM_HASHRATE = 1.   # others are never taken to mine with less, which would leave lambda undefined
+
+_HARMONIC = [0.]
+for _k in range(1, MAX_REWARDS_AVAILABLE + 1):
+    _HARMONIC.append(_HARMONIC[-1] + 1 / _k)
+
+
+def expected_rewards_per_mint(available):
+    """Expected min(floor(1/u), available) for u uniform in (0, 1]."""
+
+    return _HARMONIC[int(min(max(available, 0), MAX_REWARDS_AVAILABLE))]
+
+
+def water_fill(values, others, hashrate):
+    """
+    The split of `hashrate` maximizing sum(values[s] * h[s] / (h[s] + others[s])),
+    as a list in the order of the seasons.
+    """
+
+    order = sorted((s for s in range(len(values)) if values[s] > 0),
+                   key=lambda s: values[s] / others[s], reverse=True)
+    allocation = [0.] * len(values)
+    roots, total_others, scale, active = 0., 0., 0., 0
+    for s in order:
+        root = math.sqrt(values[s] * others[s])
+        candidate_scale = (hashrate + total_others + others[s]) / (roots + root)
+        if root * candidate_scale <= others[s]:
+            break
+        roots += root
+        total_others += others[s]
+        scale = candidate_scale
+        active += 1
+    for s in order[:active]:
+        allocation[s] = max(math.sqrt(values[s] * others[s]) * scale - others[s], 0.)
+    return allocation
+
+
+class _Season:
+
+    def __init__(self, target, last_reward_time, max_number_of_rewards, reward, price, others):
+        self.target = target
+        self.last_reward_time = last_reward_time
+        self.max_number_of_rewards = max_number_of_rewards
+        self.reward = reward
+        self.price = price
+        self.others = others
+
+
+class AllocationOptimizer:
+    """
+    Plans the split of `hashrate` (hashes per second) between seasons.
+
+    prices maps each season's name to the value of one token wei. Add the
+    seasons with set_state, then call on_mint for every Mint event; each
+    mint changes the state of one season only, which is updated in place
+    before the split is solved again.
+    """
+
+    def __init__(self, hashrate, prices):
+        self.hashrate = hashrate
+        self.prices = dict(prices)
+        self.seasons = {}
+        self.allocation = {}
+
+    @classmethod
+    def from_token_states(cls, hashrate, prices, states):
+        """From the {name: TokenState} read by scripts/rpc.py."""
+
+        optimizer = cls(hashrate, prices)
+        for name, state in states.items():
+            optimizer.set_state(name, state.miningTarget, state.lastRewardBlockTime,
+                                state.maxNumberOfRewardsPerMint, state.miningReward)
+        return optimizer
+
+    def set_state(self, name, target, last_reward_time, max_number_of_rewards, reward, others=None):
+        """
+        The mining state of a season. others is the hashrate of the other
+        miners; by default it follows from the target.
+        """
+
+        self.seasons[name] = _Season(target, last_reward_time, max_number_of_rewards, reward,
+                                     self.prices[name], others)
+        self.allocation.setdefault(name, 0.)
+
+    def set_others(self, name, hashrate):
+        """Use an estimate of the other miners' hashrate, e.g. from scripts/hashrate.py."""
+
+        self.seasons[name].others = hashrate
+
+    def on_mint(self, name, timestamp, rewards, reward=None):
+        """
+        Apply a mint of `rewards` rewards at `timestamp` to the season's state.
+        reward is the new single reward, needed only when it halves.
+        """
+
+        season = self.seasons[name]
+        season.target = adjust_difficulty(season.target, season.last_reward_time, rewards, timestamp)
+        season.last_reward_time = timestamp
+        season.max_number_of_rewards = rewards
+        if reward is not None:
+            season.reward = reward
+
+    def others(self, name):
+        season = self.seasons[name]
+        if season.others is not None:
+            return max(season.others, MINIMUM_HASHRATE)
+        implied = 2**256 / (season.target * EQUILIBRIUM_INTERVAL)
+        return max(implied - self.allocation[name], MINIMUM_HASHRATE)
+
+    def value(self, name, now):
+        """E_s: the value won per second by mining the whole season, at the next mint."""
+
+        season = self.seasons[name]
+        total = self.others(name) + self.allocation[name]
+        next_mint = now + 2**256 / (season.target * total)
+        available = max((next_mint - season.last_reward_time) // REWARD_INTERVAL,
+                        season.max_number_of_rewards)
+        return season.price * season.reward * expected_rewards_per_mint(available) / EQUILIBRIUM_INTERVAL
+
+    def plan(self, now):
+        """The expected-value maximizing {name: hashrate} at time `now`."""
+
+        names = list(self.seasons)
+        split = water_fill([self.value(name, now) for name in names], [self.others(name) for name in names],
+                           self.hashrate)
+        self.allocation = dict(zip(names, split))
+        return self.allocation
+
+    def expected_value(self, allocation, now):
+        """Value per second expected from an allocation, in the units of the prices."""
+
+        return sum(self.value(name, now) * h / (h + self.others(name)) for name, h in allocation.items())
+
+
+# policies for the simulation: (optimizer, now) -> {name: hashrate}
+
+def optimal_split(optimizer, now):
+    return optimizer.plan(now)
+
+
+def equal_split(optimizer, now):
+    return {name: optimizer.hashrate / len(optimizer.seasons) for name in optimizer.seasons}
+
+
+def best_season(optimizer, now):
+    """Everything on the season paying most per hash when we start mining it."""
+
+    best = max(optimizer.seasons, key=lambda name: optimizer.value(name, now) / optimizer.others(name))
+    return {name: optimizer.hashrate if name == best else 0. for name in optimizer.seasons}
+
+
+class AllocationResult:
+
+    def __init__(self, duration, mints, won, value, elapsed):
+        self.duration = duration
+        self.mints = mints
+        self.won = won
+        self.value = value
+        self.elapsed = elapsed
+
+    @property
+    def value_per_second(self):
+        return self.value / self.duration
+
+    @property
+    def mints_per_second(self):
+        return self.mints / self.elapsed
+
+
+def simulate_allocation(policy, seasons, others, hashrate, prices, mints=100000, seed=None):
+    """
+    Mine the four seasons side by side, `seasons` as from scripts/seasons.py,
+    each also mined by others[s] hashes per second. Our hashrate is split by
+    `policy`, re-planned after every mint. Every solution is submitted at
+    once.
+    """
+
+    rng = random.Random(seed)
+    names = [season.SYMBOL for season in seasons]
+    models = [season.model(0) for season in seasons]
+    optimizer = AllocationOptimizer(hashrate, dict(zip(names, prices)))
+    for name, model, other in zip(names, models, others):
+        # start in equilibrium with our share equal
+        target = int(2**256 / ((other + hashrate / len(names)) * EQUILIBRIUM_INTERVAL))
+        optimizer.set_state(name, target, 0., 1, model.get_mining_reward_at(0), other)
+
+    now, won, value = 0., [0] * len(names), 0.
+    started = time.perf_counter()
+    allocation = policy(optimizer, now)
+    for _ in range(mints):
+        states = [optimizer.seasons[name] for name in names]
+        rates = [(others[s] + allocation[name]) * states[s].target / 2**256 for s, name in enumerate(names)]
+        # the next solution over all seasons; the others restart without memory
+        now += rng.expovariate(sum(rates))
+        s = rng.choices(range(len(names)), rates)[0]
+        state = states[s]
+        available = min(max(int((now - state.last_reward_time) // REWARD_INTERVAL),
+                            state.max_number_of_rewards), MAX_REWARDS_AVAILABLE)
+        rewards = min(int(1 / (1 - rng.random())), available)
+        if rng.random() * (others[s] + allocation[names[s]]) < allocation[names[s]]:
+            won[s] += 1
+            value += prices[s] * state.reward * rewards
+        optimizer.on_mint(names[s], now, rewards, models[s].get_mining_reward_at(now))
+        allocation = policy(optimizer, now)
+    elapsed = time.perf_counter() - started
+    return AllocationResult(now, mints, dict(zip(names, won)), value, elapsed)
+
+
+def main():
+    from scripts.seasons import load_seasons
+
+    seasons = load_seasons()
+    others = [8e9, 4e9, 2e9, 1e9]
+    prices = [1., 1.2, 1.5, 2.]
+    for policy in (optimal_split, equal_split, best_season):
+        result = simulate_allocation(policy, seasons, others, 5e9, prices, seed=0)
+        print("%-14s %.4g per second  %6.0f mints per second  won %s"
+              % (policy.__name__, result.value_per_second / 10**18, result.mints_per_second, result.won))
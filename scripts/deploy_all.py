@@ -0,0 +1,109 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from brownie import AutumnToken, SpringToken, SummerToken, WinterToken, accounts, chain, network, web3
+from web3.exceptions import TransactionNotFound
+
+# Deploys all four seasonal tokens at once.
+#
+# The deployments are sent back to back with consecutive nonces and without
+# waiting, and their confirmations are then awaited in parallel. The manifest
+# records each transaction as soon as it is sent and its address and gas once
+# confirmed, so a re-run skips the contracts that are deployed, waits for the
+# ones still pending and only sends the rest.
+
+
+SEASON_CONTRACTS = (SpringToken, SummerToken, AutumnToken, WinterToken)
+DEPLOYMENTS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     "deployments")
+
+
+def manifest_path(directory=DEPLOYMENTS_DIRECTORY):
+    return os.path.join(directory, "%s.json" % network.show_active())
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"network": network.show_active(), "chain_id": chain.id, "contracts": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["chain_id"] != chain.id:
+        raise ValueError("%s is for chain %d, connected to chain %d" % (path, manifest["chain_id"], chain.id))
+    return manifest
+
+
+def save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+
+def _is_deployed(entry):
+    return entry.get("address") is not None and len(web3.eth.get_code(entry["address"])) > 0
+
+
+def _confirm(entry, transaction, required_confs):
+    transaction.wait(required_confs)
+    if transaction.status != 1:
+        return dict(entry, status="failed")
+    return dict(entry, status="deployed", address=transaction.contract_address,
+                block=transaction.block_number, gas_used=transaction.gas_used)
+
+
+def deploy_all(account, path=None, required_confs=1, contracts=SEASON_CONTRACTS):
+    """
+    Deploy every contract in `contracts` that the manifest at `path` doesn't
+    already show as deployed, and return the manifest.
+    """
+
+    path = path or manifest_path()
+    manifest = load_manifest(path)
+    entries = manifest["contracts"]
+
+    pending = {}
+    for contract in contracts:
+        entry = entries.get(contract._name)
+        if entry is None:
+            continue
+        if entry["status"] == "deployed" and _is_deployed(entry):
+            continue
+        if entry["status"] == "pending":
+            try:
+                web3.eth.get_transaction(entry["transaction"])
+                pending[contract._name] = chain.get_transaction(entry["transaction"])
+                continue
+            except TransactionNotFound:
+                pass    # dropped by the node, send it again
+        del entries[contract._name]
+
+    # count transactions still pending so that none of them is replaced
+    nonce = web3.eth.get_transaction_count(account.address, "pending")
+    for contract in contracts:
+        if contract._name in entries:
+            continue
+        transaction = contract.deploy({'from': account, 'nonce': nonce, 'required_confs': 0})
+        entries[contract._name] = {"status": "pending", "transaction": transaction.txid,
+                                   "deployer": account.address, "nonce": nonce}
+        pending[contract._name] = transaction
+        nonce += 1
+        save_manifest(manifest, path)
+
+    if pending:
+        with ThreadPoolExecutor(len(pending)) as executor:
+            confirmed = executor.map(_confirm, [entries[name] for name in pending], pending.values(),
+                                     [required_confs] * len(pending))
+            entries.update(zip(pending, confirmed))
+        save_manifest(manifest, path)
+    return manifest
+
+
+def main():
+    acct = accounts.load('deployment')
+    path = manifest_path()
+    manifest = deploy_all(acct, path)
+    for name, entry in manifest["contracts"].items():
+        print("%-12s %-10s %s gas %s" % (name, entry["status"], entry.get("address"), entry.get("gas_used")))
+    print("Manifest written to %s" % path)
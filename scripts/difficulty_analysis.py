@@ -0,0 +1,270 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+
+import numpy as np
+
+from scripts.simulation import MAXIMUM_TARGET, MINIMUM_TARGET, REWARD_INTERVAL, YEAR, DifficultySimulation
+
+# Response of _adjustDifficulty to changing hashpower.
+#
+# Every scenario is a hashpower profile with oscillations, a step or an
+# exponential ramp. The simulated chains give the bias and variance of the
+# interval between rewards; the time to settle after a shock comes from the
+# noise-free mean-field response in mean_field_response.
+
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+BASE_HASHPOWER = 1e8
+CHAINS_PER_TASK = 256
+
+# the controller aims for a median interval of 600 * 61/88 seconds
+EQUILIBRIUM_INTERVAL = REWARD_INTERVAL * 61 / 88 / math.log(2)
+THRESHOLD_INTERVAL = REWARD_INTERVAL * 61 / 88
+
+
+class Scenarios:
+    """Parameters of a list of hashpower profiles, one array entry per scenario."""
+
+    FIELDS = ("period", "amplitude", "factor", "rate", "shock_time")
+
+    def __init__(self, kind, period=np.inf, amplitude=0., factor=1., rate=0., shock_time=np.inf):
+        self.kind = np.atleast_1d(np.asarray(kind))
+        n = len(self.kind)
+        for name, value in zip(self.FIELDS, (period, amplitude, factor, rate, shock_time)):
+            setattr(self, name, np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy())
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __add__(self, other):
+        return Scenarios(np.concatenate([self.kind, other.kind]),
+                         *(np.concatenate([getattr(self, name), getattr(other, name)])
+                           for name in self.FIELDS))
+
+    def take(self, index):
+        return Scenarios(self.kind[index], *(getattr(self, name)[index] for name in self.FIELDS))
+
+    def describe(self, i):
+        if self.kind[i] == "oscillation":
+            return "period %9.1f h, amplitude %.2f" % (self.period[i] / HOUR, self.amplitude[i])
+        if self.kind[i] == "step":
+            return "step x%g at day %g" % (self.factor[i], self.shock_time[i] / DAY)
+        if self.kind[i] == "ramp":
+            return "ramp, %s every %g days" % ("doubling" if self.rate[i] > 0 else "halving",
+                                               math.log(2) / abs(self.rate[i]) / DAY)
+        return str(self.kind[i])
+
+
+def oscillations(periods, amplitudes):
+    period, amplitude = np.meshgrid(periods, amplitudes, indexing="ij")
+    return Scenarios(["oscillation"] * period.size, period=period.ravel(), amplitude=amplitude.ravel())
+
+
+def steps(factors, shock_time=30 * DAY):
+    return Scenarios(["step"] * len(factors), factor=factors, shock_time=shock_time)
+
+
+def ramps(doubling_times, start=30 * DAY):
+    return Scenarios(["ramp"] * len(doubling_times), rate=math.log(2) / np.asarray(doubling_times),
+                     shock_time=start)
+
+
+class HashpowerProfile:
+    """The hashpower of each chain at its current time; picklable for the process pool."""
+
+    def __init__(self, scenarios, base=BASE_HASHPOWER):
+        self.scenarios = scenarios
+        self.base = base
+
+    def __call__(self, times):
+        s = self.scenarios
+        oscillation = 1 + s.amplitude * np.sin(2 * np.pi * times / s.period)
+        after = times >= s.shock_time
+        elapsed = np.where(after, times - s.shock_time, 0.)
+        shock = np.where(after, s.factor * np.exp(s.rate * elapsed), 1.)
+        return self.base * oscillation * shock
+
+
+class MeanFieldResponse:
+    """
+    The noise-free response of each scenario; every array has one entry per
+    scenario.
+
+    perturbed is whether the expected interval left the band after the shock,
+    settling_time the time from leaving it until first back inside, NaN when
+    it never left or never came back. log_targets holds log(target) at each
+    of the sample times.
+    """
+
+    def __init__(self, perturbed, settling_time, log_targets):
+        self.perturbed = perturbed
+        self.settling_time = settling_time
+        self.log_targets = log_targets
+
+
+def mean_field_response(scenarios, time_limit=YEAR / 2, tolerance=0.1, base=BASE_HASHPOWER,
+                        sample_times=()):
+    """
+    Follow the mean target of every scenario from the equilibrium target for
+    the base hashpower, with one step per expected interval E.
+
+    In equilibrium the simulated target wanders in 1% steps with a spread of
+    about 9%, and leaves a 10% band a fifth of the time whatever the scenario,
+    so settling is measured without the noise: each mint multiplies the
+    target by 99/100 with the probability p = 1 - exp(-600 * 61/88 / E) that
+    the interval is shorter than the controller's threshold, and by 100/99
+    otherwise, so log(target) moves by p * log(99/100) + (1 - p) * log(100/99)
+    per mint. The tests check this against the mean of the simulated chains.
+    """
+
+    profile = HashpowerProfile(scenarios, base)
+    n = len(scenarios)
+    sample_times = np.asarray(sample_times, dtype=np.float64)
+    log_targets = np.full((n, len(sample_times)), np.nan)
+    log_target = np.full(n, math.log(2**256 / (base * EQUILIBRIUM_INTERVAL)))
+    log_limits = math.log(MINIMUM_TARGET), math.log(MAXIMUM_TARGET)
+    time = np.zeros(n)
+    exited = np.full(n, np.nan)
+    settled = np.full(n, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        active = np.ones(n, dtype=bool)
+        while active.any():
+            expected = 2.0**256 / (profile(time) * np.exp(log_target))
+            shorter = -np.expm1(-THRESHOLD_INTERVAL / expected)
+            drift = shorter * math.log(99 / 100) + (1 - shorter) * math.log(100 / 99)
+            log_target = np.where(active, np.clip(log_target + drift, *log_limits), log_target)
+            previous_time, time = time, np.where(active, time + expected, time)
+
+            for k, sample_time in enumerate(sample_times):
+                crossed = (previous_time < sample_time) & (time >= sample_time)
+                log_targets[crossed, k] = log_target[crossed]
+
+            expected = 2.0**256 / (profile(time) * np.exp(log_target))
+            after_shock = active & (time >= scenarios.shock_time)
+            outside = np.abs(expected / EQUILIBRIUM_INTERVAL - 1) >= tolerance
+            newly_exited = np.isnan(exited) & after_shock & outside
+            exited[newly_exited] = time[newly_exited]
+            newly_settled = np.isnan(settled) & ~np.isnan(exited) & after_shock & ~outside
+            settled[newly_settled] = (time - exited)[newly_settled]
+            active = time < time_limit
+
+    return MeanFieldResponse(~np.isnan(exited), settled, log_targets)
+
+
+class AnalysisResult:
+    """
+    Per scenario statistics of the simulated chains, and the mean-field
+    response. log_targets holds the log(target) of every replicate at the
+    sample times, as (scenario, replicate, sample).
+    """
+
+    def __init__(self, scenarios, mean_interval, variance, sample_times, log_targets, mean_field):
+        self.scenarios = scenarios
+        self.mean_interval = mean_interval
+        self.variance = variance
+        self.sample_times = sample_times
+        self.log_targets = log_targets
+        self.mean_field = mean_field
+
+    @property
+    def bias(self):
+        return self.mean_interval - REWARD_INTERVAL
+
+    @property
+    def mean_log_target(self):
+        """The mean over replicates of log(target) at the sample times."""
+
+        return self.log_targets.mean(axis=1)
+
+    def rows(self):
+        for i in range(len(self.scenarios)):
+            yield (self.scenarios.describe(i), self.mean_interval[i], self.bias[i], self.variance[i],
+                   self.mean_field.settling_time[i], self.mean_field.perturbed[i])
+
+
+def _run_task(arguments):
+    scenarios, base, time_limit, warmup, sample_times, seed = arguments
+    profile = HashpowerProfile(scenarios, base)
+    n = len(scenarios)
+    simulation = DifficultySimulation(int(2**256 / (base * EQUILIBRIUM_INTERVAL)), n, seed=seed)
+
+    count = np.zeros(n)
+    total = np.zeros(n)
+    total_squares = np.zeros(n)
+    log_targets = np.full((n, len(sample_times)), np.nan)
+
+    # chains past time_limit keep being stepped until all are done, and a
+    # decaying ramp can take their hashpower to zero
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        active = simulation.time < time_limit
+        while active.any():
+            previous_time = simulation.time
+            intervals = simulation.step(profile)
+            measured = active & (simulation.time > warmup)
+            count += measured
+            total += np.where(measured, intervals, 0.)
+            total_squares += np.where(measured, intervals**2, 0.)
+            for k, sample_time in enumerate(sample_times):
+                crossed = (previous_time < sample_time) & (simulation.time >= sample_time)
+                if crossed.any():
+                    log_targets[crossed, k] = np.log(simulation.target_as_float()[crossed])
+            active = simulation.time < time_limit
+
+    return count, total, total_squares, log_targets
+
+
+def analyze(scenarios, replicates=4, time_limit=YEAR / 2, warmup=7 * DAY, tolerance=0.1,
+            base=BASE_HASHPOWER, seed=0, processes=None, chains_per_task=CHAINS_PER_TASK,
+            sample_times=()):
+    """
+    Simulate every scenario `replicates` times from the equilibrium target for
+    the base hashpower. Intervals ending before `warmup` are not counted, and
+    log(target) is recorded at each of the sample times. Results are the same
+    for a given seed whatever the number of processes.
+    """
+
+    sample_times = np.asarray(sample_times, dtype=np.float64)
+    chains = scenarios.take(np.repeat(np.arange(len(scenarios)), replicates))
+    starts = range(0, len(chains), chains_per_task)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [(chains.take(slice(start, start + chains_per_task)), base, time_limit, warmup,
+              sample_times, task_seed)
+             for start, task_seed in zip(starts, seeds)]
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes == 1:
+        results = [_run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_run_task, tasks))
+
+    count, total, total_squares = (np.concatenate(column).reshape(len(scenarios), replicates)
+                                   for column in list(zip(*results))[:3])
+    log_targets = np.concatenate([result[3] for result in results]).reshape(
+        len(scenarios), replicates, len(sample_times))
+    mean_interval = total.sum(axis=1) / count.sum(axis=1)
+    variance = total_squares.sum(axis=1) / count.sum(axis=1) - mean_interval**2
+    mean_field = mean_field_response(scenarios, time_limit, tolerance, base, sample_times)
+    return AnalysisResult(scenarios, mean_interval, variance, sample_times, log_targets, mean_field)
+
+
+def default_scenarios():
+    periods = np.geomspace(HOUR, YEAR / 4, 40)
+    amplitudes = np.linspace(0.05, 0.95, 19)
+    factors = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.1, 1.5, 2, 4, 10, 20, 100]
+    doubling_times = [7 * DAY, 14 * DAY, 30 * DAY, 90 * DAY, 180 * DAY, 365 * DAY]
+    return (oscillations(periods, amplitudes) + steps(factors) + ramps(doubling_times)
+            + ramps([-t for t in doubling_times]))
+
+
+def main():
+    scenarios = default_scenarios()
+    result = analyze(scenarios)
+    print("%-42s %10s %9s %12s %15s" % ("scenario", "mean (s)", "bias (s)", "variance",
+                                         "mean-field (h)"))
+    for description, mean, bias, variance, settling_time, perturbed in result.rows():
+        settled = "%15.1f" % (settling_time / HOUR) if perturbed else "never perturbed"
+        print("%-42s %10.1f %9.1f %12.0f %15s" % (description, mean, bias, variance, settled))
@@ -0,0 +1,118 @@
+import numpy as np
+
+from scripts.simulation import reward_era
+
+# Precomputed era table for the scheduled emission of a seasonal token.
+#
+# rewardEra, _getMiningReward and _scheduledNumberOfRewards define a piecewise
+# linear supply schedule: one reward every REWARD_INTERVAL seconds, halving at
+# the end of each era. The table holds the start, reward and cumulative supply
+# of every era until the reward reaches zero, so the era of a timestamp is found
+# arithmetically and every query is a constant number of table lookups.
+
+
+class EmissionSchedule:
+
+    def __init__(self, season, contract_creation_time=0):
+        self.season = season
+        self.contract_creation_time = contract_creation_time
+        self.first_era = season.DURATION_OF_FIRST_ERA
+        self.era_duration = season.DURATION_OF_ERA
+        self.interval = season.REWARD_INTERVAL
+
+        era_start, first_reward, rewards, supply = [0], [0], [], [0]
+        era = 0
+        while True:
+            rewards.append(season.INITIAL_REWARD // 2**era)
+            if rewards[-1] == 0:
+                break
+            era_end = self.first_era + era * self.era_duration
+            supply.append(supply[-1] + rewards[-1] * (era_end // self.interval - first_reward[-1]))
+            era_start.append(era_end)
+            first_reward.append(era_end // self.interval)
+            era += 1
+
+        self.last_era = era    # the first era with a zero reward
+        self.era_start = era_start
+        self.first_reward = first_reward
+        self.rewards = rewards
+        self.supply_at_era_start = supply
+
+        self._first_reward_array = np.array(first_reward, dtype=np.int64)
+        self._rewards_float = np.array(rewards, dtype=np.float64)
+        self._supply_float = np.array(supply, dtype=np.float64)
+        self._rewards_object = np.array(rewards, dtype=object)
+        self._supply_object = np.array(supply, dtype=object)
+
+    @property
+    def total_supply(self):
+        """Everything that will ever be scheduled."""
+
+        return self.supply_at_era_start[-1]
+
+    def _elapsed(self, time):
+        elapsed = time - self.contract_creation_time
+        if np.any(elapsed < 0):
+            raise ValueError("Time before contract creation")
+        return elapsed
+
+    # single timestamps, exact
+
+    def era(self, time):
+        """rewardEra"""
+
+        return reward_era(self._elapsed(time), self.first_era, self.era_duration)
+
+    def reward(self, time):
+        """_getMiningReward"""
+
+        return self.rewards[min(self.era(time), self.last_era)]
+
+    def scheduled_rewards(self, time):
+        """_scheduledNumberOfRewards"""
+
+        return self._elapsed(time) // self.interval
+
+    def supply(self, time):
+        """Tokens (in wei) that the schedule has released by time."""
+
+        era = min(self.era(time), self.last_era)
+        return (self.supply_at_era_start[era]
+                + self.rewards[era] * (self.scheduled_rewards(time) - self.first_reward[era]))
+
+    # arrays of timestamps
+
+    def eras(self, times):
+        elapsed = self._elapsed(np.asarray(times, dtype=np.int64))
+        return reward_era(elapsed, self.first_era, self.era_duration), elapsed
+
+    def rewards_at(self, times, exact=False):
+        """Reward per mint at each time, as float64 wei, or python integers if exact."""
+
+        era, _ = self.eras(times)
+        table = self._rewards_object if exact else self._rewards_float
+        return table[np.minimum(era, self.last_era)]
+
+    def supply_at(self, times, exact=False):
+        """
+        Scheduled supply at each time, as float64 wei, or as an object array of
+        python integers if exact (slower, but still constant time per query).
+        """
+
+        era, elapsed = self.eras(times)
+        era = np.minimum(era, self.last_era)
+        rewards_into_era = elapsed // self.interval - self._first_reward_array[era]
+        if exact:
+            return self._supply_object[era] + self._rewards_object[era] * rewards_into_era.astype(object)
+        return self._supply_float[era] + self._rewards_float[era] * rewards_into_era
+
+
+def season_schedules(contract_creation_times=None):
+    """An EmissionSchedule for each of the four seasons, keyed by symbol."""
+
+    from scripts.seasons import load_seasons   # seasons.py builds its curves on this module
+
+    seasons = load_seasons()
+    times = contract_creation_times or {}
+    return {season.SYMBOL: EmissionSchedule(season, times.get(season.SYMBOL, 0))
+            for season in seasons}
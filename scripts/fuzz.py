@@ -0,0 +1,176 @@
+import random
+import time
+
+from scripts.model import TestSpringTokenModel, _model_function, _random_inputs, evaluate
+from scripts.rpc import RpcError, decode_word, encode_call
+
+# Fuzzing the reward and difficulty arithmetic of a deployed TestSpringToken
+# against the reference model in scripts/model.py.
+#
+# Random inputs are drawn with the edge-biased generators used by
+# differential_check, but the contract side of thousands of cases is sent as
+# one JSON-RPC batch of eth_calls. Every mismatch is then shrunk: each
+# argument in turn is replaced by smaller candidates (0, 1, halves, the
+# distance to the other arguments, ...) evaluated together in one batch, and
+# the smallest candidate that still disagrees is kept until none does.
+
+
+SIGNATURES = {
+    '_numberOfRewardsAvailable': "_numberOfRewardsAvailable(uint256,uint256,uint256)",
+    '_numberOfRewardsToGive': "_numberOfRewardsToGive(uint256,uint256,uint256,uint256)",
+    '_adjustDifficulty': "_adjustDifficulty(uint256,uint256,uint256,uint256)",
+    '_scheduledNumberOfRewards': "_scheduledNumberOfRewards(uint256)",
+    'rewardEra': "rewardEra(uint256)",
+    '_getMiningReward': "_getMiningReward(uint256)",
+    'getNumberOfRewardsAvailable': "getNumberOfRewardsAvailable(uint256)",
+    'getRewardAmountForAchievingTarget': "getRewardAmountForAchievingTarget(uint256,uint256)",
+}
+
+
+class Mismatch:
+
+    def __init__(self, name, args, contract, model):
+        self.name = name
+        self.args = args
+        self.contract = contract
+        self.model = model
+
+    def __repr__(self):
+        return "%s%r: contract %r, model %r" % (self.name, self.args, self.contract, self.model)
+
+
+class FuzzResult:
+
+    def __init__(self, cases, mismatches, shrunk, elapsed):
+        self.cases = cases
+        self.mismatches = mismatches
+        self.shrunk = shrunk
+        self.elapsed = elapsed
+
+    @property
+    def cases_per_second(self):
+        return self.cases / self.elapsed if self.elapsed else 0.
+
+
+def is_revert(error):
+    """Whether an RpcError reports a reverted call, rather than a failure of the node or the transport."""
+
+    # "execution reverted" from geth and anvil, "VM Exception ...: revert" from ganache
+    return "revert" in str(error).lower()
+
+
+class Fuzzer:
+    """
+    Compares the TestSpringToken at `address`, reached through an RpcClient,
+    with `model`, a TestSpringTokenModel holding the same state. The calls are
+    made at `block` so that the state can't change during a run.
+    """
+
+    def __init__(self, client, address, model, block="latest", batch_size=2000):
+        self.client = client
+        self.address = address
+        self.model = model
+        self.block = block
+        self.batch_size = batch_size
+
+    def contract_outcomes(self, cases):
+        """('ok', value) or ('revert', None) for each (name, args) case."""
+
+        outcomes = []
+        for start in range(0, len(cases), self.batch_size):
+            requests = [self.client.eth_call(self.address, encode_call(SIGNATURES[name], *args), self.block)
+                        for name, args in cases[start:start + self.batch_size]]
+            for result in self.client.batch(requests, errors=True):
+                # nodes answer a reverted call with an error, or some with no data
+                if isinstance(result, RpcError) and not is_revert(result):
+                    raise result
+                if isinstance(result, RpcError) or result == "0x":
+                    outcomes.append(('revert', None))
+                else:
+                    outcomes.append(('ok', decode_word(result)))
+        return outcomes
+
+    def model_outcome(self, name, args):
+        return evaluate(_model_function(self.model, name), *args)
+
+    def check(self, cases):
+        """The mismatches among the (name, args) cases."""
+
+        return [Mismatch(name, args, contract, model)
+                for (name, args), contract in zip(cases, self.contract_outcomes(cases))
+                for model in [self.model_outcome(name, args)] if contract != model]
+
+    def _candidates(self, args, position):
+        value = args[position]
+        smaller = {0, 1, value >> 1, value - 1, value - (value >> 1)}
+        smaller.update(1 << bit for bit in range(value.bit_length() - 1))
+        # times and counts often only matter relative to each other
+        smaller.update(abs(value - other) for other in args)
+        smaller.add(self.model.contract_creation_time)
+        for candidate in sorted(candidate for candidate in smaller if 0 <= candidate < value):
+            yield args[:position] + (candidate,) + args[position + 1:]
+
+    def shrink(self, mismatch):
+        """A mismatch of the same function whose arguments can't be made smaller one at a time."""
+
+        while True:
+            cases = [(mismatch.name, args)
+                     for position in range(len(mismatch.args))
+                     for args in self._candidates(mismatch.args, position)]
+            failing = self.check(cases)
+            if not failing:
+                return mismatch
+            # the candidates are ordered smallest first for each argument
+            mismatch = min(failing, key=lambda failure: (sum(failure.args), failure.args))
+
+    def run(self, cases=100000, seed=None, shrink=True):
+        """Check `cases` random inputs spread evenly over the fuzzed functions."""
+
+        rng = random.Random(seed)
+        generators = _random_inputs(rng, self.model)
+        started = time.perf_counter()
+        mismatches = []
+        names = list(SIGNATURES)
+        remaining = cases
+        while remaining:
+            batch = [(name, generators[name]()) for name in
+                     (names[i % len(names)] for i in range(min(self.batch_size, remaining)))]
+            mismatches.extend(self.check(batch))
+            remaining -= len(batch)
+        elapsed = time.perf_counter() - started
+
+        shrunk = []
+        if shrink:
+            seen = set()
+            for mismatch in mismatches:
+                minimal = self.shrink(mismatch)
+                if (minimal.name, minimal.args) not in seen:
+                    seen.add((minimal.name, minimal.args))
+                    shrunk.append(minimal)
+        return FuzzResult(cases, mismatches, shrunk, elapsed)
+
+
+def fuzz_token(token, cases=100000, seed=None, model=None, **kwargs):
+    """Fuzz a brownie TestSpringToken over the node brownie is connected to."""
+
+    from brownie import web3
+    from scripts.rpc import RpcClient
+
+    client = RpcClient(web3.provider.endpoint_uri)
+    try:
+        fuzzer = Fuzzer(client, token.address, model or TestSpringTokenModel.from_contract(token),
+                        block=web3.eth.block_number, **kwargs)
+        return fuzzer.run(cases, seed)
+    finally:
+        client.close()
+
+
+def main():
+    from brownie import TestSpringToken, accounts
+
+    token = accounts[0].deploy(TestSpringToken)
+    result = fuzz_token(token, seed=0)
+    print("%d cases in %.1fs (%.0f per second), %d mismatches"
+          % (result.cases, result.elapsed, result.cases_per_second, len(result.mismatches)))
+    for mismatch in result.shrunk:
+        print(mismatch)
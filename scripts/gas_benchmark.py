@@ -0,0 +1,157 @@
+import json
+import os
+
+from brownie import (AutumnToken, SpringToken, SummerToken, TestSpringToken, WinterToken,
+                     accounts, chain)
+
+from scripts.miner import mine_for_token
+from scripts.simulation import MAX_REWARDS_AVAILABLE, REWARD_INTERVAL
+
+# Gas used by the mint, transfer and approve paths.
+#
+# Minting needs a proof of work below the mining target, and transfers need a
+# balance, so those paths are measured on TestSpringToken, whose setters make
+# any target and reward count reachable. The four season contracts are
+# identical apart from their constants and can't be minted on a local chain
+# at their real difficulty; for them the deployment and the approval paths
+# are measured.
+#
+# Results are keyed by contract name and path, e.g. "mint/72" for a mint
+# paying 72 rewards, and are compared with the baseline in BASELINE_FILE.
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "tests", "gas_baseline.json")
+SEASON_CONTRACTS = (SpringToken, SummerToken, AutumnToken, WinterToken)
+
+# _adjustDifficulty multiplies the target by 100 before dividing, so a larger
+# target overflows with checked arithmetic and every mint reverts
+MINT_TARGET = 2**248
+
+
+def measure_batched_mint(token, account, rewards, legacy=False):
+    """
+    Gas used by a mint paying `rewards` rewards, submitted `rewards` intervals
+    after the previous mint as the batching strategy in the whitepaper does.
+    """
+
+    token.setMiningTarget(MINT_TARGET, {'from': account})
+    token.setMaxNumberOfRewards(1, {'from': account})
+    # one process searching up from 0 finds the same nonce every time, and so
+    # the same calldata and gas
+    result = mine_for_token(token, account, MINT_TARGET // rewards, processes=1, start_nonce=0)
+    chain.sleep(rewards * REWARD_INTERVAL)
+    if legacy:
+        tx = token.mint['uint256,bytes32'](result.nonce, result.digest, {'from': account})
+    else:
+        tx = token.mint['uint256'](result.nonce, {'from': account})
+    assert tx.events["Mint"]["rewardAmount"] == rewards * token.getMiningReward()
+    return tx.gas_used
+
+
+def measure_test_token(account, other, spender, batch_sizes=range(1, MAX_REWARDS_AVAILABLE + 1)):
+    gas = {}
+    token = account.deploy(TestSpringToken)
+    gas["deploy"] = token.tx.gas_used
+
+    # the first mint creates the miner's balance; measure with a balance in place
+    measure_batched_mint(token, account, 1)
+    for rewards in batch_sizes:
+        gas["mint/%d" % rewards] = measure_batched_mint(token, account, rewards)
+        gas["legacy_mint/%d" % rewards] = measure_batched_mint(token, account, rewards, legacy=True)
+
+    token.setBalance(other, 10**18, {'from': account})
+    gas["transfer"] = token.transfer(other, 10**18, {'from': account}).gas_used
+    token.approve(other, 10**18, {'from': account})
+    gas["transferFrom"] = token.transferFrom(account, other, 10**18, {'from': other}).gas_used
+    gas.update(_measure_approvals(token, account, spender))
+    return gas
+
+
+def _measure_approvals(token, account, spender):
+    return {
+        "safeApprove": token.safeApprove(spender, 0, 10**18, {'from': account}).gas_used,
+        "safeApproveAndCall": token.safeApproveAndCall(spender, 10**18, 2 * 10**18, b"",
+                                                       {'from': account}).gas_used,
+    }
+
+
+def measure_season(contract, account, spender):
+    token = account.deploy(contract)
+    gas = {"deploy": token.tx.gas_used}
+    gas.update(_measure_approvals(token, account, spender))
+    return gas
+
+
+def measure(account=None, other=None, batch_sizes=range(1, MAX_REWARDS_AVAILABLE + 1)):
+    """Gas used by every measured path, as {contract name: {path: gas}}."""
+
+    account = account or accounts[0]
+    other = other or accounts[1]
+    # a contract implementing receiveApproval, for safeApproveAndCall
+    spender = account.deploy(TestSpringToken)
+
+    results = {"TestSpringToken": measure_test_token(account, other, spender, batch_sizes)}
+    for contract in SEASON_CONTRACTS:
+        results[contract._name] = measure_season(contract, account, spender)
+    return results
+
+
+def compare(results, baseline, tolerance=0):
+    """
+    The paths whose gas use rose by more than `tolerance` (a fraction) above
+    the baseline, as a list of messages. Paths missing from the baseline are
+    not compared.
+    """
+
+    regressions = []
+    for contract, paths in sorted(results.items()):
+        for path, gas in sorted(paths.items()):
+            previous = baseline.get(contract, {}).get(path)
+            if previous is not None and gas > previous * (1 + tolerance):
+                regressions.append("%s %s: %d gas, baseline %d (%+.2f%%)"
+                                   % (contract, path, gas, previous, 100. * (gas - previous) / previous))
+    return regressions
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_baseline(results, path=BASELINE_FILE):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+
+def print_results(results):
+    mints = results["TestSpringToken"]
+    print("rewards   mint gas  per reward   legacy gas  per reward")
+    for rewards in range(1, MAX_REWARDS_AVAILABLE + 1):
+        if "mint/%d" % rewards in mints:
+            gas, legacy = mints["mint/%d" % rewards], mints["legacy_mint/%d" % rewards]
+            print("%7d %10d %11.0f %12d %11.0f" % (rewards, gas, gas / rewards, legacy, legacy / rewards))
+    for contract, paths in results.items():
+        for path, gas in sorted(paths.items()):
+            if "mint/" not in path:
+                print("%-16s %-20s %8d" % (contract, path, gas))
+
+
+def main():
+    results = measure()
+    print_results(results)
+    baseline = load_baseline()
+    if baseline is None:
+        write_baseline(results)
+        print("Wrote baseline to %s" % BASELINE_FILE)
+        return
+    for regression in compare(results, baseline):
+        print("REGRESSION " + regression)
+
+
+def update():
+    """Replace the baseline, after an intended change to the contracts."""
+
+    write_baseline(measure())
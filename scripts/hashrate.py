@@ -0,0 +1,266 @@
+from collections import deque
+import math
+import random
+import time
+
+import numpy as np
+
+from scripts.simulation import (MAX_REWARDS_AVAILABLE, MAXIMUM_TARGET, MINIMUM_TARGET,
+                                REWARD_INTERVAL, YEAR, adjust_difficulty)
+
+# Estimating the hashrate mining each token from its mint history.
+#
+# Every hash is below the mining target T with probability T / 2**256, so
+# while T is in force solutions arrive as a Poisson process of rate
+# H * T / 2**256. Over the last k mints, with intervals dt_i mined against
+# targets T_i, the likelihood of a constant hashrate H is maximized by
+#
+#     H = k / sum(T_i / 2**256 * dt_i)
+#
+# The terms of the sum are kept in a deque with a running total, so each
+# mint costs O(1). The target in force after a mint follows from the
+# previous target, the mint time and the number of rewards given, as in
+# _adjustDifficulty, so only the times and reward counts of the Mint events
+# are needed once the state at some earlier mint is known.
+#
+# Mints of batched solutions are made some time after the solution is found,
+# which the estimate counts as time spent searching, so it is low by the
+# fraction of time solutions are held back.
+
+
+DAY = 24 * 60 * 60
+
+
+class Forecast:
+
+    def __init__(self, hashrate, target, expected_interval, rewards_per_mint, rewards_available):
+        self.hashrate = hashrate
+        self.target = target
+        self.expected_interval = expected_interval
+        self.rewards_per_mint = rewards_per_mint
+        self.rewards_available = rewards_available
+
+    @property
+    def time_per_reward(self):
+        return self.expected_interval / self.rewards_per_mint
+
+    def __repr__(self):
+        return "<Forecast %.3g H/s, next mint in %.0fs>" % (self.hashrate, self.expected_interval)
+
+
+class HashrateEstimator:
+    """
+    Rolling estimate of the hashrate mining one token, over its last `window`
+    mints, starting from the contract state at the mint made at
+    last_reward_time.
+    """
+
+    def __init__(self, target, last_reward_time, max_number_of_rewards=1, window=144,
+                 minimum_target=MINIMUM_TARGET, maximum_target=MAXIMUM_TARGET):
+        self.target = target
+        self.last_reward_time = last_reward_time
+        self.max_number_of_rewards = max_number_of_rewards
+        self.window = window
+        self.minimum_target = minimum_target
+        self.maximum_target = maximum_target
+        self.mints = 0
+
+        self._exposures = deque()
+        self._rewards = deque()
+        self._exposure = 0.
+        self._total_rewards = 0
+
+    @classmethod
+    def from_model(cls, model, **kwargs):
+        return cls(model.mining_target, model.last_reward_block_time,
+                   model.max_number_of_rewards_per_mint,
+                   minimum_target=model.MINIMUM_TARGET, maximum_target=model.MAXIMUM_TARGET, **kwargs)
+
+    @classmethod
+    def from_token_state(cls, state, **kwargs):
+        """From a TokenState read by scripts/rpc.py."""
+
+        return cls(state.miningTarget, state.lastRewardBlockTime, state.maxNumberOfRewardsPerMint, **kwargs)
+
+    def observe(self, timestamp, rewards=1, target=None):
+        """
+        Record a mint of `rewards` rewards at `timestamp`. target is the one
+        the mint was solved against; by default the one that follows from
+        the mints observed so far.
+        """
+
+        if target is None:
+            target = self.target
+        exposure = target / 2**256 * (timestamp - self.last_reward_time)
+        self._exposures.append(exposure)
+        self._rewards.append(rewards)
+        self._exposure += exposure
+        self._total_rewards += rewards
+        if len(self._exposures) > self.window:
+            self._exposure -= self._exposures.popleft()
+            self._total_rewards -= self._rewards.popleft()
+
+        self.mints += 1
+        if self.mints % self.window == 0:
+            # don't let rounding errors of the running total accumulate
+            self._exposure = math.fsum(self._exposures)
+
+        self.target = adjust_difficulty(target, self.last_reward_time, rewards, timestamp,
+                                        self.minimum_target, self.maximum_target)
+        self.last_reward_time = timestamp
+        self.max_number_of_rewards = rewards
+
+    @property
+    def hashrate(self):
+        """Hashes per second, or nan before the first mint."""
+
+        if not self._exposures:
+            return math.nan
+        return len(self._exposures) / self._exposure if self._exposure > 0 else math.inf
+
+    @property
+    def rewards_per_mint(self):
+        return self._total_rewards / len(self._rewards) if self._rewards else 1.
+
+    def expected_interval(self, hashrate=None):
+        """Expected time until the next solution against the current target."""
+
+        hashrate = self.hashrate if hashrate is None else hashrate
+        if not hashrate > 0:
+            return math.inf
+        return 2**256 / (hashrate * self.target)
+
+    def forecast(self, now):
+        """
+        The expected time from `now` until the next mint. Solutions arrive
+        without memory, so it doesn't depend on the time since the last one.
+        """
+
+        available = min(max((now - self.last_reward_time) // REWARD_INTERVAL, self.max_number_of_rewards),
+                        MAX_REWARDS_AVAILABLE)
+        return Forecast(self.hashrate, self.target, self.expected_interval(), self.rewards_per_mint,
+                        int(available))
+
+
+def forecast_seasons(estimators, now):
+    """{name: Forecast} for {name: HashrateEstimator}, soonest reward first."""
+
+    forecasts = {name: estimator.forecast(now) for name, estimator in estimators.items()}
+    return dict(sorted(forecasts.items(), key=lambda item: item[1].time_per_reward))
+
+
+class SyntheticHistory:
+
+    def __init__(self, times, rewards, hashpower, initial_target, final_target):
+        self.times = times
+        self.rewards = rewards
+        self.hashpower = hashpower
+        self.initial_target = initial_target
+        self.final_target = final_target
+
+    def __len__(self):
+        return len(self.times)
+
+
+def synthetic_history(hashpower_function, years=200, initial_target=None, seed=None):
+    """
+    The mints of one token mined at hashpower_function(t) hashes per second
+    for `years`, by miners who submit every solution at once. The hashpower
+    is taken as constant between mints.
+    """
+
+    rng = random.Random(seed)
+    equilibrium_interval = REWARD_INTERVAL * 61 / 88 / math.log(2)
+    if initial_target is None:
+        initial_target = int(2**256 / (hashpower_function(0.) * equilibrium_interval))
+    target = initial_target
+    end = years * YEAR
+    now, last, max_number_of_rewards = 0., 0., 1
+    times, rewards, hashpower = [], [], []
+    while True:
+        power = hashpower_function(now)
+        now += rng.expovariate(power * target / 2**256)
+        if now >= end:
+            break
+        # a digest uniformly distributed below the target earns floor(1/u) rewards
+        earned = int(1 / (1 - rng.random()))
+        available = min(max(int((now - last) // REWARD_INTERVAL), max_number_of_rewards),
+                        MAX_REWARDS_AVAILABLE)
+        given = min(earned, available)
+        times.append(now)
+        rewards.append(given)
+        hashpower.append(power)
+        target = adjust_difficulty(target, last, given, now)
+        last, max_number_of_rewards = now, given
+    return SyntheticHistory(np.array(times), np.array(rewards, dtype=np.int8), np.array(hashpower),
+                            initial_target, target)
+
+
+def growing_hashpower(base=1e10, growth=0.05, amplitude=0.5, period=30 * DAY):
+    """Hashpower growing exponentially by `growth` a year, with a periodic swing of `amplitude`."""
+
+    def hashpower(t):
+        return base * math.exp(growth * t / YEAR) * (1 + amplitude * math.sin(2 * math.pi * t / period))
+    return hashpower
+
+
+class BenchmarkResult:
+
+    def __init__(self, mints, elapsed, relative_errors, target_matches):
+        self.mints = mints
+        self.elapsed = elapsed
+        self.relative_errors = relative_errors
+        self.target_matches = target_matches
+
+    @property
+    def mints_per_second(self):
+        return self.mints / self.elapsed
+
+    @property
+    def median_error(self):
+        return float(np.median(np.abs(self.relative_errors)))
+
+    @property
+    def bias(self):
+        return float(np.mean(self.relative_errors))
+
+
+def evaluate_estimator(history, window=144):
+    """
+    Replay a synthetic history through a HashrateEstimator and compare its
+    estimate after every mint, from the window-th on, with the true hashpower.
+    """
+
+    estimator = HashrateEstimator(history.initial_target, 0., window=window)
+    estimates = np.empty(len(history))
+    observe = estimator.observe
+    started = time.perf_counter()
+    for i, (timestamp, rewards) in enumerate(zip(history.times.tolist(), history.rewards.tolist())):
+        observe(timestamp, rewards)
+        estimates[i] = estimator.hashrate
+    elapsed = time.perf_counter() - started
+    errors = estimates[window:] / history.hashpower[window:] - 1
+    return BenchmarkResult(len(history), elapsed, errors, estimator.target == history.final_target)
+
+
+def benchmark(years=200, window=144, shares=(0.4, 0.3, 0.2, 0.1), seed=0):
+    """
+    Evaluate the estimator on one synthetic history per season, each mined by
+    a share of a growing total hashpower. Returns a list of BenchmarkResult.
+    """
+
+    results = []
+    for i, share in enumerate(shares):
+        profile = growing_hashpower(base=share * 1e10)
+        history = synthetic_history(profile, years, seed=seed * len(shares) + i)
+        results.append(evaluate_estimator(history, window))
+    return results
+
+
+def main():
+    from scripts.seasons import SEASON_CONTRACTS
+
+    for name, result in zip(SEASON_CONTRACTS, benchmark()):
+        print("%-12s %9d mints  %8.0f mints per second  median error %5.1f%%  bias %+5.1f%%  target %s"
+              % (name, result.mints, result.mints_per_second, 100 * result.median_error,
+                 100 * result.bias, "matches" if result.target_matches else "differs"))
@@ -0,0 +1,310 @@
+import bisect
+
+import numpy as np
+
+from scripts.rpc import (MINT_TOPIC, RpcError, decode_mint_log, decode_word, encode_call, function_selector,
+                         keccak256)
+
+# Balances and allowances of the seasonal tokens rebuilt from their events.
+#
+# Balances change through Mint (which emits no Transfer) and Transfer events,
+# allowances through Approval events and transferFrom. transferFrom emits only
+# Transfer(from, to, tokens), so the spender is taken from the transaction
+# when it calls transferFrom on the token directly. When the token is called
+# by another contract the spender can't be seen in the logs, and the
+# allowances the sender has granted to known spenders are read back from the
+# node at that block instead.
+#
+# Addresses are numbered in order of first appearance and the current state
+# is kept in lists indexed by those numbers. At least every
+# `checkpoint_interval` blocks (at the first event after that) the balances
+# are copied into a pair of uint64 arrays, and every change is journalled
+# with its block, so the state at a historical block is a checkpoint plus the
+# changes of at most checkpoint_interval blocks.
+
+
+TRANSFER_TOPIC = "0x" + keccak256(b"Transfer(address,address,uint256)").hex()
+APPROVAL_TOPIC = "0x" + keccak256(b"Approval(address,address,uint256)").hex()
+TRANSFER_FROM_SELECTOR = "0x" + function_selector("transferFrom(address,address,uint256)").hex()
+
+
+def decode_log(log):
+    """A Transfer, Approval or Mint log as a dict with a 'kind' key."""
+
+    topic = log["topics"][0]
+    if topic == MINT_TOPIC:
+        event = decode_mint_log(log)
+        event["kind"] = "Mint"
+        return event
+    return {
+        "kind": "Transfer" if topic == TRANSFER_TOPIC else "Approval",
+        "address": log["address"].lower(),
+        "from": "0x" + log["topics"][1][-40:],
+        "to": "0x" + log["topics"][2][-40:],
+        "tokens": decode_word(log["data"]),
+        "blockNumber": int(log["blockNumber"], 16),
+        "logIndex": int(log["logIndex"], 16),
+        "transactionHash": log["transactionHash"],
+    }
+
+
+class _Journal:
+    """Values of keys set at increasing block numbers."""
+
+    def __init__(self):
+        self.blocks = []
+        self.keys = []
+        self.values = []
+
+    def record(self, block, key, value):
+        self.blocks.append(block)
+        self.keys.append(key)
+        self.values.append(value)
+
+    def changes(self, after_block, to_block):
+        """The (key, value) pairs set in blocks after_block < block <= to_block, in order."""
+
+        start = bisect.bisect_right(self.blocks, after_block)
+        end = bisect.bisect_right(self.blocks, to_block)
+        return zip(self.keys[start:end], self.values[start:end])
+
+
+class _Checkpoint:
+
+    def __init__(self, block, balances, allowances):
+        self.block = block
+        values = np.array(balances, dtype=object)
+        self.balances_high = (values >> 64).astype(np.uint64)
+        self.balances_low = (values & (2**64 - 1)).astype(np.uint64)
+        self.allowances = dict(allowances)
+
+    def balance(self, holder):
+        if holder >= len(self.balances_low):
+            return 0
+        return (int(self.balances_high[holder]) << 64) + int(self.balances_low[holder])
+
+    def balances(self):
+        return [(int(high) << 64) + int(low) for high, low in zip(self.balances_high, self.balances_low)]
+
+
+class _TokenLedger:
+
+    def __init__(self, start_block):
+        self.balances = []
+        self.allowances = {}
+        self.spenders = {}
+        self.balance_journal = _Journal()
+        self.allowance_journal = _Journal()
+        self.checkpoints = [_Checkpoint(start_block - 1, [], {})]
+        self.checkpoint_blocks = [start_block - 1]
+
+    def set_balance(self, block, holder, value):
+        if holder >= len(self.balances):
+            self.balances.extend([0] * (holder + 1 - len(self.balances)))
+        self.balances[holder] = value
+        self.balance_journal.record(block, holder, value)
+
+    def add_balance(self, block, holder, amount):
+        balance = self.balances[holder] if holder < len(self.balances) else 0
+        self.set_balance(block, holder, balance + amount)
+
+    def set_allowance(self, block, owner, spender, value):
+        self.allowances[owner, spender] = value
+        self.spenders.setdefault(owner, set()).add(spender)
+        self.allowance_journal.record(block, (owner, spender), value)
+
+    def checkpoint(self, block):
+        self.checkpoints.append(_Checkpoint(block, self.balances, self.allowances))
+        self.checkpoint_blocks.append(block)
+
+    def checkpoint_before(self, block):
+        index = bisect.bisect_right(self.checkpoint_blocks, block) - 1
+        if index < 0:
+            raise ValueError("Block %d is before the start of the ledger" % block)
+        return self.checkpoints[index]
+
+
+class Ledger:
+    """
+    Balances and allowances of `tokens` ({name: address}) from start_block on.
+
+    Queries take an optional block number; without one they answer for the
+    last block replayed (next_block - 1).
+    """
+
+    def __init__(self, tokens, checkpoint_interval=1000, start_block=0):
+        self.tokens = {name: address.lower() for name, address in tokens.items()}
+        self.names = {address: name for name, address in self.tokens.items()}
+        self.checkpoint_interval = checkpoint_interval
+        self.next_block = start_block
+        self.addresses = []
+        self.ids = {}
+        self.ledgers = {name: _TokenLedger(start_block) for name in self.tokens}
+        self.indirect_transfers = []
+        self._next_checkpoint = start_block + checkpoint_interval
+
+    def address_id(self, address):
+        address = address.lower()
+        if address not in self.ids:
+            self.ids[address] = len(self.addresses)
+            self.addresses.append(address)
+        return self.ids[address]
+
+    def _checkpoint(self, block):
+        for ledger in self.ledgers.values():
+            ledger.checkpoint(block)
+        self._next_checkpoint = block + self.checkpoint_interval
+
+    def apply(self, events, spenders=None, allowances=None):
+        """
+        Replay decoded events (see decode_log) in block order.
+
+        spenders maps the transaction hash of a transferFrom call to its
+        sender; allowances maps (transaction hash, owner) to the
+        {spender: allowance} read from the node after the transaction.
+        """
+
+        spenders = spenders or {}
+        allowances = allowances or {}
+        for event in sorted(events, key=lambda event: (event["blockNumber"], event["logIndex"])):
+            block = event["blockNumber"]
+            if block > self._next_checkpoint:
+                self._checkpoint(block - 1)
+            ledger = self.ledgers[self.names[event["address"]]]
+            source = self.address_id(event["from"])
+
+            if event["kind"] == "Mint":
+                ledger.add_balance(block, source, event["rewardAmount"])
+            elif event["kind"] == "Approval":
+                ledger.set_allowance(block, source, self.address_id(event["to"]), event["tokens"])
+            else:
+                ledger.add_balance(block, source, -event["tokens"])
+                ledger.add_balance(block, self.address_id(event["to"]), event["tokens"])
+                transaction = event["transactionHash"]
+                if transaction in spenders:
+                    spender = self.address_id(spenders[transaction])
+                    ledger.set_allowance(block, source, spender,
+                                         ledger.allowances.get((source, spender), 0) - event["tokens"])
+                for spender, value in allowances.get((transaction, event["from"]), {}).items():
+                    ledger.set_allowance(block, source, self.address_id(spender), value)
+
+    def _known_spenders(self, token, owner, events):
+        # spenders approved before this chunk or anywhere in it; reading one
+        # approved later in the block does no harm
+        ledger = self.ledgers[self.names[token]]
+        spenders = {self.addresses[spender] for spender in ledger.spenders.get(self.ids.get(owner), ())}
+        spenders.update(event["to"] for event in events if event["kind"] == "Approval"
+                        and event["address"] == token and event["from"] == owner)
+        return sorted(spenders)
+
+    def _resolve_spenders(self, client, events):
+        # the sender of each transaction that emitted a Transfer
+        transfers = [event for event in events if event["kind"] == "Transfer"]
+        hashes = sorted({event["transactionHash"] for event in transfers})
+        transactions = dict(zip(hashes, client.batch([("eth_getTransactionByHash", [transaction])
+                                                      for transaction in hashes])))
+        spenders, indirect = {}, []
+        for event in transfers:
+            transaction = transactions[event["transactionHash"]]
+            if (transaction["to"] or "").lower() == event["address"]:
+                if transaction["input"][:10] == TRANSFER_FROM_SELECTOR:
+                    spenders[event["transactionHash"]] = transaction["from"].lower()
+            else:
+                indirect.append(event)
+
+        # read back the allowances the sender of an indirect transfer has granted
+        requests, keys = [], []
+        for event in indirect:
+            for spender in self._known_spenders(event["address"], event["from"], events):
+                requests.append(client.eth_call(event["address"], encode_call(
+                    "allowance(address,address)", event["from"], spender), event["blockNumber"]))
+                keys.append((event, spender))
+            self.indirect_transfers.append(event)
+        allowances = {}
+        for (event, spender), result in zip(keys, client.batch(requests)):
+            allowances.setdefault((event["transactionHash"], event["from"]), {})[spender] = \
+                decode_word(result)
+        return spenders, allowances
+
+    def _fetch(self, client, from_block, to_block):
+        logs = client.call("eth_getLogs", [{
+            "address": list(self.tokens.values()),
+            "topics": [[TRANSFER_TOPIC, APPROVAL_TOPIC, MINT_TOPIC]],
+            "fromBlock": hex(from_block), "toBlock": hex(to_block)}])
+        return [decode_log(log) for log in logs]
+
+    def update(self, client, to_block=None, chunk_size=2000):
+        """Replay the events up to to_block (by default the latest block). Returns the number replayed."""
+
+        if to_block is None:
+            to_block = int(client.call("eth_blockNumber"), 16)
+        replayed = 0
+        while self.next_block <= to_block:
+            last = min(self.next_block + chunk_size - 1, to_block)
+            try:
+                events = self._fetch(client, self.next_block, last)
+            except RpcError:
+                if chunk_size == 1:
+                    raise
+                chunk_size = max(1, chunk_size // 2)
+                continue
+            self.apply(events, *self._resolve_spenders(client, events))
+            self.next_block = last + 1
+            replayed += len(events)
+        return replayed
+
+    # queries
+
+    def balance_of(self, token, address, block=None):
+        ledger = self.ledgers[token]
+        holder = self.ids.get(address.lower())
+        if holder is None:
+            return 0
+        if block is None:
+            return ledger.balances[holder] if holder < len(ledger.balances) else 0
+        checkpoint = ledger.checkpoint_before(block)
+        balance = checkpoint.balance(holder)
+        for key, value in ledger.balance_journal.changes(checkpoint.block, block):
+            if key == holder:
+                balance = value
+        return balance
+
+    def allowance(self, token, owner, spender, block=None):
+        ledger = self.ledgers[token]
+        key = (self.ids.get(owner.lower()), self.ids.get(spender.lower()))
+        if block is None:
+            return ledger.allowances.get(key, 0)
+        checkpoint = ledger.checkpoint_before(block)
+        allowance = checkpoint.allowances.get(key, 0)
+        for changed, value in ledger.allowance_journal.changes(checkpoint.block, block):
+            if changed == key:
+                allowance = value
+        return allowance
+
+    def balances(self, token, block=None):
+        """The balance of every address seen so far, indexed by address id."""
+
+        ledger = self.ledgers[token]
+        if block is None:
+            balances = list(ledger.balances)
+        else:
+            checkpoint = ledger.checkpoint_before(block)
+            balances = checkpoint.balances()
+            for holder, value in ledger.balance_journal.changes(checkpoint.block, block):
+                if holder >= len(balances):
+                    balances.extend([0] * (holder + 1 - len(balances)))
+                balances[holder] = value
+        return balances + [0] * (len(self.addresses) - len(balances))
+
+    def holders(self, token, block=None):
+        """{address: balance} of every address with a positive balance."""
+
+        return {self.addresses[holder]: balance
+                for holder, balance in enumerate(self.balances(token, block)) if balance}
+
+    def distributions(self, block=None):
+        """For every token, the positive balances in decreasing order as a float64 array, in whole tokens."""
+
+        return {token: np.sort(np.array([balance for balance in self.balances(token, block) if balance],
+                                        dtype=np.float64) / 10**18)[::-1]
+                for token in self.tokens}
@@ -0,0 +1,244 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Counters, timers and histograms for the mining and simulation paths.
+#
+# Metrics are created once, usually at import, and recorded into on the hot
+# paths. Recording is off until enable() is called: every method then returns
+# after checking one attribute, and Timer.time() hands out a shared context
+# manager that does nothing. The values can be written to a JSON file, or
+# exposed in the Prometheus text format on an HTTP endpoint.
+#
+# Workers of scripts/miner.py run in separate processes, so hashes are
+# counted by mine() in the parent once the workers report back.
+
+
+DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, .001, .01, .1)
+
+
+class _NullTiming:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMING = _NullTiming()
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, registry, name, help, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        if self.registry.enabled:
+            with self.registry.lock:
+                self.value += amount
+
+    def reset(self):
+        self.value = 0
+
+    def snapshot(self):
+        return self.value
+
+    def samples(self):
+        yield self.name, self.labels, self.value
+
+
+class Histogram:
+    """Observations counted in buckets with the given upper bounds, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labels, buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.reset()
+
+    def observe(self, value):
+        if self.registry.enabled:
+            with self.registry.lock:
+                self.counts[bisect.bisect_left(self.buckets, value)] += 1
+                self.sum += value
+                self.count += 1
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def snapshot(self):
+        return {"buckets": dict(zip(map(str, self.buckets), self.counts)), "overflow": self.counts[-1],
+                "sum": self.sum, "count": self.count}
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield self.name + "_bucket", self.labels + (("le", _format(bound)),), cumulative
+        yield self.name + "_bucket", self.labels + (("le", "+Inf"),), self.count
+        yield self.name + "_sum", self.labels, self.sum
+        yield self.name + "_count", self.labels, self.count
+
+
+class _Timing:
+
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Timer(Histogram):
+    """A histogram of durations in seconds; `with timer.time():` times a block."""
+
+    def time(self):
+        if self.registry.enabled:
+            return _Timing(self)
+        return _NULL_TIMING
+
+
+class Registry:
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            metric = self.metrics[key] = cls(self, name, help, key[1], **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError("%s is already registered as a %s" % (name, type(metric).__name__))
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def timer(self, name, help="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Timer, name, help, labels, buckets=buckets)
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.reset()
+
+    def snapshot(self):
+        """{name: value} for counters and {name: {buckets, overflow, sum, count}} for histograms."""
+
+        with self.lock:
+            return {_sample_name(name, labels): metric.snapshot()
+                    for (name, labels), metric in sorted(self.metrics.items())}
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+
+        lines, described = [], set()
+        with self.lock:
+            for (name, _), metric in sorted(self.metrics.items()):
+                if name not in described:
+                    described.add(name)
+                    lines.append("# HELP %s %s" % (name, metric.help))
+                    lines.append("# TYPE %s %s" % (name, metric.kind))
+                for sample, labels, value in metric.samples():
+                    lines.append("%s %s" % (_sample_name(sample, labels), _format(value)))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to path, in the Prometheus format if it ends in .prom and as JSON otherwise."""
+
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.prometheus())
+            else:
+                json.dump({"time": time.time(), "metrics": self.snapshot()}, f, indent=1)
+        os.replace(temporary, path)
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """Expose the metrics at http://host:port/metrics from a daemon thread. Returns the server."""
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _format(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _sample_name(name, labels):
+    if not labels:
+        return name
+    return "%s{%s}" % (name, ",".join('%s="%s"' % (key, str(value).replace('"', '\\"'))
+                                       for key, value in labels))
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+timer = REGISTRY.timer
+snapshot = REGISTRY.snapshot
+prometheus = REGISTRY.prometheus
+write = REGISTRY.write
+serve = REGISTRY.serve
+reset = REGISTRY.reset
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def enabled():
+    return REGISTRY.enabled
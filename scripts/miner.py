@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+from Crypto.Hash import keccak
+
+from scripts import metrics
+
+# Proof of work nonce search for mint(nonce).
+#
+# The contract hashes keccak256(abi.encodePacked(challengeNumber, msg.sender, nonce)),
+# which is the 32 byte challenge, the 20 byte address and the nonce as a 32 byte
+# big-endian integer. The 52 byte prefix is fixed for a given challenge and miner,
+# so it is written into the message buffer once and only the nonce is rewritten.
+
+
+PREFIX_LENGTH = 52
+BATCH_SIZE = 4096
+
+_HASHES = metrics.counter("miner_hashes_total", "Nonces hashed by mine()")
+_SEARCH_SECONDS = metrics.counter("miner_search_seconds_total", "Time spent in mine()")
+_SOLUTIONS = metrics.counter("miner_solutions_total", "Solutions found by mine()")
+
+
+def to_bytes(value, length):
+    """Convert a hex string, bytes-like or brownie Account/HexString to `length` bytes."""
+
+    if hasattr(value, 'address'):
+        value = value.address
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    value = bytes(value)
+    if len(value) != length:
+        raise ValueError("Expected %d bytes, got %d" % (length, len(value)))
+    return value
+
+
+def mining_prefix(challenge, address):
+    return to_bytes(challenge, 32) + to_bytes(address, 20)
+
+
+def digest_for(challenge, address, nonce):
+    return keccak.new(data=mining_prefix(challenge, address) + nonce.to_bytes(32, 'big'),
+                      digest_bits=256).digest()
+
+
+def search_nonces(prefix, target, first_nonce, count):
+    """
+    Hash nonces first_nonce .. first_nonce + count - 1 and return the first
+    (nonce, digest) whose digest does not exceed target, or None.
+    """
+
+    message = bytearray(prefix + bytes(32))
+    target_bytes = target.to_bytes(32, 'big')
+    new = keccak.new
+    for nonce in range(first_nonce, first_nonce + count):
+        message[PREFIX_LENGTH:] = (nonce % 2**256).to_bytes(32, 'big')
+        digest = new(data=message, digest_bits=256).digest()
+        # equal-length big-endian byte strings compare like the integers they encode
+        if digest <= target_bytes:
+            return nonce % 2**256, digest
+    return None
+
+
+class MiningResult:
+
+    def __init__(self, nonce, digest, hashes, elapsed):
+        self.nonce = nonce
+        self.digest = digest
+        self.hashes = hashes
+        self.elapsed = elapsed
+
+    @property
+    def found(self):
+        return self.nonce is not None
+
+    @property
+    def hashrate(self):
+        return self.hashes / self.elapsed if self.elapsed else 0.
+
+
+def _search_worker(prefix, target, start_nonce, worker, workers, batch_size, stop, results):
+    batch, hashes = worker, 0
+    while not stop.is_set():
+        found = search_nonces(prefix, target, start_nonce + batch * batch_size, batch_size)
+        if found is None:
+            hashes += batch_size
+            batch += workers
+            continue
+        nonce, digest = found
+        hashes += (nonce - start_nonce - batch * batch_size) % 2**256 + 1
+        stop.set()
+        results.put((nonce, digest, hashes))
+        return
+    results.put((None, None, hashes))
+
+
+def mine(challenge, address, target, processes=None, start_nonce=None, batch_size=BATCH_SIZE,
+         timeout=None, stop=None):
+    """
+    Search for a nonce whose digest does not exceed target, hashing batches of
+    nonces on every CPU core. Workers take interleaved batches starting at
+    start_nonce (random by default).
+
+    The search ends when a solution is found, after timeout seconds, or when
+    the optional multiprocessing stop event is set by the caller. The result
+    always reports the number of hashes computed and the hashrate.
+    """
+
+    prefix = mining_prefix(challenge, address)
+    processes = processes or os.cpu_count() or 1
+    if start_nonce is None:
+        start_nonce = random.getrandbits(255)
+    stop = stop or multiprocessing.Event()
+    results = multiprocessing.Queue()
+
+    started = time.perf_counter()
+    workers = [multiprocessing.Process(target=_search_worker,
+                                       args=(prefix, target, start_nonce, worker, processes,
+                                             batch_size, stop, results),
+                                       daemon=True)
+               for worker in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    nonce = digest = None
+    hashes = 0
+    try:
+        for _ in workers:
+            try:
+                found_nonce, found_digest, worker_hashes = results.get(timeout=timeout)
+            except queue.Empty:
+                stop.set()
+                found_nonce, found_digest, worker_hashes = results.get()
+            hashes += worker_hashes
+            if found_nonce is not None and nonce is None:
+                nonce, digest = found_nonce, found_digest
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    result = MiningResult(nonce, digest, hashes, time.perf_counter() - started)
+    _HASHES.inc(hashes)
+    _SEARCH_SECONDS.inc(result.elapsed)
+    _SOLUTIONS.inc(result.found)
+    return result
+
+
+def mine_for_token(token, account, target=None, **kwargs):
+    """
+    Find a nonce that account can pass to token.mint with the current challenge,
+    below target, by default the token's mining target.
+    """
+
+    if target is None:
+        target = token.getMiningTarget()
+    return mine(token.getChallengeNumber(), account, target, **kwargs)
@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts import metrics
+from scripts.miner import mine
+from scripts.rpc import MINT_TOPIC, RpcClient, TokenStateReader, decode_mint_log, encode_call
+
+# Event-driven mining loop.
+#
+# Every mint replaces the challenge number, so work on the old challenge is
+# wasted from the moment a Mint event is mined. The controller polls the Mint
+# logs of all tokens with one eth_getLogs request, stops the nonce search of a
+# token as soon as its challenge changes and restarts it on the new challenge.
+# Solutions are submitted from a worker thread while the other searches go on.
+
+
+# hashes spent on a challenge after the Mint that replaced it was seen, estimated
+# from the search's hashrate, since the workers don't report when each hash was made
+_STALE_HASHES = metrics.counter("controller_stale_hashes_total",
+                                "Hashes computed on a challenge after the Mint that replaced it was seen")
+_RESTART_TIME = metrics.timer("controller_restart_seconds",
+                              "Time from seeing a Mint until the search on the new challenge is started")
+_MINTS = metrics.counter("controller_mints_total", "Mint events seen")
+_SUBMISSIONS = metrics.counter("controller_submissions_total", "Solutions submitted")
+_SUBMISSION_ERRORS = metrics.counter("controller_submission_errors_total", "Submissions that raised")
+
+
+def rpc_submitter(endpoint, sender, gas=200000):
+    """
+    A submit function sending mint(nonce) with eth_sendTransaction, for nodes that
+    hold the sender's key (such as ganache). Each call opens its own connection,
+    so submissions can run on several threads.
+    """
+
+    def submit(address, nonce, digest):
+        client = RpcClient(endpoint)
+        try:
+            return client.call("eth_sendTransaction", [{"from": sender, "to": address, "gas": hex(gas),
+                                                        "data": encode_call("mint(uint256)", nonce)}])
+        finally:
+            client.close()
+    return submit
+
+
+class _Search:
+
+    def __init__(self, challenge, target):
+        self.challenge = challenge
+        self.target = target
+        self.stop = multiprocessing.Event()
+        self.future = None
+        self.timeout = None
+
+
+class MiningController:
+    """
+    Mines the tokens given as {name: address} for `account`.
+
+    submit(address, nonce, digest) is called on a worker thread for every
+    solution. After a solution has been submitted the token is left alone
+    until its challenge changes, since a second solution for the same
+    challenge could only revert. If the submission raises, or no Mint
+    follows within submission_timeout seconds because the transaction was
+    dropped, the challenge is searched again.
+
+    stale_work holds, for every challenge change, the seconds from the poll
+    that returned the Mint until the old search has stopped and the new one
+    is started. Detection itself lags the Mint block by at most poll_interval
+    plus one round-trip.
+    """
+
+    def __init__(self, client, tokens, account, submit, processes=None, poll_interval=0.5,
+                 batch_size=1024, submission_timeout=120):
+        self.client = client
+        self.tokens = {name: address.lower() for name, address in tokens.items()}
+        self.names = {address: name for name, address in self.tokens.items()}
+        self.account = account
+        self.submit = submit
+        self.processes = processes or max(1, (os.cpu_count() or 1) // len(self.tokens))
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.submission_timeout = submission_timeout
+        self.reader = TokenStateReader(client, self.tokens)
+
+        self.searches = {}
+        self.submitted = {}
+        self.mints = []
+        self.solutions = []
+        self.stale_work = []
+        self.errors = []
+        self._next_block = None
+        self._executor = ThreadPoolExecutor(2 * len(self.tokens) + 2)
+        self._submissions = set()
+
+    async def _in_thread(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _poll(self):
+        block_number, logs = self.client.batch([
+            ("eth_blockNumber", []),
+            ("eth_getLogs", [{"address": list(self.tokens.values()), "topics": [MINT_TOPIC],
+                              "fromBlock": hex(self._next_block), "toBlock": "latest"}]),
+        ])
+        events = [decode_mint_log(log) for log in logs]
+        last_block = max([int(block_number, 16)] + [event["blockNumber"] for event in events])
+        self._next_block = last_block + 1
+        return events
+
+    def _start_search(self, name, challenge, target):
+        search = _Search(challenge, target)
+        search.future = asyncio.ensure_future(self._in_thread(functools.partial(
+            mine, challenge, self.account, target, self.processes,
+            batch_size=self.batch_size, stop=search.stop)))
+        search.future.add_done_callback(functools.partial(self._on_search_done, name, search))
+        self.searches[name] = search
+
+    def _on_search_done(self, name, search, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.errors.append(future.exception())
+            return
+        result = future.result()
+        if not result.found or self.searches.get(name) is not search:
+            return
+        self.solutions.append((name, search.challenge, result))
+        self.submitted[name] = search.challenge
+        search.timeout = asyncio.get_running_loop().call_later(self.submission_timeout, self._retry, name,
+                                                              search)
+        task = asyncio.ensure_future(self._submit(name, search, result))
+        self._submissions.add(task)
+        task.add_done_callback(self._submissions.discard)
+
+    async def _submit(self, name, search, result):
+        _SUBMISSIONS.inc()
+        try:
+            await self._in_thread(self.submit, self.tokens[name], result.nonce, result.digest)
+        except Exception as error:
+            _SUBMISSION_ERRORS.inc()
+            self.errors.append(error)
+            self._retry(name, search)
+
+    def _retry(self, name, search):
+        # the solution didn't make it into a block, unless a Mint has replaced the search since
+        search.timeout.cancel()
+        if self.searches.get(name) is search and self.submitted.get(name) == search.challenge:
+            del self.submitted[name]
+            self._start_search(name, search.challenge, search.target)
+
+    async def _stop_search(self, name):
+        """Stop the token's search and return its MiningResult, or None if it didn't finish."""
+
+        search = self.searches.pop(name, None)
+        if search is None:
+            return None
+        if search.timeout is not None:
+            search.timeout.cancel()
+        search.stop.set()
+        await asyncio.wait([search.future])
+        if search.future.cancelled() or search.future.exception() is not None:
+            return None
+        return search.future.result()
+
+    async def _restart(self, name, states, seen):
+        state = states[name]
+        result = await self._stop_search(name)
+        if result is not None and not result.found:
+            # the block timestamp is on the chain's clock, which a local chain can
+            # move at will, so only the work after the Mint was seen is counted
+            stale_time = min(time.perf_counter() - seen, result.elapsed)
+            _STALE_HASHES.inc(int(result.hashrate * stale_time))
+        if self.submitted.get(name) != state.challengeNumber:
+            self._start_search(name, state.challengeNumber, state.miningTarget)
+        self.stale_work.append(time.perf_counter() - seen)
+        _RESTART_TIME.observe(self.stale_work[-1])
+
+    async def run(self, duration=None, until=None):
+        """
+        Mine until `duration` seconds have passed or until() returns true, checked
+        after every poll.
+        """
+
+        started = time.perf_counter()
+        block_number, states = await self._in_thread(self.reader.read)
+        self._next_block = block_number + 1
+        for name, state in states.items():
+            self._start_search(name, state.challengeNumber, state.miningTarget)
+
+        try:
+            while not (duration is not None and time.perf_counter() - started > duration
+                       or until is not None and until()):
+                await asyncio.sleep(self.poll_interval)
+                events = await self._in_thread(self._poll)
+                if not events:
+                    continue
+                seen = time.perf_counter()
+                self.mints.extend(events)
+                _MINTS.inc(len(events))
+                _, states = await self._in_thread(self.reader.read)
+                await asyncio.gather(*(self._restart(name, states, seen)
+                                       for name in {self.names[event["address"]] for event in events}))
+        finally:
+            await asyncio.gather(*(self._stop_search(name) for name in list(self.searches)))
+            if self._submissions:
+                await asyncio.wait(self._submissions)
@@ -0,0 +1,206 @@
+import json
+import os
+
+import numpy as np
+
+from scripts.rpc import MINT_TOPIC, RpcError, decode_mint_log
+
+# An on-disk index of the Mint events of the seasonal tokens.
+#
+# Events are fetched with eth_getLogs in block ranges and appended to
+# mints.bin, a flat file of fixed-size records that is read back with
+# numpy.memmap. Reward amounts are split into two uint64 words, since a mint
+# of 72 rewards is worth more than 2**64 wei, and miners are stored as indexes
+# into addresses.txt, one address per line in order of first appearance.
+# state.json records the tokens, the number of complete records and the next
+# block to index, and is replaced only after the records have been written,
+# so an interrupted update resumes from the last complete chunk.
+
+
+RECORD = np.dtype([
+    ("block", "<u8"),
+    ("log_index", "<u4"),
+    ("token", "<u1"),
+    ("miner", "<u4"),
+    ("timestamp", "<u8"),
+    ("reward_high", "<u8"),
+    ("reward_low", "<u8"),
+    ("epoch_count", "<u8"),
+    ("challenge", "V32"),
+])
+
+
+class MintIndex:
+    """
+    The Mint events of `tokens` ({name: address}) stored in `directory`.
+
+    An existing index is reopened; its tokens must then match `tokens` if
+    given. Indexing starts from start_block for a new index.
+    """
+
+    def __init__(self, directory, tokens=None, start_block=0):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        state = self._read_json("state.json")
+        if state is None:
+            if tokens is None:
+                raise ValueError("No index in %s and no tokens given" % directory)
+            state = {"tokens": {name: address.lower() for name, address in tokens.items()},
+                     "records": 0, "next_block": start_block}
+        elif tokens is not None and state["tokens"] != {name: address.lower()
+                                                        for name, address in tokens.items()}:
+            raise ValueError("Index in %s holds different tokens" % directory)
+        self.tokens = state["tokens"]
+        self.next_block = state["next_block"]
+        self._records = state["records"]
+        self._token_ids = {address: i for i, address in enumerate(self.tokens.values())}
+
+        self.addresses = []
+        if os.path.exists(self._path("addresses.txt")):
+            with open(self._path("addresses.txt")) as f:
+                self.addresses = f.read().split()
+        self._address_ids = {address: i for i, address in enumerate(self.addresses)}
+
+        # drop anything written after the last recorded state
+        with open(self._path("mints.bin"), "ab") as f:
+            f.truncate(self._records * RECORD.itemsize)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_json(self, name):
+        if not os.path.exists(self._path(name)):
+            return None
+        with open(self._path(name)) as f:
+            return json.load(f)
+
+    def _write_state(self):
+        temporary = self._path("state.json.tmp")
+        with open(temporary, "w") as f:
+            json.dump({"tokens": self.tokens, "records": self._records,
+                       "next_block": self.next_block}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._path("state.json"))
+
+    def __len__(self):
+        return self._records
+
+    def _address_id(self, address, new_addresses):
+        if address not in self._address_ids:
+            self._address_ids[address] = len(self.addresses)
+            self.addresses.append(address)
+            new_addresses.append(address)
+        return self._address_ids[address]
+
+    def append(self, events, timestamps, next_block):
+        """
+        Append decoded Mint events (see decode_mint_log), with timestamps
+        mapping block numbers to block times, and record that every block
+        before next_block has been indexed.
+        """
+
+        events = sorted(events, key=lambda event: (event["blockNumber"], event["logIndex"]))
+        new_addresses = []
+        records = np.zeros(len(events), dtype=RECORD)
+        for record, event in zip(records, events):
+            reward = event["rewardAmount"]
+            record["block"] = event["blockNumber"]
+            record["log_index"] = event["logIndex"]
+            record["token"] = self._token_ids[event["address"]]
+            record["miner"] = self._address_id(event["from"], new_addresses)
+            record["timestamp"] = timestamps[event["blockNumber"]]
+            record["reward_high"] = reward >> 64
+            record["reward_low"] = reward & (2**64 - 1)
+            record["epoch_count"] = event["epochCount"]
+            record["challenge"] = event["newChallengeNumber"]
+
+        if new_addresses:
+            with open(self._path("addresses.txt"), "a") as f:
+                f.write("".join(address + "\n" for address in new_addresses))
+        with open(self._path("mints.bin"), "ab") as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._records += len(records)
+        self.next_block = next_block
+        self._write_state()
+
+    def _fetch(self, client, from_block, to_block):
+        logs = client.call("eth_getLogs", [{"address": list(self.tokens.values()),
+                                            "topics": [MINT_TOPIC],
+                                            "fromBlock": hex(from_block), "toBlock": hex(to_block)}])
+        events = [decode_mint_log(log) for log in logs]
+        blocks = sorted({event["blockNumber"] for event in events})
+        headers = client.batch([("eth_getBlockByNumber", [hex(block), False]) for block in blocks])
+        return events, {block: int(header["timestamp"], 16) for block, header in zip(blocks, headers)}
+
+    def update(self, client, to_block=None, chunk_size=2000, confirmations=0):
+        """
+        Index the blocks from next_block up to to_block (by default the latest
+        block less `confirmations`) in chunks of at most chunk_size blocks. The
+        chunk is halved when the node refuses a range as too large. Returns the
+        number of new mints.
+        """
+
+        if to_block is None:
+            to_block = int(client.call("eth_blockNumber"), 16) - confirmations
+        added = 0
+        while self.next_block <= to_block:
+            last = min(self.next_block + chunk_size - 1, to_block)
+            try:
+                events, timestamps = self._fetch(client, self.next_block, last)
+            except RpcError:
+                if chunk_size == 1:
+                    raise
+                chunk_size = max(1, chunk_size // 2)
+                continue
+            self.append(events, timestamps, last + 1)
+            added += len(events)
+        return added
+
+    # queries
+
+    def records(self):
+        """All records as a read-only memory map."""
+
+        if not self._records:
+            return np.zeros(0, dtype=RECORD)
+        return np.memmap(self._path("mints.bin"), dtype=RECORD, mode="r", shape=(self._records,))
+
+    def token_id(self, token):
+        return list(self.tokens).index(token)
+
+    def _select(self, token):
+        records = self.records()
+        if token is None:
+            return records
+        return records[records["token"] == self.token_id(token)]
+
+    def rewards(self, token=None):
+        """Exact reward amounts as an object array of python integers."""
+
+        records = self._select(token)
+        return (records["reward_high"].astype(object) << 64) + records["reward_low"].astype(object)
+
+    def rewards_per_miner(self, token=None):
+        """{miner address: total reward in wei}, summed exactly with uint64 arrays."""
+
+        records = self._select(token)
+        sums = np.zeros((3, len(self.addresses)), dtype=np.uint64)
+        low = records["reward_low"]
+        # 32 bit halves can be summed in uint64 without overflow for 2**32 records
+        for row, column in enumerate((records["reward_high"], low >> np.uint64(32),
+                                      low & np.uint64(2**32 - 1))):
+            np.add.at(sums[row], records["miner"], column)
+        return {self.addresses[miner]: (int(sums[0, miner]) << 64) + (int(sums[1, miner]) << 32)
+                + int(sums[2, miner])
+                for miner in np.flatnonzero(np.bincount(records["miner"], minlength=len(self.addresses)))}
+
+    def intervals(self, token):
+        """Seconds between consecutive mints of a token."""
+
+        return np.diff(self._select(token)["timestamp"].astype(np.int64))
+
+    def interval_histogram(self, token, bins=50, range=None):
+        return np.histogram(self.intervals(token), bins=bins, range=range)
@@ -0,0 +1,368 @@
+import random
+
+from Crypto.Hash import keccak
+
+from scripts.simulation import adjust_difficulty, reward_era
+
+# Pure-Python reference model of the SpringToken contract.
+#
+# The model mirrors the contract's uint256 arithmetic, including the checked
+# overflow and underflow of solidity 0.8, so that it can stand in for a
+# deployed contract when simulating millions of mints. Times are passed in
+# explicitly where the contract would use block.timestamp.
+
+
+UINT256_MAX = 2**256 - 1
+ZERO_ADDRESS = "0x" + "0" * 40
+
+
+class Revert(Exception):
+    """Raised where the contract would revert, with brownie's revert message."""
+
+
+def _add(a, b):
+    if a + b > UINT256_MAX:
+        raise Revert("Integer overflow")
+    return a + b
+
+
+def _sub(a, b):
+    if b > a:
+        raise Revert("Integer overflow")
+    return a - b
+
+
+def _mul(a, b):
+    if a * b > UINT256_MAX:
+        raise Revert("Integer overflow")
+    return a * b
+
+
+def _div(a, b):
+    if b == 0:
+        raise Revert("Division or modulo by zero")
+    return a // b
+
+
+def _address(value):
+    if hasattr(value, 'address'):
+        value = value.address
+    return value.lower()
+
+
+class SpringTokenModel:
+
+    SYMBOL = "SPRING"
+    NAME = "Spring Token"
+    TOKEN_IDENTIFIER = 1
+    DECIMALS = 18
+    TOTAL_SUPPLY = 33112800 * 10**18
+    INITIAL_REWARD = 168 * 10**18
+    MAX_REWARDS_AVAILABLE = 72
+    REWARD_INTERVAL = 600
+    DURATION_OF_FIRST_ERA = (365 * 24 * 60 * 60 * 3) // 4
+    DURATION_OF_ERA = 3 * 365 * 24 * 60 * 60
+    MINIMUM_TARGET = 2**16
+    MAXIMUM_TARGET = 2**234
+
+    def __init__(self, contract_creation_time, owner=ZERO_ADDRESS, address=None, blockhash=0):
+        self.owner = _address(owner)
+        self.address = address and _address(address)
+        self.mining_target = self.MAXIMUM_TARGET // 2**19
+        self.contract_creation_time = contract_creation_time
+        self.last_reward_block_time = contract_creation_time
+        self.max_number_of_rewards_per_mint = 1
+        self.tokens_minted = 0
+        self.balances = {}
+        self.allowed = {}
+        self.challenge_number = self._get_new_challenge_number(0, blockhash)
+
+    @classmethod
+    def from_contract(cls, token):
+        """A model holding the current state of a deployed token. Balances are not copied."""
+
+        model = cls(token.contractCreationTime(), token.owner(), token.address)
+        model.mining_target = token.getMiningTarget()
+        model.last_reward_block_time = token.lastRewardBlockTime()
+        model.max_number_of_rewards_per_mint = token.maxNumberOfRewardsPerMint()
+        model.tokens_minted = token.tokensMinted()
+        model.challenge_number = int.from_bytes(bytes(token.getChallengeNumber()), 'big')
+        return model
+
+    # mining
+
+    def digest(self, sender, nonce):
+        message = (self.challenge_number.to_bytes(32, 'big')
+                   + bytes.fromhex(_address(sender)[2:]) + nonce.to_bytes(32, 'big'))
+        return int.from_bytes(keccak.new(data=message, digest_bits=256).digest(), 'big')
+
+    def mint(self, sender, nonce, timestamp, blockhash=0):
+        """mint(nonce) sent by sender in a block with the given timestamp and parent hash."""
+
+        return self.mint_digest(sender, self.digest(sender, nonce), timestamp, blockhash)
+
+    def mint_legacy(self, sender, nonce, challenge_digest, timestamp, blockhash=0):
+        """Backwards compatible mint(nonce, challengeDigest)."""
+
+        if self.digest(sender, nonce) != challenge_digest:
+            raise Revert("Challenge digest does not match expected digest on token contract")
+        return self.mint(sender, nonce, timestamp, blockhash)
+
+    def mint_digest(self, sender, digest, timestamp, blockhash=0):
+        """
+        The body of mint(nonce) for an already computed digest, so that simulations
+        can draw digests directly instead of hashing. Returns the total reward.
+        """
+
+        last_reward_block_time = self.last_reward_block_time
+        single_reward_amount = self.get_mining_reward_at(last_reward_block_time)
+
+        if single_reward_amount == 0:
+            raise Revert("Reward has reached zero")
+
+        mining_target = self.mining_target
+        if digest > mining_target:
+            raise Revert("Digest is larger than mining target")
+
+        previous_max_number_of_rewards = self.max_number_of_rewards_per_mint
+        number_of_rewards_to_give = self.number_of_rewards_to_give(
+            _div(mining_target, digest), last_reward_block_time,
+            previous_max_number_of_rewards, timestamp)
+        total_reward_amount = _mul(single_reward_amount, number_of_rewards_to_give)
+
+        # a revert rolls back the whole call, so nothing is written until every check has passed
+        sender = _address(sender)
+        balance = _add(self.balances.get(sender, 0), total_reward_amount)
+        tokens_minted = _add(self.tokens_minted, total_reward_amount)
+
+        mining_target = self.adjust_difficulty(mining_target, last_reward_block_time,
+                                               number_of_rewards_to_give, timestamp)
+
+        self.balances[sender] = balance
+        self.tokens_minted = tokens_minted
+
+        self._set_next_max_number_of_rewards(number_of_rewards_to_give,
+                                             previous_max_number_of_rewards)
+
+        self.mining_target = mining_target
+
+        self.challenge_number = self._get_new_challenge_number(tokens_minted, blockhash)
+
+        self.last_reward_block_time = timestamp
+
+        return total_reward_amount
+
+    def number_of_rewards_available(self, last_reward_block_time, previous_max_number_of_rewards,
+                                    current_time):
+        number_available = previous_max_number_of_rewards
+        intervals_since_last_reward = _sub(current_time, last_reward_block_time) // self.REWARD_INTERVAL
+
+        if intervals_since_last_reward > number_available:
+            number_available = intervals_since_last_reward
+
+        if number_available > self.MAX_REWARDS_AVAILABLE:
+            number_available = self.MAX_REWARDS_AVAILABLE
+
+        return number_available
+
+    def number_of_rewards_to_give(self, number_earned, last_reward_block_time,
+                                  previous_max_number_of_rewards, current_time):
+        number_available = self.number_of_rewards_available(last_reward_block_time,
+                                                            previous_max_number_of_rewards,
+                                                            current_time)
+        return min(number_earned, number_available)
+
+    def _set_next_max_number_of_rewards(self, number_of_rewards_given_now,
+                                        previous_max_number_of_rewards):
+        if number_of_rewards_given_now != previous_max_number_of_rewards:
+            self.max_number_of_rewards_per_mint = number_of_rewards_given_now
+
+    def _get_new_challenge_number(self, tokens_minted, blockhash):
+        return blockhash ^ tokens_minted ^ self.TOKEN_IDENTIFIER
+
+    def scheduled_number_of_rewards(self, current_time):
+        return _sub(current_time, self.contract_creation_time) // self.REWARD_INTERVAL
+
+    def adjust_difficulty(self, mining_target, last_reward_block_time, rewards_given_now,
+                          current_time):
+        time_since_last_reward = _sub(current_time, last_reward_block_time)
+        slow_down = (_mul(time_since_last_reward, 88)
+                     < _mul(_mul(rewards_given_now, self.REWARD_INTERVAL), 61))
+        _mul(mining_target, 99 if slow_down else 100)
+        return adjust_difficulty(mining_target, last_reward_block_time, rewards_given_now,
+                                 current_time, self.MINIMUM_TARGET, self.MAXIMUM_TARGET)
+
+    def reward_era(self, time):
+        return reward_era(_sub(time, self.contract_creation_time), self.DURATION_OF_FIRST_ERA,
+                          self.DURATION_OF_ERA)
+
+    def get_mining_reward_at(self, time):
+        """_getMiningReward"""
+
+        era = self.reward_era(time)
+        if era > 255:
+            raise Revert("Integer overflow")
+        return self.INITIAL_REWARD // 2**era
+
+    # views
+
+    def get_adjustment_interval(self):
+        return _mul(self.REWARD_INTERVAL, self.max_number_of_rewards_per_mint)
+
+    def get_mining_difficulty(self):
+        return _div(UINT256_MAX, self.mining_target)
+
+    def get_mining_reward(self):
+        return self.get_mining_reward_at(self.last_reward_block_time)
+
+    def get_number_of_rewards_available(self, current_time):
+        return self.number_of_rewards_available(self.last_reward_block_time,
+                                                self.max_number_of_rewards_per_mint,
+                                                current_time)
+
+    def get_reward_amount_for_achieving_target(self, target_achieved, current_time):
+        number_of_rewards_to_give = self.number_of_rewards_to_give(
+            _div(self.mining_target, target_achieved), self.last_reward_block_time,
+            self.max_number_of_rewards_per_mint, current_time)
+        return _mul(self.get_mining_reward_at(current_time), number_of_rewards_to_give)
+
+    def total_supply(self):
+        return self.tokens_minted
+
+    # ERC20
+
+    def balance_of(self, token_owner):
+        return self.balances.get(_address(token_owner), 0)
+
+    def allowance(self, token_owner, spender):
+        return self.allowed.get((_address(token_owner), _address(spender)), 0)
+
+    def _check_recipient(self, to):
+        if _address(to) == ZERO_ADDRESS or _address(to) == self.address:
+            raise Revert("Invalid address")
+
+    def transfer(self, sender, to, tokens):
+        self._check_transfer_recipient(to)
+        sender, to = _address(sender), _address(to)
+        # a revert rolls back the whole call, so nothing is written until every check has passed
+        sender_balance = _sub(self.balances.get(sender, 0), tokens)
+        to_balance = _add(sender_balance if to == sender else self.balances.get(to, 0), tokens)
+        self.balances[sender] = sender_balance
+        self.balances[to] = to_balance
+        return True
+
+    _check_transfer_recipient = _check_recipient
+
+    def approve(self, sender, spender, tokens):
+        self._check_recipient(spender)
+        self.allowed[(_address(sender), _address(spender))] = tokens
+        return True
+
+    def safe_approve(self, sender, spender, previous_allowance, new_allowance):
+        if self.allowance(sender, spender) != previous_allowance:
+            raise Revert("Current spender allowance does not match specified value")
+        return self.approve(sender, spender, new_allowance)
+
+    def transfer_from(self, sender, from_, to, tokens):
+        self._check_recipient(to)
+        sender, from_, to = _address(sender), _address(from_), _address(to)
+        from_balance = _sub(self.balances.get(from_, 0), tokens)
+        allowance = _sub(self.allowed.get((from_, sender), 0), tokens)
+        to_balance = _add(from_balance if to == from_ else self.balances.get(to, 0), tokens)
+        self.balances[from_] = from_balance
+        self.allowed[(from_, sender)] = allowance
+        self.balances[to] = to_balance
+        return True
+
+
+class TestSpringTokenModel(SpringTokenModel):
+    """Model of TestSpringToken, with its higher MINIMUM_TARGET, setters and transfers to itself."""
+
+    MINIMUM_TARGET = (2**233 * 9) // 13
+
+    def _check_transfer_recipient(self, to):
+        if _address(to) == ZERO_ADDRESS:
+            raise Revert("Invalid address")
+
+    def set_max_number_of_rewards(self, max_number_of_rewards):
+        self.max_number_of_rewards_per_mint = max_number_of_rewards
+
+    def set_mining_target(self, mining_target):
+        self.mining_target = mining_target
+
+    def set_challenge_number(self, challenge_number):
+        self.challenge_number = challenge_number
+
+    def set_balance(self, address, balance):
+        self.balances[_address(address)] = balance
+
+
+# differential testing against a deployed TestSpringToken
+
+def _random_inputs(rng, model):
+    start = model.contract_creation_time
+    year = 365 * 24 * 60 * 60
+    time = lambda: start + rng.choice([rng.randrange(0, 3 * 600),
+                                       rng.randrange(0, 300 * year),
+                                       rng.randrange(0, 2**40)])
+    count = lambda: rng.choice([0, 1, 2, rng.randrange(0, 100), rng.randrange(0, 2**64)])
+    target = lambda: rng.choice([rng.randrange(1, 2**256), 2**rng.randrange(0, 256),
+                                 model.MAXIMUM_TARGET + rng.randrange(-2, 3),
+                                 model.MINIMUM_TARGET + rng.randrange(-2, 3)])
+    return {
+        '_numberOfRewardsAvailable': lambda: (time(), count(), time()),
+        '_numberOfRewardsToGive': lambda: (count(), time(), count(), time()),
+        '_adjustDifficulty': lambda: (target(), time(), count() % 100, time()),
+        '_scheduledNumberOfRewards': lambda: (time(),),
+        'rewardEra': lambda: (time(),),
+        '_getMiningReward': lambda: (time(),),
+        'getNumberOfRewardsAvailable': lambda: (time(),),
+        'getRewardAmountForAchievingTarget': lambda: (target(), time()),
+    }
+
+
+def _model_function(model, name):
+    return {
+        '_numberOfRewardsAvailable': model.number_of_rewards_available,
+        '_numberOfRewardsToGive': model.number_of_rewards_to_give,
+        '_adjustDifficulty': model.adjust_difficulty,
+        '_scheduledNumberOfRewards': model.scheduled_number_of_rewards,
+        'rewardEra': model.reward_era,
+        '_getMiningReward': model.get_mining_reward_at,
+        'getNumberOfRewardsAvailable': model.get_number_of_rewards_available,
+        'getRewardAmountForAchievingTarget': model.get_reward_amount_for_achieving_target,
+    }[name]
+
+
+def evaluate(function, *args):
+    """Call function and return ('ok', value) or ('revert', None)."""
+
+    try:
+        return 'ok', function(*args)
+    except Revert:
+        return 'revert', None
+    except Exception as error:
+        # brownie raises VirtualMachineError when a call reverts
+        if type(error).__name__ == 'VirtualMachineError':
+            return 'revert', None
+        raise
+
+
+def differential_check(token, samples=100, seed=None, model=None):
+    """
+    Compare the model with a deployed TestSpringToken on randomly sampled inputs
+    to the public test functions and views. Returns a list of
+    (function name, arguments, contract outcome, model outcome) mismatches.
+    """
+
+    model = model or TestSpringTokenModel.from_contract(token)
+    rng = random.Random(seed)
+    mismatches = []
+    for name, draw in _random_inputs(rng, model).items():
+        for _ in range(samples):
+            args = draw()
+            expected = evaluate(getattr(token, name), *args)
+            actual = evaluate(_model_function(model, name), *args)
+            if expected != actual:
+                mismatches.append((name, args, expected, actual))
+    return mismatches
@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+
+import numpy as np
+
+from scripts.simulation import MAXIMUM_TARGET, MINIMUM_TARGET, YEAR, simulate_mining_intervals
+
+# Replicated runs of the difficulty simulation spread over a process pool.
+#
+# Replicates are grouped into tasks of a fixed size and every task draws from
+# its own child of a single numpy SeedSequence, so a given seed produces the
+# same results on any machine and whatever the number of worker processes. A
+# task costs about as much for one chain as for a few dozen, since the chains
+# step together, so small groups would add work without shortening the run.
+#
+# The confidence interval uses the Student-t quantile with n - 1 degrees of
+# freedom: with a few tens of replicates the normal quantile understates it.
+
+
+CHAINS_PER_TASK = 8
+
+
+def student_t_quantile(confidence, degrees_of_freedom):
+    """t such that P(|T| < t) = confidence for T Student-t distributed with integer degrees of freedom."""
+
+    def probability(t):
+        # Abramowitz & Stegun 26.7.3 and 26.7.4
+        theta = math.atan(t / math.sqrt(degrees_of_freedom))
+        cos2 = math.cos(theta) ** 2
+        if degrees_of_freedom % 2:
+            term, total, k = math.cos(theta), 0., 1
+            while k < degrees_of_freedom - 1:
+                total += term
+                term *= cos2 * (k + 1) / (k + 2)
+                k += 2
+            return 2 / math.pi * (theta + math.sin(theta) * total)
+        term, total, k = 1., 0., 0
+        while k < degrees_of_freedom - 1:
+            total += term
+            term *= cos2 * (k + 1) / (k + 2)
+            k += 2
+        return math.sin(theta) * total
+
+    low, high = 0., 1.
+    while probability(high) < confidence:
+        low, high = high, 2 * high
+    for _ in range(100):
+        middle = (low + high) / 2
+        if probability(middle) < confidence:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+class MonteCarloResult:
+
+    def __init__(self, mean_intervals, counts, confidence=0.95):
+        self.mean_intervals = mean_intervals
+        self.counts = counts
+        self.confidence = confidence
+
+    @property
+    def replicates(self):
+        return len(self.mean_intervals)
+
+    @property
+    def mean_interval(self):
+        return self.mean_intervals.mean()
+
+    @property
+    def standard_error(self):
+        return self.mean_intervals.std(ddof=1) / np.sqrt(self.replicates)
+
+    @property
+    def confidence_interval(self):
+        t = student_t_quantile(self.confidence, self.replicates - 1)
+        return (self.mean_interval - t * self.standard_error,
+                self.mean_interval + t * self.standard_error)
+
+
+def _run_task(arguments):
+    hashpower_function, initial_target, n_chains, time_limit, seed, limits = arguments
+    result = simulate_mining_intervals(hashpower_function, initial_target, n_chains, time_limit,
+                                       seed, minimum_target=limits[0], maximum_target=limits[1])
+    return result.mean_interval, result.count
+
+
+def run_replicates(hashpower_function, initial_target, replicates, time_limit=2 * YEAR, seed=0,
+                   processes=None, confidence=0.95, minimum_target=MINIMUM_TARGET,
+                   maximum_target=MAXIMUM_TARGET, chains_per_task=CHAINS_PER_TASK):
+    """
+    Run independent replicate simulations of the same hashpower function and
+    report the mean interval of each replicate together with a confidence
+    interval for their mean.
+
+    hashpower_function must be picklable (a module level function) when more
+    than one process is used. processes defaults to the number of CPUs.
+    """
+
+    if replicates < 2:
+        raise ValueError("At least two replicates are needed for a confidence interval")
+
+    sizes = [chains_per_task] * (replicates // chains_per_task)
+    if replicates % chains_per_task:
+        sizes.append(replicates % chains_per_task)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(hashpower_function, initial_target, size, time_limit, task_seed,
+              (minimum_target, maximum_target))
+             for size, task_seed in zip(sizes, seeds)]
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes == 1:
+        results = [_run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_run_task, tasks))
+
+    mean_intervals = np.concatenate([mean_interval for mean_interval, _ in results])
+    counts = np.concatenate([count for _, count in results])
+    return MonteCarloResult(mean_intervals, counts, confidence)
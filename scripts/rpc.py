@@ -0,0 +1,271 @@
+import http.client
+import json
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from Crypto.Hash import keccak
+
+from scripts import metrics
+
+# Batched JSON-RPC reads of seasonal token state.
+#
+# Every view call the miners and monitoring need, for all four tokens, is sent
+# as one JSON-RPC batch over a persistent HTTP connection, and the decoded
+# results are cached by block number.
+
+
+TOKEN_VIEWS = {
+    "miningTarget": ("getMiningTarget()", "uint256"),
+    "challengeNumber": ("getChallengeNumber()", "bytes32"),
+    "miningReward": ("getMiningReward()", "uint256"),
+    "lastRewardBlockTime": ("lastRewardBlockTime()", "uint256"),
+    "maxNumberOfRewardsPerMint": ("maxNumberOfRewardsPerMint()", "uint256"),
+    "tokensMinted": ("tokensMinted()", "uint256"),
+}
+
+# Methods that don't change the state of the chain, which can be sent again if
+# the connection drops before the answer arrives. A dropped eth_sendTransaction
+# may already have been submitted.
+READ_ONLY_METHODS = frozenset([
+    "eth_blockNumber", "eth_call", "eth_chainId", "eth_estimateGas", "eth_gasPrice", "eth_getBalance",
+    "eth_getBlockByHash", "eth_getBlockByNumber", "eth_getCode", "eth_getLogs", "eth_getStorageAt",
+    "eth_getTransactionByHash", "eth_getTransactionCount", "eth_getTransactionReceipt", "net_version",
+])
+
+_BATCH_TIME = metrics.timer("rpc_batch_seconds", "Round-trip time of JSON-RPC batches")
+_REQUESTS = metrics.counter("rpc_requests_total", "JSON-RPC requests sent, counting each request of a batch")
+_ERRORS = metrics.counter("rpc_errors_total", "JSON-RPC requests answered with an error")
+
+
+class RpcError(Exception):
+    pass
+
+
+def keccak256(data):
+    return keccak.new(data=data, digest_bits=256).digest()
+
+
+def function_selector(signature):
+    return keccak256(signature.encode())[:4]
+
+
+def encode_word(value):
+    """ABI-encode a uint256, bytes32 or address as one 32 byte word."""
+
+    if isinstance(value, int):
+        return value.to_bytes(32, 'big')
+    if hasattr(value, 'address'):
+        value = value.address
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value).rjust(32, b'\0')
+
+
+def encode_call(signature, *args):
+    """Calldata for a function taking only static 32 byte arguments, as a 0x hex string."""
+
+    return "0x" + (function_selector(signature) + b"".join(map(encode_word, args))).hex()
+
+
+def decode_word(data, kind="uint256"):
+    data = bytes.fromhex(data[2:]) if isinstance(data, str) else data
+    if len(data) < 32:
+        raise RpcError("Call returned %d bytes, expected a 32 byte word" % len(data))
+    word = data[:32]
+    if kind == "bytes32":
+        return word
+    if kind == "address":
+        return "0x" + word[12:].hex()
+    if kind == "bool":
+        return word != bytes(32)
+    return int.from_bytes(word, 'big')
+
+
+MINT_TOPIC = "0x" + keccak256(b"Mint(address,uint256,uint256,bytes32)").hex()
+
+
+def decode_mint_log(log):
+    data = bytes.fromhex(log["data"][2:])
+    return {
+        "address": log["address"].lower(),
+        "from": "0x" + log["topics"][1][-40:],
+        "rewardAmount": decode_word(data[0:32]),
+        "epochCount": decode_word(data[32:64]),
+        "newChallengeNumber": decode_word(data[64:96], "bytes32"),
+        "blockNumber": int(log["blockNumber"], 16),
+        "logIndex": int(log["logIndex"], 16),
+        "transactionHash": log["transactionHash"],
+    }
+
+
+def block_tag(block):
+    return block if isinstance(block, str) else hex(block)
+
+
+class RpcClient:
+    """A JSON-RPC client over a single keep-alive HTTP connection."""
+
+    def __init__(self, endpoint, timeout=30):
+        url = urlparse(endpoint)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.path = url.path or "/"
+        self.https = url.scheme == "https"
+        self.timeout = timeout
+        self._connection = None
+        self._next_id = 0
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, payload, retry=True):
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        for attempt in range(2 if retry else 1):
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                self._connection.request("POST", self.path, body, headers)
+                response = self._connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # the node closed an idle keep-alive connection; reconnect once
+                self._connection.close()
+                self._connection = None
+                if attempt or not retry:
+                    raise
+        try:
+            return json.loads(data)
+        except ValueError:
+            # a proxy's error page, or a truncated answer
+            raise RpcError("HTTP %d %s, not a JSON-RPC response: %r"
+                           % (response.status, response.reason, data[:200])) from None
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _request(self, method, params):
+        self._next_id += 1
+        return {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+
+    def call(self, method, params=()):
+        return self.batch([(method, params)])[0]
+
+    def batch(self, requests, errors=False):
+        """
+        Send (method, params) pairs in one JSON-RPC batch and return their results
+        in the same order. Raises RpcError if any request failed, or with errors
+        set returns an RpcError in place of the result of a failed request.
+
+        A batch is sent again on a dropped connection only if all its methods
+        are in READ_ONLY_METHODS.
+        """
+
+        payload = [self._request(method, list(params)) for method, params in requests]
+        if not payload:
+            return []
+        with _BATCH_TIME.time():
+            responses = self._post(payload, all(method in READ_ONLY_METHODS for method, _ in requests))
+        _REQUESTS.inc(len(payload))
+        if isinstance(responses, dict):
+            # some nodes answer a failed batch with a single error object
+            raise RpcError(responses.get("error", responses))
+        by_id = {response.get("id"): response for response in responses}
+        results = []
+        for request in payload:
+            response = by_id.get(request["id"])
+            if response is None or "error" in response:
+                error = RpcError("%s failed: %s" % (request["method"],
+                                                    response["error"] if response else "no response"))
+                _ERRORS.inc()
+                if not errors:
+                    raise error
+                results.append(error)
+                continue
+            results.append(response["result"])
+        return results
+
+    def eth_call(self, to, data, block="latest"):
+        return ("eth_call", [{"to": to, "data": data}, block_tag(block)])
+
+
+class TokenState:
+
+    def __init__(self, address, values, balances):
+        self.address = address
+        self.balances = balances
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return "<TokenState %s>" % self.address
+
+
+class TokenStateReader:
+    """
+    Reads the mining state of several tokens, and the balances of a list of
+    holders, in one JSON-RPC batch per block.
+
+    tokens maps a name (e.g. 'SPRING') to a contract address. Results are kept
+    for the `cache_size` most recent block numbers.
+    """
+
+    def __init__(self, client, tokens, holders=(), cache_size=16):
+        self.client = client
+        self.tokens = dict(tokens)
+        self.holders = list(holders)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._calldata = {name: encode_call(signature)
+                          for name, (signature, _) in TOKEN_VIEWS.items()}
+
+    def _requests(self, block):
+        requests = []
+        for address in self.tokens.values():
+            for name in TOKEN_VIEWS:
+                requests.append(self.client.eth_call(address, self._calldata[name], block))
+            for holder in self.holders:
+                requests.append(self.client.eth_call(address, encode_call("balanceOf(address)", holder),
+                                                     block))
+        return requests
+
+    def _decode(self, results):
+        states, position = {}, 0
+        for token, address in self.tokens.items():
+            values = {}
+            for name, (_, kind) in TOKEN_VIEWS.items():
+                values[name] = decode_word(results[position], kind)
+                position += 1
+            balances = {}
+            for holder in self.holders:
+                balances[holder] = decode_word(results[position])
+                position += 1
+            states[token] = TokenState(address, values, balances)
+        return states
+
+    def _remember(self, block_number, states):
+        self._cache[block_number] = states
+        self._cache.move_to_end(block_number)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return states
+
+    def read(self, block_number=None):
+        """
+        The state of every token at block_number, or at the latest block.
+
+        For the latest block the block number is requested first and every call
+        is made at that block, since the requests of a batch may be answered at
+        different blocks. Returns (block_number, states) where states maps token
+        names to TokenState.
+        """
+
+        if block_number is None:
+            block_number = int(self.client.call("eth_blockNumber"), 16)
+        if block_number not in self._cache:
+            self._remember(block_number, self._decode(self.client.batch(self._requests(block_number))))
+        return block_number, self._cache[block_number]
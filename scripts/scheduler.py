@@ -0,0 +1,134 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from scripts.simulation import GAS_PER_MINT, MAX_REWARDS_AVAILABLE, REWARD_INTERVAL
+
+# Choosing which solution to submit, and when.
+#
+# A digest d found against mining target T earns T // d rewards, of which
+# _numberOfRewardsToGive pays out at most _numberOfRewardsAvailable at the
+# time the mint is mined. The scheduler scores batches of (digest, timestamp)
+# candidates by the reward they would be paid per unit of gas, discounted by
+# the chance that another miner mints first, and picks the best one.
+
+
+GAS_PER_MAX_UPDATE = 5000   # rough cost of rewriting maxNumberOfRewardsPerMint
+
+
+class SubmissionScheduler:
+    """
+    Scores candidate submissions against a local copy of the contract state.
+
+    single_reward is the reward per mint, _getMiningReward(lastRewardBlockTime),
+    which is what mint pays (getRewardAmountForAchievingTarget uses the reward
+    at the submission time instead, which differs only across a halving).
+
+    gas_price is in wei. If token_price (wei per token wei) is given, only
+    submissions whose reward is worth the gas are admissible. If
+    network_hashrate (hashes per second of everyone else) is given, the reward
+    of a later submission is weighted by the probability that nobody else
+    mints before it.
+    """
+
+    def __init__(self, mining_target, last_reward_block_time, max_number_of_rewards_per_mint,
+                 single_reward, gas_price, gas_per_mint=GAS_PER_MINT,
+                 gas_per_max_update=GAS_PER_MAX_UPDATE, token_price=None, network_hashrate=0.):
+
+        self.mining_target = mining_target
+        self.last_reward_block_time = last_reward_block_time
+        self.max_number_of_rewards_per_mint = max_number_of_rewards_per_mint
+        self.single_reward = single_reward
+        self.gas_price = gas_price
+        self.gas_per_mint = gas_per_mint
+        self.gas_per_max_update = gas_per_max_update
+        self.token_price = token_price
+        self.network_rate = network_hashrate * mining_target / 2**256
+
+        # digest <= mining_target // k  <=>  mining_target // digest >= k
+        self._thresholds = np.array([mining_target // k for k in range(MAX_REWARDS_AVAILABLE, 0, -1)],
+                                    dtype=object)
+
+    @classmethod
+    def from_model(cls, model, gas_price, **kwargs):
+        return cls(model.mining_target, model.last_reward_block_time,
+                   model.max_number_of_rewards_per_mint, model.get_mining_reward(), gas_price, **kwargs)
+
+    @classmethod
+    def from_token_state(cls, state, gas_price, **kwargs):
+        """From a TokenState read by scripts/rpc.py."""
+
+        return cls(state.miningTarget, state.lastRewardBlockTime, state.maxNumberOfRewardsPerMint,
+                   state.miningReward, gas_price, **kwargs)
+
+    def rewards_earned(self, digests):
+        """
+        min(mining_target // digest, MAX_REWARDS_AVAILABLE) for each digest; 0 above
+        the target, and for a zero digest, on which the contract's division reverts.
+        """
+
+        # digests are uint256, so they are compared as Python ints in an object array
+        digests = np.asarray(digests, dtype=object)
+        below = np.searchsorted(self._thresholds, digests)
+        return np.where(digests == 0, 0, MAX_REWARDS_AVAILABLE - below).astype(np.int64)
+
+    def evaluate(self, digests, times, now):
+        """
+        Score every (digest, time) candidate at time `now`. Returns a dict of
+        arrays: rewards (number given), amount (token wei), gas, cost (wei) and
+        score (expected token wei per unit of gas, zero where inadmissible).
+        """
+
+        times = np.asarray(times, dtype=np.int64)
+        earned = self.rewards_earned(digests)
+        available = np.clip(np.maximum((times - self.last_reward_block_time) // REWARD_INTERVAL,
+                                       self.max_number_of_rewards_per_mint),
+                            None, MAX_REWARDS_AVAILABLE)
+        rewards = np.minimum(earned, available)
+        amount = rewards * float(self.single_reward)
+        gas = self.gas_per_mint + np.where(rewards != self.max_number_of_rewards_per_mint,
+                                           self.gas_per_max_update, 0)
+        cost = gas * float(self.gas_price)
+
+        waiting = np.maximum(times - now, 0)
+        survival = np.exp(-self.network_rate * waiting)
+        score = survival * amount / gas
+        admissible = (rewards > 0) & (times >= self.last_reward_block_time)
+        if self.token_price is not None:
+            admissible &= amount * self.token_price >= cost
+        return {"rewards": rewards, "amount": amount, "gas": gas, "cost": cost,
+                "score": np.where(admissible, score, 0.)}
+
+    def best(self, digests, times, now):
+        """Index of the best candidate at time `now`, or None when no candidate is worth submitting."""
+
+        score = self.evaluate(digests, times, now)["score"]
+        if not len(score) or score.max() <= 0:
+            return None
+        return int(score.argmax())
+
+
+def benchmark(candidates=1000000, batch_size=100000, seed=0):
+    """Candidate evaluations per second for random digests and submission times."""
+
+    rng = random.Random(seed)
+    target = 2**230
+    scheduler = SubmissionScheduler(target, 0, 1, 168 * 10**18, 50 * 10**9, token_price=10**14,
+                                    network_hashrate=1e7)
+    batches = []
+    for _ in range(math.ceil(candidates / batch_size)):
+        digests = [rng.randrange(1, 2 * target) for _ in range(batch_size)]
+        times = np.array([rng.randrange(0, 72 * REWARD_INTERVAL) for _ in range(batch_size)])
+        batches.append((digests, times))
+
+    started = time.perf_counter()
+    for digests, times in batches:
+        scheduler.best(digests, times, 0)
+    elapsed = time.perf_counter() - started
+    return len(batches) * batch_size / elapsed
+
+
+def main():
+    print("%.0f candidate evaluations per second" % benchmark())
@@ -0,0 +1,234 @@
+import ast
+import operator
+import os
+import re
+from fractions import Fraction
+
+import numpy as np
+
+from scripts.emission import EmissionSchedule
+from scripts.model import SpringTokenModel
+from scripts.simulation import YEAR, simulate_batched_mining
+
+# The four seasonal tokens differ only in TOKEN_IDENTIFIER, INITIAL_REWARD and
+# DURATION_OF_FIRST_ERA (see README-DuplicatedCode.txt). Their constants are read
+# from the .sol sources so that simulations always match the contracts.
+
+
+CONTRACTS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "contracts")
+SEASON_CONTRACTS = ("SpringToken", "SummerToken", "AutumnToken", "WinterToken")
+
+_CONSTANT = re.compile(r"^\s*(uint\d*|string)\s+(?:public|private|internal)\s+constant\s+"
+                       r"(\w+)\s*=\s*(.+?);", re.MULTILINE)
+_HEADER = re.compile(r"^//\s*([A-Za-z][A-Za-z ]+?)\s*:\s*(.+?)\s*$", re.MULTILINE)
+
+_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+              ast.Div: operator.floordiv, ast.Pow: operator.pow}
+
+
+def _evaluate(node):
+    # integer constant expressions such as (365 * 24 * 60 * 60 * 3) / 4 or 2**uint256(233)
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id.startswith("uint") and len(node.args) == 1):
+        return _evaluate(node.args[0])
+    raise ValueError("Unsupported constant expression: %s" % ast.dump(node))
+
+
+def read_constants(path):
+    """The integer and string constants declared in a .sol file."""
+
+    with open(path) as source:
+        text = source.read()
+    constants = {}
+    for kind, name, expression in _CONSTANT.findall(text):
+        if kind == "string":
+            constants[name] = ast.literal_eval(expression)
+        else:
+            constants[name] = _evaluate(ast.parse(expression, mode="eval"))
+    return constants
+
+
+def read_header(path):
+    """The 'Key : value' lines of the comment block at the top of a .sol file."""
+
+    with open(path) as source:
+        text = source.read()
+    return dict(_HEADER.findall(text[:text.index("contract ")]))
+
+
+class Season:
+
+    def __init__(self, contract_name, constants, header=None):
+        self.contract_name = contract_name
+        self.constants = constants
+        self.header = header or {}
+        for name, value in constants.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_source(cls, contract_name, contracts_directory=CONTRACTS_DIRECTORY):
+        path = os.path.join(contracts_directory, contract_name + ".sol")
+        return cls(contract_name, read_constants(path), read_header(path))
+
+    def __repr__(self):
+        return "<Season %s>" % self.NAME
+
+    def model(self, *args, **kwargs):
+        """A reference model of this season's contract, see scripts/model.py."""
+
+        return model_class(self)(*args, **kwargs)
+
+    def rewards_per_era(self, era):
+        duration = self.DURATION_OF_FIRST_ERA if era == 0 else self.DURATION_OF_ERA
+        return duration // self.REWARD_INTERVAL
+
+    def total_scheduled_supply(self):
+        """Exact sum of all scheduled rewards until the reward reaches zero."""
+
+        return EmissionSchedule(self).total_supply
+
+    def validate(self):
+        """Check the constants against the contract's header comment. Returns a list of problems."""
+
+        problems = []
+        first_era_supply = self.rewards_per_era(0) * self.INITIAL_REWARD
+        expected = {
+            "Symbol": self.SYMBOL,
+            "Name": self.NAME,
+            "Decimals": str(self.DECIMALS),
+            "Initial mining reward": str(self.INITIAL_REWARD // 10**self.DECIMALS),
+            "Total supply": "{:,.2f}".format(self.TOTAL_SUPPLY // 10**self.DECIMALS),
+            "Fraction of total supply released before first halving":
+                str(Fraction(first_era_supply, self.TOTAL_SUPPLY)),
+        }
+        for key, value in expected.items():
+            if self.header.get(key) != value:
+                problems.append("%s: header says %r, constants give %r"
+                                % (key, self.header.get(key), value))
+
+        # integer division of the reward loses a little below the nominal total
+        shortfall = self.TOTAL_SUPPLY - self.total_scheduled_supply()
+        if not 0 <= shortfall < 10**self.DECIMALS:
+            problems.append("TOTAL_SUPPLY differs from the scheduled rewards by %d" % shortfall)
+        return problems
+
+
+def load_seasons(contracts_directory=CONTRACTS_DIRECTORY):
+    return [Season.from_source(name, contracts_directory) for name in SEASON_CONTRACTS]
+
+
+def model_class(season):
+    """A SpringTokenModel subclass with the season's constants."""
+
+    names = [name for name in vars(SpringTokenModel) if name.isupper()]
+    attributes = {name: season.constants[name] for name in names if name in season.constants}
+    return type(season.contract_name + "Model", (SpringTokenModel,), attributes)
+
+
+def emission_curves(seasons, times):
+    """
+    Reward per mint and cumulative scheduled supply, in whole tokens, for every
+    season at every time (seconds since contract creation), read from each
+    season's EmissionSchedule. Both arrays have shape (len(seasons), len(times)).
+    """
+
+    schedules = [EmissionSchedule(season) for season in seasons]
+    # exact wei divided by python ints, so whole numbers of tokens come out exact
+    reward = [schedule.rewards_at(times, exact=True) / 10**season.DECIMALS
+              for season, schedule in zip(seasons, schedules)]
+    supply = [schedule.supply_at(times, exact=True) / 10**season.DECIMALS
+              for season, schedule in zip(seasons, schedules)]
+    return np.array(reward, dtype=np.float64), np.array(supply, dtype=np.float64)
+
+
+def simulate_seasons(seasons, hashpower_function, gas_price_function, replicates=1,
+                     time_limit=2 * YEAR, seed=None, **kwargs):
+    """
+    Run the batched mining simulation for every season side by side, with
+    `replicates` chains per season. hashpower_function and gas_price_function
+    receive the chain times; chains are ordered season by season. Returns one
+    BatchingResult whose arrays have shape (len(seasons), replicates).
+    """
+
+    repeat = lambda name: np.repeat([getattr(season, name) for season in seasons], replicates)
+    initial_target = [season.MAXIMUM_TARGET // 2**19 for season in seasons for _ in range(replicates)]
+    result = simulate_batched_mining(hashpower_function, gas_price_function, initial_target,
+                                     len(seasons) * replicates, time_limit, seed,
+                                     initial_reward=repeat("INITIAL_REWARD").astype(np.float64),
+                                     duration_of_first_era=repeat("DURATION_OF_FIRST_ERA"),
+                                     **kwargs)
+    for name in ("mints", "rewards", "solutions"):
+        setattr(result, name, getattr(result, name).reshape(len(seasons), replicates))
+    return result
+
+
+def plot_curves(seasons, directory, years=10, points=2001):
+    """
+    Draw supply_curves.png and reward_curves.png, as shown in the whitepaper,
+    into directory. Returns the paths written, none without matplotlib.
+    """
+
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed, skipping the plots")
+        return []
+
+    times = np.linspace(0, years * YEAR, points)
+    reward, supply = emission_curves(seasons, times)
+    labels = [season.NAME.split()[0] for season in seasons]
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    plt.style.use("ggplot")
+    for values, ylabel, filename in ((supply, "Tokens Mined", "supply_curves.png"),
+                                     (reward, "Number of Tokens per Reward", "reward_curves.png")):
+        figure = plt.figure()
+        for label, curve in zip(labels, values):
+            plt.plot(times / YEAR, curve, label=label)
+        plt.xlabel("Time (years)")
+        plt.ylabel(ylabel)
+        plt.legend()
+        paths.append(os.path.join(directory, filename))
+        figure.savefig(paths[-1])
+        plt.close(figure)
+    return paths
+
+
+def main(output_dir=None):
+    """Print the scheduled supply and reward, and draw the whitepaper's curves into output_dir if given."""
+
+    seasons = load_seasons()
+    for season in seasons:
+        for problem in season.validate():
+            print("%s: %s" % (season.contract_name, problem))
+
+    times = np.arange(0, 201) * YEAR
+    reward, supply = emission_curves(seasons, times)
+    header = "year " + "".join("%16s" % season.SYMBOL for season in seasons)
+    for title, values, form in (("Tokens mined", supply, "%16.2f"), ("Tokens per reward", reward, "%16.6g")):
+        print(title)
+        print(header)
+        for year in (0, 1, 2, 5, 10, 20, 50, 100, 200):
+            print("%4d " % year + "".join(form % value for value in values[:, year]))
+
+    if output_dir is not None:
+        for path in plot_curves(seasons, output_dir):
+            print("Wrote " + path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scheduled supply and reward of the four seasonal tokens.")
+    parser.add_argument("--output-dir", help="draw the supply and reward curves into this directory")
+    main(parser.parse_args().output_dir)
@@ -0,0 +1,395 @@
+import numpy as np
+
+from scripts import metrics
+
+# Off-chain model of the difficulty adjustment in SpringToken._adjustDifficulty.
+#
+# Many independent mining chains are advanced in lockstep as NumPy arrays.
+# Mining targets are kept as exact integers split into 44-bit limbs stored in
+# float64 arrays. Every intermediate value stays below 2**53, so the 99/100 and
+# 100/99 steps truncate exactly as they do in the contract.
+
+
+YEAR = 365 * 24 * 60 * 60
+
+REWARD_INTERVAL = 600
+MINIMUM_TARGET = 2**16
+MAXIMUM_TARGET = 2**234
+MAX_REWARDS_AVAILABLE = 72
+
+INITIAL_REWARD = 168 * 10**18
+DURATION_OF_FIRST_ERA = (YEAR * 3) // 4
+DURATION_OF_ERA = 3 * YEAR
+
+GAS_PER_MINT = 65000   # rough estimate for mint(nonce), including the 21000 base cost
+
+LIMB_BITS = 44
+NUMBER_OF_LIMBS = 6   # 264 bits, room for a target times 100 before the division
+LIMB_BASE = 2.0**LIMB_BITS
+
+_LIMB_WEIGHTS = np.array([2.0**(LIMB_BITS * k) for k in range(NUMBER_OF_LIMBS)])
+
+_SAMPLE_TIME = metrics.timer("simulation_sample_intervals_seconds",
+                             "Time spent drawing the intervals until the next solution",
+                             buckets=metrics.FAST_BUCKETS)
+_INTERVALS = metrics.counter("simulation_intervals_total", "Intervals drawn, over all chains")
+_ADJUST_TIME = metrics.timer("simulation_adjust_difficulty_seconds",
+                             "Time spent applying _adjustDifficulty to a batch of chains",
+                             buckets=metrics.FAST_BUCKETS)
+
+
+def adjust_difficulty(mining_target, last_reward_block_time, rewards_given_now, current_time,
+                      minimum_target=MINIMUM_TARGET, maximum_target=MAXIMUM_TARGET):
+    """Scalar copy of SpringToken._adjustDifficulty."""
+
+    time_since_last_reward = current_time - last_reward_block_time
+
+    # median interval of 10 minutes multiplied by log(2) ~ 61/88
+    if time_since_last_reward * 88 < rewards_given_now * REWARD_INTERVAL * 61:
+        mining_target = (mining_target * 99) // 100
+    else:
+        mining_target = (mining_target * 100) // 99
+
+    if mining_target < minimum_target:
+        mining_target = minimum_target
+
+    if mining_target > maximum_target:
+        mining_target = maximum_target
+
+    return mining_target
+
+
+def to_limbs(values):
+    """Split a sequence of non-negative integers into a (NUMBER_OF_LIMBS, n) float64 array."""
+
+    values = [int(value) for value in values]
+    limbs = np.zeros((NUMBER_OF_LIMBS, len(values)))
+    for i, value in enumerate(values):
+        if value < 0 or value >> (LIMB_BITS * NUMBER_OF_LIMBS - 8):
+            raise ValueError("Target out of range for the simulator: %d" % value)
+        for k in range(NUMBER_OF_LIMBS):
+            limbs[k, i] = (value >> (LIMB_BITS * k)) & (2**LIMB_BITS - 1)
+    return limbs
+
+
+def from_limbs(limbs):
+    """Inverse of to_limbs, returning a list of python integers."""
+
+    values = [0] * limbs.shape[1]
+    for k in range(NUMBER_OF_LIMBS):
+        shift = LIMB_BITS * k
+        for i, limb in enumerate(limbs[k].tolist()):
+            values[i] += int(limb) << shift
+    return values
+
+
+def limbs_to_float(limbs):
+    return _LIMB_WEIGHTS @ limbs
+
+
+def _less(a, b):
+    less = np.zeros(a.shape[1], dtype=bool)
+    equal = np.ones(a.shape[1], dtype=bool)
+    for k in reversed(range(NUMBER_OF_LIMBS)):
+        less |= equal & (a[k] < b[k])
+        equal &= a[k] == b[k]
+    return less
+
+
+def _normalize(limbs):
+    """Propagate carries so that every limb is below LIMB_BASE."""
+
+    for k in range(NUMBER_OF_LIMBS - 1):
+        carry = np.floor(limbs[k] / LIMB_BASE)
+        limbs[k] -= carry * LIMB_BASE
+        limbs[k + 1] += carry
+    return limbs
+
+
+def _multiply_divide(limbs, numerator, denominator):
+    """
+    Exact floor(limbs * numerator / denominator) for per-chain numerators and
+    denominators of at most 100.
+
+    Limbs only need to be below 2**45 on input, and the result satisfies the same
+    bound, so carries are folded in with a single vectorized pass instead of a
+    full normalization.
+    """
+
+    product = limbs * numerator
+    remainder = np.zeros(limbs.shape[1])
+    for k in reversed(range(NUMBER_OF_LIMBS)):
+        value = remainder * LIMB_BASE + product[k]
+        product[k] = np.floor(value / denominator)
+        remainder = value - product[k] * denominator
+
+    carry = np.floor(product[:-1] / LIMB_BASE)
+    product[:-1] -= carry * LIMB_BASE
+    product[1:] += carry
+    return product
+
+
+class DifficultySimulation:
+    """
+    A batch of independent mining chains, each holding an exact mining target.
+
+    initial_target, minimum_target and maximum_target may be single integers or
+    one integer per chain.
+    """
+
+    def __init__(self, initial_target, n_chains=1, minimum_target=MINIMUM_TARGET,
+                 maximum_target=MAXIMUM_TARGET, seed=None):
+
+        self.n_chains = n_chains
+        self.rng = np.random.default_rng(seed)
+        self.target = to_limbs(_per_chain(initial_target, n_chains))
+        self.minimum_target = to_limbs(_per_chain(minimum_target, n_chains))
+        self.maximum_target = to_limbs(_per_chain(maximum_target, n_chains))
+        self._minimum_float = limbs_to_float(self.minimum_target)
+        self._maximum_float = limbs_to_float(self.maximum_target)
+        self.time = np.zeros(n_chains)
+        self.last_reward_time = np.zeros(n_chains)
+
+    @property
+    def targets(self):
+        return from_limbs(self.target)
+
+    def target_as_float(self):
+        return limbs_to_float(self.target)
+
+    def sample_intervals(self, hashpower_function):
+        """Exponentially distributed times until each chain finds the next solution."""
+
+        with _SAMPLE_TIME.time():
+            hashpower = np.broadcast_to(hashpower_function(self.time), (self.n_chains,))
+            rate = hashpower * self.target_as_float() / 2.0**256
+            intervals = self.rng.standard_exponential(self.n_chains) / rate
+        _INTERVALS.inc(self.n_chains)
+        return intervals
+
+    def adjust_difficulty(self, current_time, rewards_given_now=1, mask=None):
+        """
+        Apply _adjustDifficulty to every chain (or only where mask is set) for a
+        reward given at current_time, and record current_time as the last reward time.
+        """
+
+        with _ADJUST_TIME.time():
+            time_since_last_reward = current_time - self.last_reward_time
+            slow_down = time_since_last_reward * 88 < np.asarray(rewards_given_now) * (REWARD_INTERVAL * 61)
+            numerator = np.where(slow_down, 99., 100.)
+            denominator = np.where(slow_down, 100., 99.)
+
+            target = _multiply_divide(self.target, numerator, denominator)
+            self._clamp(target)
+
+            if mask is None:
+                self.target = target
+                self.last_reward_time = np.array(current_time, dtype=np.float64)
+            else:
+                self.target = np.where(mask, target, self.target)
+                self.last_reward_time = np.where(mask, current_time, self.last_reward_time)
+
+    def _clamp(self, target):
+        # compare exactly only when the float approximation is close to a limit
+        approximate = limbs_to_float(target)
+        if (approximate < self._minimum_float * (1 + 1e-9)).any() or \
+           (approximate > self._maximum_float * (1 - 1e-9)).any():
+            _normalize(target)
+        if (approximate < self._minimum_float * (1 + 1e-9)).any():
+            below = _less(target, self.minimum_target)
+            target[:, below] = self.minimum_target[:, below]
+        if (approximate > self._maximum_float * (1 - 1e-9)).any():
+            above = _less(self.maximum_target, target)
+            target[:, above] = self.maximum_target[:, above]
+
+    def step(self, hashpower_function):
+        """Mine one reward on every chain and return the intervals."""
+
+        intervals = self.sample_intervals(hashpower_function)
+        self.time = self.time + intervals
+        self.adjust_difficulty(self.time)
+        return intervals
+
+
+class SimulationResult:
+
+    def __init__(self, count, total, total_squares, intervals=None):
+        self.count = count
+        self.total = total
+        self.total_squares = total_squares
+        self.intervals = intervals
+
+    @property
+    def mean_interval(self):
+        return self.total / self.count
+
+    @property
+    def variance(self):
+        return self.total_squares / self.count - self.mean_interval**2
+
+
+def simulate_mining_intervals(hashpower_function, initial_target, n_chains=1,
+                              time_limit=2 * YEAR, seed=None, record_intervals=False,
+                              minimum_target=MINIMUM_TARGET, maximum_target=MAXIMUM_TARGET):
+    """
+    Mine one reward at a time on n_chains independent chains until every chain
+    reaches time_limit. hashpower_function receives an array of chain times.
+
+    Intervals are counted while a chain's time is below time_limit, as in the
+    original per-interval loop. With record_intervals the result also holds a
+    list of the intervals of each chain.
+    """
+
+    simulation = DifficultySimulation(initial_target, n_chains, minimum_target,
+                                      maximum_target, seed)
+    count = np.zeros(n_chains, dtype=np.int64)
+    total = np.zeros(n_chains)
+    total_squares = np.zeros(n_chains)
+    recorded = []
+
+    active = simulation.time < time_limit
+    while active.any():
+        intervals = simulation.step(hashpower_function)
+        counted = np.where(active, intervals, 0.)
+        count += active
+        total += counted
+        total_squares += counted**2
+        if record_intervals:
+            recorded.append(np.where(active, intervals, np.nan))
+        active = simulation.time < time_limit
+
+    intervals = None
+    if record_intervals:
+        steps = np.array(recorded).T
+        intervals = [chain[:n] for chain, n in zip(steps, count)]
+    return SimulationResult(count, total, total_squares, intervals)
+
+
+def reward_era(time, duration_of_first_era=DURATION_OF_FIRST_ERA, duration_of_era=DURATION_OF_ERA):
+    """
+    rewardEra for times measured from contract creation: exact for integers,
+    elementwise for arrays. The halving schedule of the model, the emission
+    table and the simulations all take their eras from here.
+    """
+
+    if np.ndim(time) == 0 and np.ndim(duration_of_first_era) == 0:
+        if time < duration_of_first_era:
+            return 0
+        return 1 + (time - duration_of_first_era) // duration_of_era
+    return np.where(time < duration_of_first_era, 0, 1 + (time - duration_of_first_era) // duration_of_era)
+
+
+def mining_reward(time, initial_reward=INITIAL_REWARD,
+                  duration_of_first_era=DURATION_OF_FIRST_ERA):
+    """Vectorized _getMiningReward for times measured from contract creation, as floats."""
+
+    era = reward_era(np.asarray(time, dtype=np.float64), duration_of_first_era)
+    return np.asarray(initial_reward, dtype=np.float64) / 2**era
+
+
+def number_of_rewards_available(last_reward_time, previous_max_number_of_rewards, current_time):
+    """Vectorized _numberOfRewardsAvailable."""
+
+    intervals_since_last_reward = np.floor((current_time - last_reward_time) / REWARD_INTERVAL)
+    return np.minimum(np.maximum(previous_max_number_of_rewards, intervals_since_last_reward),
+                      MAX_REWARDS_AVAILABLE)
+
+
+class BatchingResult:
+
+    def __init__(self, duration, mints, rewards, solutions, gas_per_mint):
+        self.duration = duration
+        self.mints = mints
+        self.rewards = rewards
+        self.solutions = solutions
+        self.gas_per_mint = gas_per_mint
+
+    @property
+    def mints_per_day(self):
+        return self.mints * (24 * 60 * 60) / self.duration
+
+    @property
+    def rewards_per_mint(self):
+        return self.rewards / self.mints
+
+    @property
+    def gas_per_reward(self):
+        return self.gas_per_mint * self.mints / self.rewards
+
+    @property
+    def mean_reward_interval(self):
+        return self.duration / self.rewards
+
+
+def simulate_batched_mining(hashpower_function, gas_price_function, initial_target, n_chains=1,
+                            time_limit=2 * YEAR, seed=None, gas_per_mint=GAS_PER_MINT,
+                            initial_reward=INITIAL_REWARD,
+                            duration_of_first_era=DURATION_OF_FIRST_ERA,
+                            minimum_target=MINIMUM_TARGET, maximum_target=MAXIMUM_TARGET):
+    """
+    Simulate miners that hold on to solutions and claim several rewards in one
+    transaction, as allowed by _numberOfRewardsAvailable and _numberOfRewardsToGive.
+
+    gas_price_function(t) gives the price of one unit of gas in token wei. A
+    solution found on a digest d earns target // d rewards, and is submitted as
+    soon as the rewards it can claim are worth at least the gas for the mint.
+    Until then the best solution found since the last mint is kept, and the
+    search goes on. Times are measured from contract creation.
+    """
+
+    simulation = DifficultySimulation(initial_target, n_chains, minimum_target,
+                                      maximum_target, seed)
+    rng = simulation.rng
+    max_number_of_rewards = np.ones(n_chains)
+    best_earned = np.zeros(n_chains)
+    mints = np.zeros(n_chains, dtype=np.int64)
+    rewards = np.zeros(n_chains, dtype=np.int64)
+    solutions = np.zeros(n_chains, dtype=np.int64)
+
+    active = simulation.time < time_limit
+    while active.any():
+        reward = mining_reward(simulation.last_reward_time, initial_reward, duration_of_first_era)
+        cost = gas_per_mint * np.broadcast_to(gas_price_function(simulation.time), (n_chains,))
+        with np.errstate(divide='ignore'):
+            needed = np.maximum(np.ceil(cost / reward), 1)
+
+        # the earliest time at which the held solution pays for the mint
+        ready_time = np.where(max_number_of_rewards >= needed, simulation.time,
+                              np.maximum(simulation.time,
+                                         simulation.last_reward_time + needed * REWARD_INTERVAL))
+        ready = (best_earned >= needed) & (needed <= MAX_REWARDS_AVAILABLE)
+
+        solution_time = simulation.time + simulation.sample_intervals(hashpower_function)
+        submit = ready & (ready_time <= solution_time)
+        found = ~submit
+
+        # a digest uniformly distributed below the target earns floor(1/u) rewards
+        earned = np.floor(1 / (1 - rng.random(n_chains)))
+        best_earned = np.where(found, np.maximum(best_earned, earned), best_earned)
+
+        current_time = np.where(submit, ready_time, solution_time)
+        before_limit = current_time < time_limit
+        solutions += found & before_limit
+        given = np.minimum(best_earned,
+                           number_of_rewards_available(simulation.last_reward_time,
+                                                       max_number_of_rewards, current_time))
+        if submit.any():
+            simulation.adjust_difficulty(current_time, np.where(submit, given, 1), mask=submit)
+            max_number_of_rewards = np.where(submit, given, max_number_of_rewards)
+            best_earned = np.where(submit, 0, best_earned)
+            counted = submit & before_limit
+            mints += counted
+            rewards += np.where(counted, given, 0).astype(np.int64)
+
+        simulation.time = current_time
+        active = simulation.time < time_limit
+
+    return BatchingResult(time_limit, mints, rewards, solutions, gas_per_mint)
+
+
+def _per_chain(value, n_chains):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        if len(value) != n_chains:
+            raise ValueError("Expected %d values, got %d" % (n_chains, len(value)))
+        return list(value)
+    return [value] * n_chains
@@ -0,0 +1,96 @@
+import json
+import os
+from collections import defaultdict
+
+import pytest
+
+# Contracts are deployed once per module by module-scoped fixtures, and every
+# test that touches the chain runs under brownie's fn_isolation (add
+# `pytestmark = pytest.mark.usefixtures("fn_isolation")` to the module), so
+# it starts from the state left by the module's fixtures and its own
+# transactions are reverted afterwards.
+#
+# A module-scoped fixture must never change the state of another one: build
+# each prepared state (minted, approved, ...) on its own deployment.
+
+
+TIMINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            ".test_timings.json")
+
+
+@pytest.fixture(scope="module")
+def deploy_test_token(module_isolation, accounts, chain):
+    """Deploy a TestSpringToken from the account with private_key."""
+
+    from brownie import TestSpringToken
+
+    def deploy(private_key, challenge=None, mining_target=None):
+        miner = accounts.add(private_key)
+        token = miner.deploy(TestSpringToken)
+        if challenge is not None:
+            token.setChallengeNumber(challenge)
+        if mining_target is not None:
+            token.setMiningTarget(mining_target)
+        chain.sleep(1)
+        return token
+    return deploy
+
+
+@pytest.fixture(scope="session")
+def mint():
+    """Mint on a TestSpringToken from account, with a nonce searched for the purpose."""
+
+    from scripts.miner import mine_for_token
+
+    def mint(token, account):
+        # _adjustDifficulty overflows for targets above (2**256 - 1) // 100
+        token.setMiningTarget(2**248)
+        result = mine_for_token(token, account, processes=1, start_nonce=0)
+        return token.mint(result.nonce, {'from': account})
+    return mint
+
+
+# With --timings, the time spent per test module, split into fixture setup,
+# test calls and teardown, is reported and compared with the previous run
+# recorded in TIMINGS_FILE, which is then updated.
+
+_timings = defaultdict(lambda: defaultdict(float))
+
+
+def pytest_addoption(parser):
+    parser.addoption("--timings", action="store_true",
+                     help="report the time per test module and record it in %s" % os.path.basename(TIMINGS_FILE))
+
+
+def pytest_runtest_logreport(report):
+    module = report.nodeid.split("::")[0]
+    _timings[module][report.when] += report.duration
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.getoption("timings") or not _timings:
+        return
+    try:
+        with open(TIMINGS_FILE) as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        recorded = {}
+
+    current = {module: dict(phases) for module, phases in _timings.items()}
+    previous = {module: phases for module, phases in recorded.items() if module in current}
+    total = lambda timings: sum(sum(phases.values()) for phases in timings.values())
+
+    terminalreporter.section("test timings (seconds)")
+    terminalreporter.write_line("%-36s %9s %9s %9s %9s %9s"
+                                % ("module", "setup", "call", "teardown", "total", "previous"))
+    for module, phases in sorted(current.items()):
+        before = previous.get(module)
+        terminalreporter.write_line("%-36s %9.2f %9.2f %9.2f %9.2f %9s" % (
+            module, phases.get("setup", 0), phases.get("call", 0), phases.get("teardown", 0),
+            sum(phases.values()), "%.2f" % sum(before.values()) if before else "-"))
+    terminalreporter.write_line("%-36s %39.2f %9s" % (
+        "total", total(current), "%.2f" % total(previous) if previous else "-"))
+
+    recorded.update(current)
+    with open(TIMINGS_FILE, "w") as f:
+        json.dump(recorded, f, indent=1, sort_keys=True)
@@ -0,0 +1,45 @@
+import json
+import pytest
+from brownie import SpringToken, accounts, web3
+from scripts.deploy_all import SEASON_CONTRACTS, deploy_all
+from scripts.seasons import Season
+
+pytestmark = pytest.mark.usefixtures("fn_isolation")
+
+
+def test_deploy_all_seasons(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = deploy_all(accounts[0], path)
+    entries = manifest["contracts"]
+    assert sorted(entries) == sorted(contract._name for contract in SEASON_CONTRACTS)
+    nonces = sorted(entry["nonce"] for entry in entries.values())
+    assert nonces == list(range(nonces[0], nonces[0] + 4))
+    for contract in SEASON_CONTRACTS:
+        entry = entries[contract._name]
+        assert entry["status"] == "deployed" and entry["gas_used"] > 0
+        assert contract.at(entry["address"]).symbol() == Season.from_source(contract._name).SYMBOL
+    with open(path) as f:
+        assert json.load(f) == manifest
+
+def test_rerun_is_idempotent(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    first = deploy_all(accounts[0], path)
+    nonce = accounts[0].nonce
+    assert deploy_all(accounts[0], path) == first
+    assert accounts[0].nonce == nonce
+
+def test_rerun_deploys_missing_contracts(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    first = deploy_all(accounts[0], path)
+    with open(path) as f:
+        manifest = json.load(f)
+    del manifest["contracts"]["SummerToken"]
+    manifest["contracts"]["SpringToken"]["address"] = "0x" + "00" * 19 + "01"
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+    second = deploy_all(accounts[0], path)["contracts"]
+    assert second["AutumnToken"] == first["contracts"]["AutumnToken"]
+    assert second["SummerToken"]["address"] != first["contracts"]["SummerToken"]["address"]
+    assert len(web3.eth.get_code(second["SpringToken"]["address"])) > 0
+    assert SpringToken.at(second["SpringToken"]["address"]).tokensMinted() == 0
@@ -0,0 +1,55 @@
+import numpy as np
+from scripts.difficulty_analysis import (DAY, HOUR, HashpowerProfile, Scenarios, analyze,
+                                         default_scenarios, mean_field_response, oscillations, ramps,
+                                         steps)
+
+
+def test_profiles():
+    scenarios = oscillations([DAY], [0.5]) + steps([4.], shock_time=DAY) + ramps([DAY], start=DAY)
+    profile = HashpowerProfile(scenarios, base=1.)
+    assert np.allclose(profile(np.array([DAY / 4] * 3)), [1.5, 1., 1.])
+    assert np.allclose(profile(np.array([DAY] * 3)), [1., 4., 1.])
+    assert np.allclose(profile(np.array([2 * DAY] * 3)), [1., 4., 2.])
+    assert [scenarios.describe(i) for i in range(3)] == [
+        "period      24.0 h, amplitude 0.50", "step x4 at day 1", "ramp, doubling every 1 days"]
+
+def test_grid_sizes():
+    assert len(oscillations([HOUR, DAY, 7 * DAY], [0.1, 0.5])) == 6
+    assert len(default_scenarios()) > 700
+
+def test_constant_hashpower_is_unbiased():
+    result = analyze(Scenarios(["constant"] * 2), replicates=8, time_limit=60 * DAY, warmup=0,
+                     processes=1)
+    assert np.all(np.abs(result.bias) < 10)
+    # exponentially distributed intervals have a variance close to the squared mean
+    assert np.all(np.abs(result.variance / result.mean_interval**2 - 1) < 0.1)
+    assert not np.any(result.mean_field.perturbed)
+
+def test_recovery_after_miners_leave():
+    response = mean_field_response(steps([0.5, 0.25], shock_time=5 * DAY), time_limit=30 * DAY)
+    assert np.all(response.perturbed)
+    assert 0 < response.settling_time[0] < response.settling_time[1] < 10 * DAY
+
+def test_small_changes_never_perturb():
+    scenarios = steps([1.02], shock_time=5 * DAY) + ramps([365 * DAY], start=5 * DAY)
+    response = mean_field_response(scenarios, time_limit=30 * DAY)
+    assert not np.any(response.perturbed)
+    assert np.all(np.isnan(response.settling_time))
+
+def test_mean_field_follows_the_simulated_targets():
+    scenarios = steps([0.25, 4.], shock_time=5 * DAY) + ramps([-14 * DAY], start=5 * DAY)
+    sample_times = np.array([4, 5.5, 6, 7, 9, 15, 29]) * DAY
+    result = analyze(scenarios, replicates=64, time_limit=30 * DAY, warmup=0, processes=1,
+                     sample_times=sample_times)
+    # the simulated targets spread by about 9%, so 64 replicates give their mean to about 1%
+    assert np.all(np.abs(result.mean_log_target - result.mean_field.log_targets) < 0.04)
+    # and the targets did move: by a factor 4 after the steps
+    assert np.all(np.abs(result.mean_log_target[:2, -1] - result.mean_log_target[:2, 0]) > 1)
+
+def test_results_independent_of_processes():
+    scenarios = oscillations([HOUR, DAY], [0.5]) + steps([2.], shock_time=DAY)
+    kwargs = dict(replicates=3, time_limit=10 * DAY, warmup=DAY, chains_per_task=2)
+    one = analyze(scenarios, processes=1, **kwargs)
+    two = analyze(scenarios, processes=2, **kwargs)
+    assert np.array_equal(one.mean_interval, two.mean_interval)
+    assert np.array_equal(one.variance, two.variance)
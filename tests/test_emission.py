@@ -0,0 +1,80 @@
+import random
+import numpy as np
+import pytest
+from scripts.emission import EmissionSchedule, season_schedules
+from scripts.seasons import load_seasons
+
+seasons = load_seasons()
+start = 1600000000
+year = 365 * 24 * 60 * 60
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+
+
+def brute_force_supply(model, time):
+    # replay one scheduled reward per interval, era by era
+    supply, scheduled = 0, model.scheduled_number_of_rewards(time)
+    n = 0
+    while n < scheduled:
+        era_time = model.contract_creation_time + n * model.REWARD_INTERVAL
+        era = model.reward_era(era_time)
+        era_end = (model.DURATION_OF_FIRST_ERA if era == 0 else
+                   model.DURATION_OF_FIRST_ERA + era * model.DURATION_OF_ERA) // model.REWARD_INTERVAL
+        count = min(era_end, scheduled) - n
+        supply += count * model.get_mining_reward_at(era_time)
+        n += count
+    return supply
+
+
+@pytest.mark.parametrize("season", seasons, ids=lambda season: season.SYMBOL)
+def test_schedule_agrees_with_model(season):
+    schedule = EmissionSchedule(season, start)
+    model = season.model(start)
+    rng = random.Random(season.TOKEN_IDENTIFIER)
+    boundaries = [season.DURATION_OF_FIRST_ERA + k * season.DURATION_OF_ERA for k in range(4)]
+    times = [start + t for t in [0, 599, 600] + boundaries + [b - 1 for b in boundaries]]
+    times += [start + rng.randrange(0, 250 * year) for _ in range(200)]
+    for time in times:
+        assert schedule.era(time) == model.reward_era(time)
+        assert schedule.scheduled_rewards(time) == model.scheduled_number_of_rewards(time)
+        assert schedule.reward(time) == model.get_mining_reward_at(time)
+        assert schedule.supply(time) == brute_force_supply(model, time)
+
+@pytest.mark.parametrize("season", seasons, ids=lambda season: season.SYMBOL)
+def test_total_supply(season):
+    schedule = EmissionSchedule(season)
+    assert schedule.total_supply == brute_force_supply(season.model(0), 300 * year)
+    assert 0 <= season.TOTAL_SUPPLY - schedule.total_supply < 10**18
+    assert schedule.supply(300 * year) == schedule.total_supply
+    assert schedule.reward(300 * year) == 0
+
+def test_array_queries_match_scalar_queries():
+    schedule = season_schedules({"SPRING": start})["SPRING"]
+    times = start + np.random.default_rng(1).integers(0, 250 * year, 1000)
+    exact = schedule.supply_at(times, exact=True)
+    approximate = schedule.supply_at(times)
+    assert list(exact) == [schedule.supply(int(time)) for time in times]
+    assert np.allclose(approximate, exact.astype(float), rtol=1e-12)
+    assert list(schedule.rewards_at(times, exact=True)) == [schedule.reward(int(time)) for time in times]
+
+def test_time_before_creation():
+    schedule = EmissionSchedule(seasons[0], start)
+    with pytest.raises(ValueError):
+        schedule.supply(start - 1)
+    with pytest.raises(ValueError):
+        schedule.supply_at([start, start - 1])
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key)
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_schedule_matches_contract(token):
+    creation_time = token.contractCreationTime()
+    first_era, era = seasons[0].DURATION_OF_FIRST_ERA, seasons[0].DURATION_OF_ERA
+    schedule = EmissionSchedule(seasons[0], creation_time)
+    for time in [0, 599, 600, first_era - 1, first_era, first_era + era, 60 * era + 1, 205 * year]:
+        time += creation_time
+        assert schedule.scheduled_rewards(time) == token._scheduledNumberOfRewards(time)
+        assert schedule.reward(time) == token._getMiningReward(time)
+        assert schedule.era(time) == token.rewardEra(time)
+    assert token.TOTAL_SUPPLY() - schedule.total_supply < 10**18
@@ -0,0 +1,93 @@
+import pytest
+from scripts import model as reference
+from scripts.fuzz import SIGNATURES, Fuzzer, fuzz_token
+from scripts.rpc import RpcError, decode_word, function_selector
+
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+
+
+class ModelNode:
+    """Answers batched eth_calls with a model standing in for the contract."""
+
+    def __init__(self, model, error=None):
+        self.model = model
+        self.error = error
+        self.calls = 0
+        self.batches = 0
+        self.names = {"0x" + function_selector(signature).hex(): name
+                      for name, signature in SIGNATURES.items()}
+
+    def eth_call(self, to, data, block="latest"):
+        return ("eth_call", [{"to": to, "data": data}, block])
+
+    def batch(self, requests, errors=False):
+        self.batches += 1
+        results = []
+        for _, (call, _) in requests:
+            self.calls += 1
+            data = bytes.fromhex(call["data"][10:])
+            args = tuple(decode_word(data[i:i + 32]) for i in range(0, len(data), 32))
+            outcome, value = reference.evaluate(
+                reference._model_function(self.model, self.names[call["data"][:10]]), *args)
+            if self.error is not None:
+                results.append(self.error)
+            elif outcome == 'revert':
+                results.append(RpcError("eth_call failed: {'code': 3, 'message': 'execution reverted'}"))
+            else:
+                results.append("0x" + value.to_bytes(32, 'big').hex())
+        return results
+
+
+class BrokenModel(reference.TestSpringTokenModel):
+
+    def reward_era(self, time):
+        # wrong by one second at the end of the first era
+        if time - self.contract_creation_time == self.DURATION_OF_FIRST_ERA - 1:
+            return 1
+        return super().reward_era(time)
+
+    def number_of_rewards_available(self, last, previous, now):
+        if previous > 1000 and now > last:
+            return 0
+        return super().number_of_rewards_available(last, previous, now)
+
+
+def make_model(model_class=reference.TestSpringTokenModel):
+    return model_class(1600000000, "0x" + "11" * 20, "0x" + "22" * 20)
+
+
+def test_matching_model_has_no_mismatches():
+    node = ModelNode(make_model())
+    result = Fuzzer(node, "0x" + "22" * 20, make_model(), batch_size=500).run(4000, seed=1)
+    assert result.cases == node.calls == 4000
+    assert node.batches == 8
+    assert result.mismatches == [] and result.shrunk == []
+
+def test_mismatches_are_shrunk():
+    node = ModelNode(make_model())
+    fuzzer = Fuzzer(node, "0x" + "22" * 20, make_model(BrokenModel))
+    result = fuzzer.run(20000, seed=2)
+    assert {mismatch.name for mismatch in result.mismatches} == {
+        '_numberOfRewardsAvailable', '_numberOfRewardsToGive'}
+    shrunk = {mismatch.name: mismatch for mismatch in result.shrunk}
+    assert shrunk['_numberOfRewardsAvailable'].args == (0, 1001, 1)
+
+    # a boundary the random inputs are unlikely to hit is shrunk from far above
+    start = 1600000000
+    era_end = start + reference.TestSpringTokenModel.DURATION_OF_FIRST_ERA - 1
+    [mismatch] = fuzzer.check([('rewardEra', (era_end,))])
+    assert fuzzer.shrink(mismatch).args == (era_end,)
+    assert mismatch.contract == ('ok', 0) and mismatch.model == ('ok', 1)
+
+def test_node_errors_are_not_reverts():
+    node = ModelNode(make_model(), RpcError("eth_call failed: {'code': -32000, 'message': 'header not found'}"))
+    with pytest.raises(RpcError):
+        Fuzzer(node, "0x" + "22" * 20, make_model()).run(10, seed=4)
+
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_contract_matches_model(deploy_test_token):
+    token = deploy_test_token(private_key)
+    result = fuzz_token(token, cases=5000, seed=3)
+    assert result.cases == 5000
+    assert result.mismatches == []
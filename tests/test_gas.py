@@ -0,0 +1,39 @@
+import pytest
+from brownie import accounts
+from scripts.gas_benchmark import SEASON_CONTRACTS, compare, load_baseline, measure
+
+
+@pytest.fixture(scope="module")
+def gas(module_isolation):
+    return measure(accounts[0], accounts[1])
+
+
+def test_batching_reduces_gas_per_reward(gas):
+    mints = gas["TestSpringToken"]
+    per_reward = [mints["mint/%d" % rewards] / rewards for rewards in range(1, 73)]
+    assert all(later < earlier for earlier, later in zip(per_reward, per_reward[1:]))
+    # the cost of a mint hardly depends on the number of rewards it pays
+    assert max(mints["mint/%d" % rewards] for rewards in range(2, 73)) \
+        - min(mints["mint/%d" % rewards] for rewards in range(2, 73)) < 1000
+
+def test_legacy_mint_costs_more(gas):
+    mints = gas["TestSpringToken"]
+    for rewards in range(1, 73):
+        assert mints["legacy_mint/%d" % rewards] > mints["mint/%d" % rewards]
+
+def test_seasons_cost_the_same(gas):
+    approvals = {(paths["safeApprove"], paths["safeApproveAndCall"])
+                 for name, paths in gas.items() if name != "TestSpringToken"}
+    assert len(approvals) == 1
+    assert len(gas) == len(SEASON_CONTRACTS) + 1
+
+def test_no_gas_regressions(gas):
+    baseline = load_baseline()
+    assert baseline is not None, "no gas baseline, run `brownie run gas_benchmark update` to record one"
+    assert compare(gas, baseline) == []
+
+def test_compare_flags_increases():
+    baseline = {"SpringToken": {"deploy": 1000, "safeApprove": 100}}
+    results = {"SpringToken": {"deploy": 1000, "safeApprove": 101, "transfer": 50}}
+    assert compare(results, baseline) == ["SpringToken safeApprove: 101 gas, baseline 100 (+1.00%)"]
+    assert compare(results, baseline, tolerance=0.02) == []
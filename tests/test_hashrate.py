@@ -0,0 +1,61 @@
+import math
+import random
+from scripts.hashrate import (HashrateEstimator, benchmark, evaluate_estimator, forecast_seasons,
+                              growing_hashpower, synthetic_history)
+from scripts.model import SpringTokenModel
+
+start = 1600000000
+
+
+def test_constant_hashrate():
+    history = synthetic_history(lambda t: 1e9, years=1, seed=0)
+    estimator = HashrateEstimator(history.initial_target, 0., window=10000)
+    for timestamp, rewards in zip(history.times.tolist(), history.rewards.tolist()):
+        estimator.observe(timestamp, rewards)
+    assert abs(estimator.hashrate / 1e9 - 1) < 0.03
+    assert len(estimator._exposures) == 10000
+    assert math.isclose(estimator._exposure, math.fsum(estimator._exposures), rel_tol=1e-12)
+    assert estimator.target == history.final_target
+
+def test_target_follows_contract():
+    model = SpringTokenModel(start)
+    estimator = HashrateEstimator.from_model(model, window=5)
+    rng = random.Random(0)
+    timestamp = start
+    for _ in range(200):
+        timestamp += rng.randrange(1, 3000)
+        digest = model.mining_target // rng.choice([1, 1, 2, 5, 80])
+        rewards = model.mint_digest("0x" + "01" * 20, digest, timestamp) // model.get_mining_reward_at(start)
+        estimator.observe(timestamp, rewards)
+        assert estimator.target == model.mining_target
+    assert estimator.max_number_of_rewards == model.max_number_of_rewards_per_mint
+
+def test_forecast():
+    estimators = {}
+    for name, hashrate in (("SPRING", 4e9), ("SUMMER", 1e9)):
+        history = synthetic_history(lambda t: hashrate, years=0.2, initial_target=2**220, seed=1)
+        estimators[name] = HashrateEstimator(history.initial_target, 0.)
+        for timestamp, rewards in zip(history.times.tolist(), history.rewards.tolist()):
+            estimators[name].observe(timestamp, rewards)
+
+    forecasts = forecast_seasons(estimators, max(e.last_reward_time for e in estimators.values()) + 1200)
+    assert list(forecasts) == ["SPRING", "SUMMER"]
+    for name, forecast in forecasts.items():
+        assert forecast.expected_interval == 2**256 / (forecast.hashrate * estimators[name].target)
+        assert 500 < forecast.expected_interval < 1200
+        assert forecast.rewards_available >= 2
+    assert math.isnan(HashrateEstimator(2**220, 0.).hashrate)
+    assert HashrateEstimator(2**220, 0.).expected_interval() == math.inf
+
+def test_tracks_growing_hashrate():
+    history = synthetic_history(growing_hashpower(growth=1.), years=4, seed=2)
+    assert history.hashpower[-1] > 30 * history.hashpower[0]
+    result = evaluate_estimator(history)
+    assert result.target_matches
+    assert result.median_error < 0.1
+    assert abs(result.bias) < 0.03
+
+def test_benchmark():
+    results = benchmark(years=0.2, shares=(0.6, 0.4))
+    assert len(results) == 2
+    assert all(result.mints_per_second > 0 for result in results)
@@ -0,0 +1,115 @@
+import random
+import pytest
+from brownie import accounts, chain, web3
+from scripts.ledger import Ledger
+from scripts.rpc import RpcClient
+
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+
+pytestmark = pytest.mark.usefixtures("fn_isolation")
+
+tokens = {"SPRING": "0x" + "aa" * 20, "SUMMER": "0x" + "bb" * 20}
+alice, bob, carol = ("0x" + byte * 20 for byte in ("01", "02", "03"))
+
+
+def event(kind, token, block, source, amount, to=None, transaction="0x00", log_index=0):
+    event = {"kind": kind, "address": tokens[token], "from": source, "blockNumber": block,
+             "logIndex": log_index, "transactionHash": transaction}
+    if kind == "Mint":
+        event["rewardAmount"] = amount
+    else:
+        event.update(to=to, tokens=amount)
+    return event
+
+
+def test_replay_and_historical_queries():
+    ledger = Ledger(tokens, checkpoint_interval=10, start_block=1)
+    ledger.apply([
+        event("Mint", "SPRING", 1, alice, 100),
+        event("Mint", "SUMMER", 1, bob, 50, log_index=1),
+        event("Transfer", "SPRING", 5, alice, 30, bob),
+        event("Approval", "SPRING", 12, bob, 20, carol),
+        event("Transfer", "SPRING", 25, bob, 15, alice, transaction="0x01"),
+        event("Transfer", "SPRING", 40, alice, 85, carol),
+    ], spenders={"0x01": carol})
+    ledger.next_block = 41
+
+    assert ledger.balance_of("SPRING", alice) == 0
+    assert ledger.balance_of("SPRING", alice, 4) == 100
+    assert ledger.balance_of("SPRING", alice, 5) == 70
+    assert ledger.balance_of("SPRING", bob, 30) == 15
+    assert ledger.balance_of("SUMMER", bob, 1) == 50
+    assert ledger.balance_of("SPRING", "0x" + "ff" * 20) == 0
+    assert ledger.allowance("SPRING", bob, carol, 11) == 0
+    assert ledger.allowance("SPRING", bob, carol, 12) == 20
+    assert ledger.allowance("SPRING", bob, carol) == 5
+    assert ledger.holders("SPRING", 30) == {alice: 85, bob: 15}
+    assert ledger.holders("SPRING") == {bob: 15, carol: 85}
+    distributions = ledger.distributions()
+    assert list(distributions["SPRING"]) == [85e-18, 15e-18]
+    assert list(distributions["SUMMER"]) == [50e-18]
+    assert len(ledger.ledgers["SPRING"].checkpoints) > 2
+    with pytest.raises(ValueError):
+        ledger.balance_of("SPRING", alice, -1)
+
+def test_checkpoints_agree_with_full_replay():
+    rng = random.Random(0)
+    holders = ["0x%040x" % i for i in range(1, 20)]
+    events, balances = [], {}
+    for block in range(1, 2000, 3):
+        source = rng.choice(holders)
+        if balances.get(source, 0) == 0:
+            events.append(event("Mint", "SPRING", block, source, 2**70 + rng.randrange(2**64)))
+            balances[source] = balances.get(source, 0) + events[-1]["rewardAmount"]
+        else:
+            to = rng.choice(holders)
+            amount = rng.randrange(balances[source] + 1)
+            events.append(event("Transfer", "SPRING", block, source, amount, to))
+            balances[source] -= amount
+            balances[to] = balances.get(to, 0) + amount
+
+    checkpointed = Ledger(tokens, checkpoint_interval=50, start_block=1)
+    checkpointed.apply(events)
+    for block in rng.sample(range(1, 2000), 40):
+        replayed = Ledger(tokens, checkpoint_interval=10**9, start_block=1)
+        replayed.apply([e for e in events if e["blockNumber"] <= block])
+        assert checkpointed.holders("SPRING", block) == replayed.holders("SPRING")
+    assert checkpointed.holders("SPRING") == {holder: b for holder, b in balances.items() if b}
+
+
+def test_ledger_matches_local_chain(deploy_test_token, mint):
+    chain_tokens = {"SPRING": deploy_test_token(private_key), "SUMMER": deploy_test_token(private_key)}
+    start_block = web3.eth.block_number
+    miner, spender, other = accounts[0], accounts[1], accounts[2]
+    blocks = []
+    for token in chain_tokens.values():
+        mint(token, miner)
+        token.transfer(other, 10**18, {'from': miner})
+        token.approve(spender, 5 * 10**18, {'from': miner})
+        token.transferFrom(miner, other, 2 * 10**18, {'from': spender})
+        blocks.append(web3.eth.block_number)
+        token.safeApprove(spender, 3 * 10**18, 4 * 10**18, {'from': miner})
+        chain.sleep(600)
+
+    # an indirect transfer: SUMMER holds SPRING tokens and is told to send them on
+    spring, summer = chain_tokens["SPRING"], chain_tokens["SUMMER"]
+    spring.transfer(summer, 10**18, {'from': miner})
+    summer.transferAnyERC20Token(spring, 10**18, {'from': accounts.at(summer.owner())})
+    blocks.append(web3.eth.block_number)
+
+    client = RpcClient(web3.provider.endpoint_uri)
+    ledger = Ledger({name: token.address for name, token in chain_tokens.items()},
+                    checkpoint_interval=3, start_block=start_block)
+    ledger.update(client, chunk_size=4)
+    assert len(ledger.indirect_transfers) == 1
+
+    for block in blocks + [None]:
+        for name, token in chain_tokens.items():
+            for account in (miner, spender, other, summer, accounts[-1]):
+                assert ledger.balance_of(name, account.address, block) == \
+                    token.balanceOf(account, block_identifier=block)
+            assert ledger.allowance(name, miner.address, spender.address, block) == \
+                token.allowance(miner, spender, block_identifier=block)
+        supply = sum(ledger.holders("SPRING", block).values())
+        assert supply == spring.tokensMinted(block_identifier=block)
+    client.close()
@@ -0,0 +1,135 @@
+import http.client
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from scripts import metrics
+from scripts.metrics import Registry
+from scripts.miner import mine
+from scripts.rpc import RpcClient, RpcError
+from scripts.simulation import simulate_mining_intervals
+
+challenge = bytes(range(32))
+address = "0x5096e62a8d3bed3ba6999ec24817ea7e50c17d14"
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield metrics.REGISTRY
+    metrics.disable()
+    metrics.reset()
+
+
+def test_recording_only_when_enabled():
+    registry = Registry()
+    counter = registry.counter("things_total", "Things")
+    timer = registry.timer("work_seconds", "Work", buckets=(0.5, 1))
+    counter.inc()
+    timer.observe(0.1)
+    with timer.time():
+        pass
+    assert counter.value == 0 and timer.count == 0
+
+    registry.enabled = True
+    counter.inc(2)
+    timer.observe(0.1)
+    timer.observe(0.7)
+    timer.observe(3)
+    with timer.time():
+        pass
+    assert counter.value == 2
+    assert timer.counts == [2, 1, 1] and timer.count == 4
+    assert registry.counter("things_total") is counter
+    with pytest.raises(ValueError):
+        registry.histogram("things_total")
+
+def test_prometheus_text():
+    registry = Registry()
+    registry.enabled = True
+    registry.counter("requests_total", "Requests", method="get").inc(3)
+    registry.counter("requests_total", "Requests", method="post").inc()
+    histogram = registry.histogram("size", "Sizes", buckets=(1, 10))
+    for value in (0.5, 5, 5, 50):
+        histogram.observe(value)
+    assert registry.prometheus() == "\n".join([
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{method="get"} 3',
+        'requests_total{method="post"} 1',
+        "# HELP size Sizes",
+        "# TYPE size histogram",
+        'size_bucket{le="1"} 1',
+        'size_bucket{le="10"} 3',
+        'size_bucket{le="+Inf"} 4',
+        "size_sum 60.5",
+        "size_count 4",
+    ]) + "\n"
+
+def test_write_and_serve(tmp_path):
+    registry = Registry()
+    registry.enabled = True
+    registry.counter("hashes_total", "Hashes").inc(10)
+    registry.write(str(tmp_path / "metrics.json"))
+    registry.write(str(tmp_path / "metrics.prom"))
+    with open(str(tmp_path / "metrics.json")) as f:
+        assert json.load(f)["metrics"] == {"hashes_total": 10}
+    assert (tmp_path / "metrics.prom").read_text() == registry.prometheus()
+
+    server = registry.serve(port=0)
+    try:
+        connection = http.client.HTTPConnection(*server.server_address)
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.read().decode() == registry.prometheus()
+        connection.request("GET", "/")
+        assert connection.getresponse().status == 404
+        connection.close()
+    finally:
+        server.shutdown()
+
+
+def test_simulation_and_miner_hooks(enabled):
+    result = simulate_mining_intervals(lambda t: 1e8, 2**240, n_chains=4, time_limit=10 * 3600, seed=0)
+    snapshot = metrics.snapshot()
+    steps = snapshot["simulation_adjust_difficulty_seconds"]["count"]
+    assert steps == result.count.max()
+    assert snapshot["simulation_intervals_total"] == 4 * steps
+
+    found = mine(challenge, address, 2**256 // 100, processes=1, batch_size=64)
+    assert metrics.counter("miner_hashes_total").value == found.hashes
+    assert metrics.counter("miner_solutions_total").value == 1
+
+
+class _Node(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        requests = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps([{"jsonrpc": "2.0", "id": request["id"], "result": "0x1"}
+                           if request["method"] == "eth_blockNumber" else
+                           {"jsonrpc": "2.0", "id": request["id"], "error": {"message": "unknown"}}
+                           for request in requests]).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_rpc_hooks(enabled):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Node)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = RpcClient("http://%s:%d" % server.server_address)
+    try:
+        assert client.call("eth_blockNumber") == "0x1"
+        results = client.batch([("eth_blockNumber", []), ("eth_foo", [])], errors=True)
+        assert isinstance(results[1], RpcError)
+    finally:
+        client.close()
+        server.shutdown()
+    assert metrics.counter("rpc_requests_total").value == 3
+    assert metrics.counter("rpc_errors_total").value == 1
+    assert metrics.timer("rpc_batch_seconds").count == 2
@@ -0,0 +1,59 @@
+import pytest
+from scripts.miner import digest_for, mine, mine_for_token, search_nonces, mining_prefix
+
+challenge = b'\xb1zV\xf9t,\x83&\x95\xad\x12\xae\xb4t\xca\x05\xa8&q}:_?\x9dy\x88\x9eL>\xeePk'
+nonce = 84870355253201280668639765531949292802255761106050507973491261481313202348862
+digest = bytes.fromhex("000001569c7ec7933fa667eca50c0e6b5c7ad4f7465bbef84c3694710d18b2ca")
+address = "0x5096e62a8d3bed3ba6999ec24817ea7e50c17d14"   # accounts.add(private_key) in the tests
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+
+
+def test_digest_matches_contract_encoding():
+    assert digest_for(challenge, address, nonce) == digest
+    assert digest_for("0x" + challenge.hex(), bytes.fromhex(address[2:]), nonce) == digest
+
+def test_search_nonces_finds_known_solution():
+    prefix = mining_prefix(challenge, address)
+    target = int.from_bytes(digest, 'big')
+    assert search_nonces(prefix, target, nonce - 10, 20) == (nonce, digest)
+    assert search_nonces(prefix, target - 1, nonce - 10, 20) is None
+
+def test_mine_finds_valid_solution():
+    target = 2**256 // 1000
+    result = mine(challenge, address, target, processes=2, batch_size=256)
+    assert result.found
+    assert result.digest == digest_for(challenge, address, result.nonce)
+    assert int.from_bytes(result.digest, 'big') <= target
+    assert result.hashes > 0 and result.hashrate > 0
+
+def test_mine_times_out_without_solution():
+    result = mine(challenge, address, 0, processes=2, batch_size=256, timeout=0.5)
+    assert not result.found
+    assert result.hashes > 0
+
+class _Token:
+
+    def getChallengeNumber(self):
+        return challenge
+
+    def getMiningTarget(self):
+        return 2**256 // 10
+
+def test_mine_for_token_below_a_lower_target():
+    target = 2**256 // 1000
+    result = mine_for_token(_Token(), address, target, processes=1, start_nonce=0, batch_size=256)
+    assert result.digest == digest_for(challenge, address, result.nonce)
+    assert int.from_bytes(result.digest, 'big') <= target
+    assert mine_for_token(_Token(), address, target, processes=1, start_nonce=0).nonce == result.nonce
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key, challenge)
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_minting_with_searched_nonce(token, accounts):
+    token.setMiningTarget(2**248)
+    result = mine_for_token(token, accounts[-1], processes=2)
+    txn = token.mint(result.nonce, result.digest)
+    assert txn.events['Mint']['rewardAmount'] >= token.INITIAL_REWARD()
+
@@ -0,0 +1,173 @@
+import asyncio
+import time
+import pytest
+from scripts import metrics, mining_controller
+from scripts.miner import MiningResult
+from scripts.mining_controller import MiningController, rpc_submitter
+from scripts.rpc import MINT_TOPIC, TOKEN_VIEWS, RpcClient, encode_call, encode_word
+
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+challenge = b'\xb1zV\xf9t,\x83&\x95\xad\x12\xae\xb4t\xca\x05\xa8&q}:_?\x9dy\x88\x9eL>\xeePk'
+nonce = 84870355253201280668639765531949292802255761106050507973491261481313202348862
+
+address = "0x5096e62a8d3bed3ba6999ec24817ea7e50c17d14"
+account = "0x66ab6d9362d4f35596279692f0251db635165871"
+HASHRATE = 1e6
+
+
+class _TokenNode:
+    """Answers the controller's requests for one token, taking `latency` seconds per round trip."""
+
+    def __init__(self, latency=0.):
+        self.latency = latency
+        self.block = 1
+        self.logs = []
+        self.views = {encode_call(signature): "0x" + encode_word(1).hex()
+                      for signature, _ in TOKEN_VIEWS.values()}
+        self.set_challenge(bytes(32))
+
+    def set_challenge(self, challenge):
+        self.views[encode_call("getChallengeNumber()")] = "0x" + challenge.hex()
+
+    def mint(self, new_challenge):
+        self.block += 1
+        self.set_challenge(new_challenge)
+        data = b"".join(map(encode_word, (1, 1, new_challenge)))
+        self.logs.append({"address": address, "topics": [MINT_TOPIC, "0x" + encode_word(account).hex()],
+                          "data": "0x" + data.hex(), "blockNumber": hex(self.block), "logIndex": "0x0",
+                          "transactionHash": "0x" + encode_word(self.block).hex()})
+
+    def eth_call(self, to, data, block="latest"):
+        return ("eth_call", [{"to": to, "data": data}, block])
+
+    def call(self, method, params=()):
+        return self.batch([(method, params)])[0]
+
+    def batch(self, requests, errors=False):
+        time.sleep(self.latency)
+        results = []
+        for method, params in requests:
+            if method == "eth_blockNumber":
+                results.append(hex(self.block))
+            elif method == "eth_getLogs":
+                results.append([log for log in self.logs
+                                if int(log["blockNumber"], 16) >= int(params[0]["fromBlock"], 16)])
+            else:
+                results.append(self.views[params[0]["data"]])
+        return results
+
+
+def _search_until_stopped(challenge, address, target, processes=None, batch_size=None, stop=None):
+    started = time.perf_counter()
+    stop.wait()
+    elapsed = time.perf_counter() - started
+    return MiningResult(None, None, int(HASHRATE * elapsed), elapsed)
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_stale_hashes_are_counted_from_seeing_the_mint(enabled, monkeypatch):
+    monkeypatch.setattr(mining_controller, "mine", _search_until_stopped)
+    node = _TokenNode(latency=0.05)
+    controller = MiningController(node, {"SPRING": address}, account, lambda *args: None,
+                                  processes=1, poll_interval=0.01)
+
+    def until():
+        if not node.logs:
+            time.sleep(0.2)
+            node.mint(challenge)
+        return len(controller.stale_work) >= 1
+
+    asyncio.run(controller.run(duration=10, until=until))
+    assert len(controller.mints) == 1 and controller.solutions == []
+    stale = metrics.counter("controller_stale_hashes_total").value
+    # reading the new state after the poll takes two round trips, and the old
+    # search ran for 0.2 s before the Mint, which mustn't be counted
+    assert HASHRATE * 2 * node.latency <= stale <= HASHRATE * controller.stale_work[0]
+    restart = metrics.timer("controller_restart_seconds")
+    assert restart.count == 1 and restart.sum == controller.stale_work[0]
+
+
+def _search_and_find(challenge, address, target, processes=None, batch_size=None, stop=None):
+    return MiningResult(nonce, bytes(32), 1, 0.001)
+
+
+def test_challenge_is_searched_again_when_the_submission_raises(monkeypatch):
+    monkeypatch.setattr(mining_controller, "mine", _search_and_find)
+    submitted = []
+
+    def submit(*args):
+        submitted.append(args)
+        if len(submitted) == 1:
+            raise RuntimeError("connection dropped")
+
+    controller = MiningController(_TokenNode(), {"SPRING": address}, account, submit,
+                                  processes=1, poll_interval=0.01)
+    asyncio.run(controller.run(duration=10, until=lambda: len(controller.solutions) >= 2))
+    assert [str(error) for error in controller.errors] == ["connection dropped"]
+    assert [solution[1] for solution in controller.solutions] == [bytes(32)] * 2
+    assert controller.submitted == {"SPRING": bytes(32)}
+
+
+def test_challenge_is_searched_again_when_no_mint_follows(monkeypatch):
+    monkeypatch.setattr(mining_controller, "mine", _search_and_find)
+    submitted = []
+    controller = MiningController(_TokenNode(), {"SPRING": address}, account,
+                                  lambda *args: submitted.append(args), processes=1, poll_interval=0.01,
+                                  submission_timeout=0.1)
+    started = time.perf_counter()
+    asyncio.run(controller.run(duration=10, until=lambda: len(submitted) >= 2))
+    assert time.perf_counter() - started > 0.1
+    assert controller.errors == []
+    assert submitted == [(address, nonce, bytes(32))] * 2
+
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key)
+
+@pytest.fixture
+def controller(token, accounts, web3):
+    endpoint = web3.provider.endpoint_uri
+    client = RpcClient(endpoint)
+    yield MiningController(client, {"SPRING": token.address}, accounts[0].address,
+                           rpc_submitter(endpoint, accounts[0].address), processes=2,
+                           poll_interval=0.1)
+    client.close()
+
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_controller_submits_solution(token, controller, accounts):
+    token.setMiningTarget(2**248)
+    asyncio.run(controller.run(duration=60, until=lambda: len(controller.mints) >= 1))
+    assert controller.errors == []
+    assert len(controller.solutions) == 1
+    assert controller.mints[0]["from"] == accounts[0].address.lower()
+    assert controller.mints[0]["newChallengeNumber"] == bytes(token.getChallengeNumber())
+    assert token.balanceOf(accounts[0]) == token.INITIAL_REWARD()
+    assert len(controller.stale_work) == 1
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_controller_restarts_search_when_another_miner_mints(token, controller, accounts):
+    token.setMiningTarget(token.MAXIMUM_TARGET())
+    minted = []
+
+    def until():
+        if not minted:
+            token.setChallengeNumber(challenge)
+            minted.append(token.mint(nonce, {'from': accounts[-1]}))
+        return len(controller.stale_work) >= 1
+
+    asyncio.run(controller.run(duration=60, until=until))
+    assert controller.mints[0]["from"] == accounts[-1].address.lower()
+    assert controller.mints[0]["transactionHash"] == minted[0].txid
+    assert controller.mints[0]["newChallengeNumber"] == bytes(token.getChallengeNumber())
+    assert controller.solutions == []
+    assert 0 < controller.stale_work[0] < 5
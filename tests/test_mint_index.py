@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from brownie import accounts, chain, web3
+from scripts.mint_index import RECORD, MintIndex
+from scripts.rpc import RpcClient
+
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+
+pytestmark = pytest.mark.usefixtures("fn_isolation")
+
+tokens = {"SPRING": "0x" + "aa" * 20, "SUMMER": "0x" + "bb" * 20}
+
+
+def event(token, miner, block, reward, log_index=0):
+    return {"address": tokens[token], "from": "0x" + miner * 20, "rewardAmount": reward,
+            "epochCount": block, "newChallengeNumber": bytes([block]) * 32,
+            "blockNumber": block, "logIndex": log_index}
+
+
+def test_append_and_query(tmp_path):
+    index = MintIndex(str(tmp_path), tokens)
+    large = 72 * 168 * 10**18
+    index.append([event("SPRING", "01", 3, large), event("SUMMER", "02", 3, 5, 1),
+                  event("SPRING", "02", 5, 7)], {3: 1000, 5: 1600}, 6)
+    index.append([event("SPRING", "01", 9, large)], {9: 2200}, 10)
+
+    assert len(index) == 4 and index.next_block == 10
+    assert index.addresses == ["0x" + "01" * 20, "0x" + "02" * 20]
+    assert list(index.rewards("SPRING")) == [large, 7, large]
+    assert index.rewards_per_miner() == {"0x" + "01" * 20: 2 * large, "0x" + "02" * 20: 12}
+    assert index.rewards_per_miner("SUMMER") == {"0x" + "02" * 20: 5}
+    assert list(index.intervals("SPRING")) == [600, 600]
+    counts, _ = index.interval_histogram("SPRING", bins=2, range=(0, 1200))
+    assert list(counts) == [0, 2]
+    assert bytes(index.records()[1]["challenge"]) == bytes([3]) * 32
+
+def test_reopen_and_discard_incomplete_writes(tmp_path):
+    index = MintIndex(str(tmp_path), tokens)
+    index.append([event("SPRING", "01", 3, 10)], {3: 1000}, 4)
+    # a record written without updating the state, as by an interrupted update
+    with open(str(tmp_path / "mints.bin"), "ab") as f:
+        f.write(np.zeros(1, dtype=RECORD).tobytes())
+
+    reopened = MintIndex(str(tmp_path))
+    assert len(reopened) == 1 and reopened.next_block == 4
+    assert (tmp_path / "mints.bin").stat().st_size == RECORD.itemsize
+    with pytest.raises(ValueError):
+        MintIndex(str(tmp_path), {"SPRING": "0x" + "cc" * 20})
+
+
+def test_index_local_chain(tmp_path, deploy_test_token, mint):
+    chain_tokens = {"SPRING": deploy_test_token(private_key), "SUMMER": deploy_test_token(private_key)}
+    client = RpcClient(web3.provider.endpoint_uri)
+    index = MintIndex(str(tmp_path), {name: token.address for name, token in chain_tokens.items()},
+                      start_block=web3.eth.block_number)
+
+    transactions = []
+    for _ in range(3):
+        for name, token in chain_tokens.items():
+            for account in accounts[:2]:
+                chain.sleep(600)
+                transactions.append((name, mint(token, account)))
+        # index in small chunks while blocks are being added
+        index.update(client, chunk_size=3)
+
+    index = MintIndex(str(tmp_path))
+    assert index.update(client) == 0
+    records = index.records()
+    assert len(records) == len(transactions)
+    for record, (name, tx) in zip(records, transactions):
+        assert record["block"] == tx.block_number
+        assert list(index.tokens)[record["token"]] == name
+        assert index.addresses[record["miner"]] == tx.sender.address.lower()
+        assert record["timestamp"] == tx.timestamp
+    for name, token in chain_tokens.items():
+        assert index.rewards_per_miner(name) == {account.address.lower(): token.balanceOf(account)
+                                                 for account in accounts[:2]}
+        assert np.all(index.intervals(name) > 0)
+    client.close()
@@ -0,0 +1,144 @@
+import random
+import pytest
+from scripts import model as reference
+from scripts.model import Revert, SpringTokenModel, ZERO_ADDRESS
+
+challenge = b'\xb1zV\xf9t,\x83&\x95\xad\x12\xae\xb4t\xca\x05\xa8&q}:_?\x9dy\x88\x9eL>\xeePk'
+nonce = 84870355253201280668639765531949292802255761106050507973491261481313202348862
+digest = bytes.fromhex("000001569c7ec7933fa667eca50c0e6b5c7ad4f7465bbef84c3694710d18b2ca")
+miner = "0x5096e62a8d3bed3ba6999ec24817ea7e50c17d14"
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+other = "0x" + "11" * 20
+
+year = 365 * 24 * 60 * 60
+first_era = year * 3 // 4
+era = 3 * year
+start = 1600000000
+
+@pytest.fixture
+def model():
+    model = reference.TestSpringTokenModel(start, address="0x" + "22" * 20)
+    model.set_challenge_number(int.from_bytes(challenge, 'big'))
+    model.set_mining_target(model.MAXIMUM_TARGET)
+    return model
+
+
+def test_digest(model):
+    assert model.digest(miner, nonce) == int.from_bytes(digest, 'big')
+
+def test_minting(model):
+    assert model.mint_legacy(miner, nonce, int.from_bytes(digest, 'big'), start + 1) == model.INITIAL_REWARD
+    assert model.balance_of(miner) == model.total_supply() == model.INITIAL_REWARD
+    assert model.challenge_number == model.INITIAL_REWARD ^ model.TOKEN_IDENTIFIER
+    assert model.last_reward_block_time == start + 1
+
+def test_revert_zero_reward(model):
+    model.mint(miner, nonce, start + 205 * year)
+    model.set_challenge_number(int.from_bytes(challenge, 'big'))
+    with pytest.raises(Revert, match="Reward has reached zero"):
+        model.mint(miner, nonce, start + 205 * year)
+
+def test_revert_digest_above_mining_target(model):
+    model.set_mining_target(2**205)
+    with pytest.raises(Revert, match="Digest is larger than mining target"):
+        model.mint(miner, nonce, start + 1)
+
+def test_reverted_mint_leaves_state_unchanged(model):
+    # target * 100 overflows in _adjustDifficulty after the rewards are computed
+    model.set_mining_target(2**250)
+    before = vars(model).copy(), dict(model.balances)
+    with pytest.raises(Revert, match="Integer overflow"):
+        model.mint(miner, nonce, start + 600)
+    assert (vars(model), model.balances) == before
+    assert model.balance_of(miner) == model.total_supply() == 0
+
+def test_mining_reward_halving(model):
+    reward = model.INITIAL_REWARD
+    assert model.get_mining_reward_at(start + first_era - 1) == reward
+    assert model.get_mining_reward_at(start + first_era) == reward // 2
+    assert model.get_mining_reward_at(start + first_era + era) == reward // 4
+    assert model.get_mining_reward_at(start + 205 * year) == 0
+    with pytest.raises(Revert):
+        model.get_mining_reward_at(start + 800 * year)
+    with pytest.raises(Revert):
+        model.reward_era(start - 1)
+
+def test_number_of_rewards_available(model):
+    last = start + 1
+    assert model.number_of_rewards_available(last, 1, last + 1199) == 1
+    assert model.number_of_rewards_available(last, 1, last + 1200) == 2
+    assert model.number_of_rewards_available(last, 3, last + 1) == 3
+    assert model.number_of_rewards_available(last, 5, last + 2400) == 5
+    assert model.number_of_rewards_available(last, 300, last) == 72
+    assert model.number_of_rewards_to_give(10, start, 11, start + 11 * 600) == 10
+
+def test_get_reward_amount_for_achieving_target(model):
+    target = model.mining_target
+    reward = model.INITIAL_REWARD
+    assert model.get_reward_amount_for_achieving_target(target // 2, start + 2 * 600) == 2 * reward
+    model.set_max_number_of_rewards(3)
+    assert model.get_reward_amount_for_achieving_target(target // 3, start + 2 * 600) == 3 * reward
+    with pytest.raises(Revert):
+        model.get_reward_amount_for_achieving_target(0, start)
+
+def test_adjust_difficulty(model):
+    assert model.adjust_difficulty(2**233, start, 1, start + 300) == (2**233 * 99) // 100
+    assert model.adjust_difficulty(model.MINIMUM_TARGET, start, 1, start + 300) == model.MINIMUM_TARGET
+    assert model.adjust_difficulty(2**233, start, 1, start + 900) == (2**233 * 100) // 99
+    assert SpringTokenModel(start).adjust_difficulty(2**17, start, 1, start + 300) == (2**17 * 99) // 100
+    with pytest.raises(Revert):
+        model.adjust_difficulty(2**255, start, 1, start + 900)
+
+def test_transfers_and_allowances(model):
+    model.mint(miner, nonce, start + 1)
+    model.transfer(miner, other, 10)
+    assert model.balance_of(other) == 10
+    model.transfer(miner, model.address, 1)
+    with pytest.raises(Revert):
+        model.transfer(miner, ZERO_ADDRESS, 1)
+    with pytest.raises(Revert):
+        model.transfer(other, miner, 11)
+    with pytest.raises(Revert, match="Invalid address"):
+        model.approve(miner, model.address, 10)
+    model.safe_approve(miner, other, 0, 10)
+    with pytest.raises(Revert, match="Current spender allowance does not match specified value"):
+        model.safe_approve(miner, other, 1, 10)
+    balance = model.balance_of(miner)
+    with pytest.raises(Revert):
+        model.transfer_from(other, miner, other, 11)
+    assert model.balance_of(miner) == balance
+    model.transfer_from(other, miner, other, 10)
+    assert model.allowance(miner, other) == 0
+    assert model.balance_of(other) == 20
+
+def test_mint_with_random_digests_conserves_supply():
+    model = SpringTokenModel(start)
+    rng = random.Random(1)
+    now = start
+    for _ in range(10000):
+        now += rng.randrange(1, 1500)
+        model.mint_digest(miner, rng.randrange(1, model.mining_target + 1), now)
+    assert model.tokens_minted == model.balance_of(miner)
+    assert model.MINIMUM_TARGET <= model.mining_target <= model.MAXIMUM_TARGET
+    assert model.tokens_minted <= model.TOTAL_SUPPLY
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key, challenge, reference.TestSpringTokenModel.MAXIMUM_TARGET)
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_model_matches_contract(token):
+    assert reference.differential_check(token, samples=20, seed=1) == []
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_model_matches_contract_after_minting(token, accounts, chain):
+    model = reference.TestSpringTokenModel.from_contract(token)
+    txn = token.mint(nonce)
+    blockhash = int(chain[txn.block_number - 1].hash.hex(), 16)
+    assert model.mint(accounts[-1], nonce, txn.timestamp, blockhash) == txn.events['Mint']['rewardAmount']
+    assert model.challenge_number == int(token.getChallengeNumber().hex(), 16)
+    assert model.mining_target == token.getMiningTarget()
+    assert model.last_reward_block_time == token.lastRewardBlockTime()
+    assert model.max_number_of_rewards_per_mint == token.maxNumberOfRewardsPerMint()
+    assert model.balance_of(accounts[-1]) == token.balanceOf(accounts[-1])
+
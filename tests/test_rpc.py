@@ -0,0 +1,63 @@
+import pytest
+from brownie import (AutumnToken, SpringToken, SummerToken, WinterToken,
+                     accounts, web3)
+from scripts.rpc import RpcClient, TokenStateReader, decode_word, encode_call
+
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+challenge = b'\xb1zV\xf9t,\x83&\x95\xad\x12\xae\xb4t\xca\x05\xa8&q}:_?\x9dy\x88\x9eL>\xeePk'
+nonce = 84870355253201280668639765531949292802255761106050507973491261481313202348862
+
+
+@pytest.fixture
+def client():
+    client = RpcClient(web3.provider.endpoint_uri)
+    yield client
+    client.close()
+
+pytestmark = pytest.mark.usefixtures("fn_isolation")
+
+@pytest.fixture(scope="module")
+def seasonal_tokens(module_isolation, accounts):
+    return {contract._name: accounts[0].deploy(contract)
+            for contract in (SpringToken, SummerToken, AutumnToken, WinterToken)}
+
+
+def test_single_call(client, seasonal_tokens):
+    token = seasonal_tokens["SpringToken"]
+    result = client.call("eth_call", [{"to": token.address, "data": encode_call("getMiningTarget()")},
+                                      "latest"])
+    assert decode_word(result) == token.getMiningTarget()
+
+def test_read_all_seasons_in_one_batch(client, seasonal_tokens, accounts):
+    tokens = {name: token.address for name, token in seasonal_tokens.items()}
+    reader = TokenStateReader(client, tokens, holders=[accounts[0], accounts[1]])
+    block_number, states = reader.read()
+    assert block_number == web3.eth.block_number
+    for name, token in seasonal_tokens.items():
+        state = states[name]
+        assert state.miningTarget == token.getMiningTarget()
+        assert state.challengeNumber == bytes(token.getChallengeNumber())
+        assert state.miningReward == token.getMiningReward()
+        assert state.lastRewardBlockTime == token.lastRewardBlockTime()
+        assert state.maxNumberOfRewardsPerMint == token.maxNumberOfRewardsPerMint()
+        assert state.tokensMinted == token.tokensMinted() == 0
+        assert state.balances[accounts[0]] == 0
+
+def test_results_cached_by_block(client, deploy_test_token, accounts):
+    token = deploy_test_token(private_key, challenge, 2**234)
+    reader = TokenStateReader(client, {"SPRING": token.address}, holders=[accounts[-1]])
+    block_before, states_before = reader.read()
+    assert reader.read() == (block_before, states_before)
+
+    token.mint(nonce)
+    block_after, states_after = reader.read()
+    assert block_after > block_before
+    assert states_after["SPRING"].tokensMinted == token.INITIAL_REWARD()
+    assert states_after["SPRING"].balances[accounts[-1]] == token.INITIAL_REWARD()
+    assert states_after["SPRING"].challengeNumber != challenge
+
+    _, historical = reader.read(block_before)
+    assert historical is states_before
+    reader._cache.clear()
+    _, historical = reader.read(block_before)
+    assert historical["SPRING"].tokensMinted == 0
@@ -0,0 +1,63 @@
+import pytest
+from scripts.rpc import RpcClient, RpcError
+
+
+class _DroppedConnection:
+
+    def __init__(self, attempts):
+        self.attempts = attempts
+
+    def request(self, *args):
+        self.attempts.append(args)
+        raise ConnectionResetError
+
+    def close(self):
+        pass
+
+def test_only_read_only_batches_are_sent_again():
+    client = RpcClient("http://127.0.0.1:8545")
+    attempts = []
+    client._connect = lambda: _DroppedConnection(attempts)
+    with pytest.raises(ConnectionError):
+        client.call("eth_blockNumber")
+    assert len(attempts) == 2
+
+    attempts.clear()
+    with pytest.raises(ConnectionError):
+        client.batch([("eth_blockNumber", []), ("eth_sendRawTransaction", ["0x00"])])
+    assert len(attempts) == 1
+
+class _Response:
+
+    def __init__(self, status, reason, body):
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+    def read(self):
+        return self.body
+
+class _Proxy:
+
+    def __init__(self, response):
+        self.response = response
+
+    def request(self, *args):
+        pass
+
+    def getresponse(self):
+        return self.response
+
+    def close(self):
+        pass
+
+@pytest.mark.parametrize("status, reason, body", [
+    (502, "Bad Gateway", b"<html><body>502 Bad Gateway</body></html>"),
+    (200, "OK", b'[{"jsonrpc": "2.0", "id": 1, "res'),
+    (200, "OK", b""),
+])
+def test_answers_that_are_not_json_raise_rpc_error(status, reason, body):
+    client = RpcClient("http://127.0.0.1:8545")
+    client._connect = lambda: _Proxy(_Response(status, reason, body))
+    with pytest.raises(RpcError, match="HTTP %d" % status):
+        client.call("eth_blockNumber")
@@ -0,0 +1,94 @@
+import random
+import numpy as np
+import pytest
+from scripts.model import Revert, SpringTokenModel
+from scripts.scheduler import SubmissionScheduler, benchmark
+
+start = 1600000000
+
+
+def make_model(max_number_of_rewards=3):
+    model = SpringTokenModel(start, "0x" + "11" * 20, "0x" + "22" * 20)
+    model.mining_target = 2**234
+    model.last_reward_block_time = start + 10 * 600
+    model.max_number_of_rewards_per_mint = max_number_of_rewards
+    return model
+
+
+def test_rewards_agree_with_model():
+    model = make_model()
+    scheduler = SubmissionScheduler.from_model(model, 10**9)
+    rng = random.Random(0)
+    target = model.mining_target
+    digests = [target // k for k in (1, 2, 3, 71, 72, 73, 1000)] + [target // k + 1 for k in (1, 2, 72)]
+    digests += [rng.randrange(1, 2 * target) for _ in range(200)]
+    times = [model.last_reward_block_time + rng.randrange(0, 100 * 600) for _ in digests]
+
+    result = scheduler.evaluate(digests, times, model.last_reward_block_time)
+    for digest, time, rewards, amount in zip(digests, times, result["rewards"], result["amount"]):
+        if digest > target:
+            assert rewards == 0
+            continue
+        expected = model.number_of_rewards_to_give(target // digest, model.last_reward_block_time,
+                                                   model.max_number_of_rewards_per_mint, time)
+        assert rewards == expected
+        assert amount == float(expected * model.get_mining_reward())
+
+
+def test_zero_digest_is_rejected():
+    model = make_model()
+    scheduler = SubmissionScheduler.from_model(model, 10**9)
+    time = model.last_reward_block_time + 100 * 600
+    with pytest.raises(Revert):
+        model.mint_digest("0x" + "33" * 20, 0, time)
+    result = scheduler.evaluate([0, model.mining_target // 2], [time, time], time)
+    assert list(result["rewards"]) == [0, 2]
+    assert result["score"][0] == 0 and scheduler.best([0], [time], time) is None
+
+def test_waiting_for_more_rewards():
+    model = make_model(max_number_of_rewards=1)
+    scheduler = SubmissionScheduler.from_model(model, 10**9)
+    digest = model.mining_target // 50
+    times = model.last_reward_block_time + np.array([0, 600, 10 * 600, 60 * 600])
+    assert scheduler.best([digest] * 4, times, times[0]) == 3
+
+    # with competition, waiting ten hours for 49 more rewards is not worth it
+    competing = SubmissionScheduler.from_model(model, 10**9, network_hashrate=2**256 / model.mining_target)
+    assert competing.best([digest] * 4, times, times[0]) == 0
+
+
+def test_score_does_not_depend_on_the_batch():
+    model = make_model(max_number_of_rewards=1)
+    scheduler = SubmissionScheduler.from_model(model, 10**9, network_hashrate=2**256 / model.mining_target)
+    now = model.last_reward_block_time + 600
+    digest, later = model.mining_target // 10, now + 5 * 600
+    alone = scheduler.evaluate([digest], [later], now)["score"][0]
+    with_earlier = scheduler.evaluate([digest, digest], [later, now], now)["score"][0]
+    assert alone == with_earlier
+    assert alone < scheduler.evaluate([digest], [now], now)["score"][0]
+
+
+def test_unprofitable_candidates_are_rejected():
+    model = make_model()
+    digests = [model.mining_target // 2, 2 * model.mining_target]
+    times = [model.last_reward_block_time] * 2
+
+    cheap = SubmissionScheduler.from_model(model, 10**9, token_price=10**-3)
+    assert cheap.best(digests, times, times[0]) == 0
+    assert cheap.evaluate(digests, times, times[0])["score"][1] == 0
+
+    expensive = SubmissionScheduler.from_model(model, 10**15, token_price=10**-3)
+    assert expensive.best(digests, times, times[0]) is None
+
+
+def test_gas_includes_max_update():
+    model = make_model(max_number_of_rewards=3)
+    scheduler = SubmissionScheduler.from_model(model, 10**9)
+    digests = [model.mining_target // 3, model.mining_target // 2]
+    gas = scheduler.evaluate(digests, [model.last_reward_block_time] * 2,
+                         model.last_reward_block_time)["gas"]
+    assert gas[1] - gas[0] == scheduler.gas_per_max_update
+
+
+def test_benchmark():
+    assert benchmark(candidates=20000, batch_size=10000) > 0
@@ -1,5 +1,6 @@
 import pytest
 from brownie import TestSpringToken, accounts, chain, reverts, ZERO_ADDRESS
+from scripts import model as reference
 
 private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
 challenge = b'\xb1zV\xf9t,\x83&\x95\xad\x12\xae\xb4t\xca\x05\xa8&q}:_?\x9dy\x88\x9eL>\xeePk'
@@ -17,14 +18,11 @@ initial_reward = 168 * 10**18
 rewards_in_first_era = first_era // reward_interval
 rewards_per_era = era // reward_interval
 
-@pytest.fixture
-def token(accounts, chain):
-    accounts.add(private_key)
-    token = accounts[-1].deploy(TestSpringToken)
-    token.setChallengeNumber(challenge)
-    token.setMiningTarget(token.MAXIMUM_TARGET())
-    chain.sleep(1)
-    return token
+pytestmark = pytest.mark.usefixtures("fn_isolation")
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key, challenge, reference.TestSpringTokenModel.MAXIMUM_TARGET)
 
 def test_name(token):
     assert token.name() == "Spring Token"
@@ -273,8 +271,9 @@ def test_challenge_number_changes(token):
 
 
 
-@pytest.fixture
-def token_with_balance(token):
+@pytest.fixture(scope="module")
+def token_with_balance(deploy_test_token):
+    token = deploy_test_token(private_key, challenge, reference.TestSpringTokenModel.MAXIMUM_TARGET)
     token.mint(nonce)
     return token
 
@@ -316,10 +315,12 @@ def test_revert_safe_approve(token_with_balance, accounts):
 
 
 
-@pytest.fixture
-def token_with_allowance(token_with_balance, accounts):
-    token_with_balance.approve(accounts[0], 10)
-    return token_with_balance
+@pytest.fixture(scope="module")
+def token_with_allowance(deploy_test_token, accounts):
+    token = deploy_test_token(private_key, challenge, reference.TestSpringTokenModel.MAXIMUM_TARGET)
+    token.mint(nonce)
+    token.approve(accounts[0], 10)
+    return token
 
 
 def test_transferFrom(token_with_allowance, accounts):
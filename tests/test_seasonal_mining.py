@@ -1,7 +1,7 @@
 import pytest
 from brownie import TestSpringToken, accounts, chain, reverts, ZERO_ADDRESS
-from math import log, sin, exp
-from random import random
+from numpy import sin, exp
+from scripts.montecarlo import run_replicates
 
 private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
 challenge = b'\xb1zV\xf9t,\x83&\x95\xad\x12\xae\xb4t\xca\x05\xa8&q}:_?\x9dy\x88\x9eL>\xeePk'
@@ -17,30 +17,13 @@ MINIMUM_TARGET = 2**16
 
 time_limit = 2 * year
 
-@pytest.fixture
-def token(accounts, chain):
-    accounts.add(private_key)
-    token = accounts[-1].deploy(TestSpringToken)
-    token.setChallengeNumber(challenge)
-    token.setMiningTarget(token.MAXIMUM_TARGET() // 2**10)
-    chain.sleep(1)
-    return token
-
-def _adjustDifficulty(_miningTarget, _lastRewardBlockTime, rewardsGivenNow, t):
-    timeSinceLastReward = t - _lastRewardBlockTime
-    if (timeSinceLastReward * 88 < rewardsGivenNow * reward_interval * 61):
-        _miningTarget = (_miningTarget * 99) // 100
-
-    elif (timeSinceLastReward * 88 > rewardsGivenNow * reward_interval * 61):
-        _miningTarget = (_miningTarget * 100) // 99
-        
-    if (_miningTarget < MINIMUM_TARGET):
-        _miningTarget = MINIMUM_TARGET
-    
-    if (_miningTarget > MAXIMUM_TARGET):
-        _miningTarget = MAXIMUM_TARGET
-
-    return _miningTarget
+replicates = 16
+
+pytestmark = pytest.mark.usefixtures("fn_isolation")
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key, challenge, MAXIMUM_TARGET // 2**10)
 
 def constant_hashpower(t):
     return 1e8
@@ -54,38 +37,30 @@ def increasing_hashpower(t):
 def decreasing_hashpower(t):
     return constant_hashpower(t) * exp(-0.1 * t / year)
 
-def interval(rate):
-    return -log(random()) / rate
-
-def get_mining_intervals(token, hashpower_function):
-    mining_target =  token.getMiningTarget()
-    t, intervals  = 0, []
-    while t < time_limit:
-        rate = hashpower_function(t) * mining_target / 2**256
-        intervals.append(interval(rate))
-        mining_target = _adjustDifficulty(mining_target, t , 1, t+intervals[-1])
-        t += intervals[-1]
-    return intervals
+def get_mean_interval(token, hashpower_function, seed=0):
+    result = run_replicates(hashpower_function, token.getMiningTarget(), replicates,
+                            time_limit=time_limit, seed=seed)
+    return result.mean_interval
 
 
 def test_mean_interval_equals_ten_minutes_constant_hashpower(token, chain):
-    intervals = get_mining_intervals(token, constant_hashpower)
-    assert abs((sum(intervals) / len(intervals)) / 600. - 1) < .015
+    mean = get_mean_interval(token, constant_hashpower)
+    assert abs(mean / 600. - 1) < .015
 
 
 def test_mean_interval_equals_ten_minutes_monthly_oscillating_hashpower(token, chain):
-    intervals = get_mining_intervals(token, monthly_oscillating_hashpower)
-    assert abs((sum(intervals) / len(intervals)) / 600. - 1) < .015
+    mean = get_mean_interval(token, monthly_oscillating_hashpower)
+    assert abs(mean / 600. - 1) < .015
 
 
 def test_mean_interval_equals_ten_minutes_increasing_hashpower(token, chain):
-    intervals = get_mining_intervals(token, increasing_hashpower)
-    assert abs((sum(intervals) / len(intervals)) / 600. - 1) < .015
+    mean = get_mean_interval(token, increasing_hashpower)
+    assert abs(mean / 600. - 1) < .015
 
 
 def test_mean_interval_equals_ten_minutes_decreasing_hashpower(token, chain):
-    intervals = get_mining_intervals(token, decreasing_hashpower)
-    assert abs((sum(intervals) / len(intervals)) / 600. - 1) < .015
+    mean = get_mean_interval(token, decreasing_hashpower)
+    assert abs(mean / 600. - 1) < .015
 
 
 def weekly_oscillating_hashpower(t):
@@ -99,13 +74,13 @@ def hourly_oscillating_hashpower(t):
 
 
 def test_mean_interval_exceeds_ten_minutes_weekly_oscillating_hashpower(token, chain):
-    intervals = get_mining_intervals(token, weekly_oscillating_hashpower)
-    assert (sum(intervals) / len(intervals)) / 600. - 1 > 0
+    mean = get_mean_interval(token, weekly_oscillating_hashpower)
+    assert mean / 600. - 1 > 0
 
 def test_mean_interval_exceeds_ten_minutes_daily_oscillating_hashpower(token, chain):
-    intervals = get_mining_intervals(token, daily_oscillating_hashpower)
-    assert (sum(intervals) / len(intervals)) / 600. - 1 > 0
+    mean = get_mean_interval(token, daily_oscillating_hashpower)
+    assert mean / 600. - 1 > 0
 
 def test_mean_interval_exceeds_ten_minutes_hourly_oscillating_hashpower(token, chain):
-    intervals = get_mining_intervals(token, hourly_oscillating_hashpower)
-    assert (sum(intervals) / len(intervals)) / 600. - 1 > 0
+    mean = get_mean_interval(token, hourly_oscillating_hashpower)
+    assert mean / 600. - 1 > 0
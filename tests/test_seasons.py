@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from scripts.seasons import emission_curves, load_seasons, main, read_constants, simulate_seasons, CONTRACTS_DIRECTORY
+from scripts.simulation import GAS_PER_MINT, YEAR
+
+seasons = load_seasons()
+
+
+def test_constants_read_from_sources():
+    assert [season.SYMBOL for season in seasons] == ["SPRING", "SUMMER", "AUTUMN", "WINTER"]
+    assert [season.TOKEN_IDENTIFIER for season in seasons] == [1, 2, 3, 4]
+    assert [season.INITIAL_REWARD // 10**18 for season in seasons] == [168, 140, 120, 105]
+    assert [season.DURATION_OF_FIRST_ERA * 4 // YEAR for season in seasons] == [3, 6, 9, 12]
+
+def test_test_contract_constants():
+    constants = read_constants(CONTRACTS_DIRECTORY + "/TestSpringToken.sol")
+    assert constants["MINIMUM_TARGET"] == (2**233 * 9) // 13
+
+def test_seasons_differ_only_in_documented_constants():
+    spring = seasons[0].constants
+    for season in seasons[1:]:
+        differences = {name for name in spring if spring[name] != season.constants[name]}
+        assert differences == {"SYMBOL", "NAME", "TOKEN_IDENTIFIER", "INITIAL_REWARD",
+                               "DURATION_OF_FIRST_ERA"}
+
+@pytest.mark.parametrize("season", seasons, ids=lambda season: season.SYMBOL)
+def test_season_matches_header(season):
+    assert season.validate() == []
+
+@pytest.mark.parametrize("season", seasons, ids=lambda season: season.SYMBOL)
+def test_season_model(season):
+    model = season.model(0)
+    assert model.INITIAL_REWARD == season.INITIAL_REWARD
+    assert model.get_mining_reward_at(season.DURATION_OF_FIRST_ERA) == season.INITIAL_REWARD // 2
+    assert model.challenge_number == season.TOKEN_IDENTIFIER
+
+def test_emission_curves():
+    times = np.array([0, 599, 600, YEAR, 200 * YEAR])
+    reward, supply = emission_curves(seasons, times)
+    assert reward.shape == supply.shape == (4, 5)
+    assert list(reward[:, 0]) == [168, 140, 120, 105]
+    assert list(supply[:, 1]) == [0, 0, 0, 0]
+    assert list(supply[:, 2]) == [168, 140, 120, 105]
+    assert supply[0, 3] == 39420 * 168 + (52560 - 39420) * 84
+    assert np.allclose(supply[:, 4], 33112800)
+    # the contract halves the reward in wei, with integer division
+    assert reward[0, 4] == (168 * 10**18 // 2**67) / 10**18
+
+def test_main_prints_supply_and_reward(capsys):
+    main()
+    lines = capsys.readouterr().out.splitlines()
+    reward = lines[lines.index("Tokens per reward") + 2:]
+    assert [float(value) for value in reward[0].split()] == [0, 168, 140, 120, 105]
+    assert [float(value) for value in reward[1].split()] == [1, 84, 140, 120, 105]
+
+def test_simulate_seasons():
+    # a mint costs 300 tokens of gas, paid by 2 Spring rewards but 3 of the others
+    target = seasons[0].MAXIMUM_TARGET // 2**19
+    result = simulate_seasons(seasons, lambda t: 2**256 / target / 600, lambda t: 300e18 / GAS_PER_MINT,
+                              replicates=2, time_limit=YEAR // 50, seed=12)
+    assert result.mints.shape == result.rewards.shape == (4, 2)
+    assert (result.mints > 0).all()
+    assert (result.rewards_per_mint[0] >= 2).all()
+    assert (result.rewards_per_mint[1:] >= 3).all()
+    assert result.rewards_per_mint[0].mean() < result.rewards_per_mint[1:].mean()
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from scripts.montecarlo import run_replicates, student_t_quantile
+from scripts.simulation import (DifficultySimulation, DURATION_OF_ERA, DURATION_OF_FIRST_ERA,
+                                GAS_PER_MINT, INITIAL_REWARD, MAXIMUM_TARGET, MINIMUM_TARGET,
+                                YEAR, adjust_difficulty, from_limbs, mining_reward,
+                                number_of_rewards_available, simulate_batched_mining,
+                                simulate_mining_intervals, to_limbs)
+
+private_key = "0x06e14480eed909feb302ebe7a38075c438fff376d570bdb8ee01b92782804d99"
+
+
+@pytest.fixture(scope="module")
+def token(deploy_test_token):
+    return deploy_test_token(private_key)
+
+
+def test_limbs_round_trip():
+    values = [0, 1, MINIMUM_TARGET, 2**200 + 12345, MAXIMUM_TARGET, MAXIMUM_TARGET * 100]
+    assert from_limbs(to_limbs(values)) == values
+
+def test_vectorized_adjustment_matches_scalar():
+    initial_targets = [MAXIMUM_TARGET, MINIMUM_TARGET + 5, 2**200 + 12345, 3 * 2**100]
+    simulation = DifficultySimulation(initial_targets, len(initial_targets), seed=1)
+    rng = np.random.default_rng(2)
+    for i in range(2000):
+        current_time = simulation.last_reward_time + rng.uniform(0, 1000, 4)
+        rewards = rng.integers(1, 73, 4)
+        expected = [adjust_difficulty(target, last, n, now) for target, last, n, now
+                    in zip(simulation.targets, simulation.last_reward_time, rewards, current_time)]
+        simulation.adjust_difficulty(current_time, rewards)
+        assert simulation.targets == expected
+
+def test_masked_adjustment_leaves_other_chains_unchanged():
+    simulation = DifficultySimulation(2**200, 2)
+    simulation.adjust_difficulty(np.array([100., 100.]), mask=np.array([True, False]))
+    assert simulation.targets == [(2**200 * 99) // 100, 2**200]
+    assert list(simulation.last_reward_time) == [100., 0.]
+
+def test_targets_clamped_per_chain():
+    simulation = DifficultySimulation([MAXIMUM_TARGET, 2**100], 2,
+                                      minimum_target=[MINIMUM_TARGET, 2**100])
+    simulation.adjust_difficulty(np.array([10**6, 1.]))
+    assert simulation.targets == [MAXIMUM_TARGET, 2**100]
+
+def test_recorded_intervals_match_statistics():
+    result = simulate_mining_intervals(lambda t: 1e8, 2**224, n_chains=3,
+                                       time_limit=YEAR // 100, seed=4, record_intervals=True)
+    for chain, intervals in enumerate(result.intervals):
+        assert len(intervals) == result.count[chain]
+        assert abs(intervals.sum() - result.total[chain]) < 1e-6 * result.total[chain]
+        assert intervals[:-1].sum() < YEAR // 100 <= intervals.sum()
+
+def test_simulation_is_reproducible():
+    first = simulate_mining_intervals(lambda t: 1e8, 2**224, 2, YEAR // 100, seed=5)
+    second = simulate_mining_intervals(lambda t: 1e8, 2**224, 2, YEAR // 100, seed=5)
+    assert list(first.total) == list(second.total)
+
+def test_mean_interval_equals_ten_minutes_many_chains():
+    equilibrium_target = 2**256 // (10**8 * 600)
+    result = simulate_mining_intervals(lambda t: 1e8, equilibrium_target, n_chains=20,
+                                       time_limit=YEAR // 4, seed=6)
+    assert abs(result.total.sum() / result.count.sum() / 600. - 1) < .015
+
+def constant_hashpower(t):
+    return 1e8
+
+def test_replicates_reproducible_across_process_counts():
+    target = 2**256 // (10**8 * 600)
+    serial = run_replicates(constant_hashpower, target, 10, YEAR // 100, seed=7, processes=1)
+    parallel = run_replicates(constant_hashpower, target, 10, YEAR // 100, seed=7, processes=2)
+    assert list(serial.mean_intervals) == list(parallel.mean_intervals)
+    assert serial.replicates == 10
+
+def test_student_t_quantile():
+    for confidence, degrees_of_freedom, expected in [(.95, 1, 12.706), (.95, 2, 4.303), (.95, 15, 2.131),
+                                                     (.99, 9, 3.250), (.95, 1000, 1.962)]:
+        assert abs(student_t_quantile(confidence, degrees_of_freedom) - expected) < 1e-3
+
+def test_replicate_confidence_interval_contains_ten_minutes():
+    target = 2**256 // (10**8 * 600)
+    result = run_replicates(constant_hashpower, target, 16, YEAR // 20, seed=8)
+    low, high = result.confidence_interval
+    assert low < result.mean_interval < high
+    assert 0.97 * 600 < low and high < 1.03 * 600
+
+def test_mining_reward_halving():
+    times = [0, DURATION_OF_FIRST_ERA - 1, DURATION_OF_FIRST_ERA,
+             DURATION_OF_FIRST_ERA + DURATION_OF_ERA]
+    assert list(mining_reward(times)) == [INITIAL_REWARD, INITIAL_REWARD, INITIAL_REWARD / 2,
+                                          INITIAL_REWARD / 4]
+
+def test_number_of_rewards_available():
+    assert number_of_rewards_available(1, 1, 1200) == 1
+    assert number_of_rewards_available(1, 1, 1201) == 2
+    assert number_of_rewards_available(1, 3, 1201) == 3
+    assert number_of_rewards_available(1, 300, 1) == 72
+    assert number_of_rewards_available(1, 1, 1 + 600 * 100) == 72
+
+def test_batched_mining_without_gas_submits_every_solution():
+    target = 2**256 // (10**8 * 600)
+    result = simulate_batched_mining(lambda t: 1e8, lambda t: 0., target, n_chains=4,
+                                     time_limit=YEAR // 50, seed=9)
+    assert list(result.solutions) == list(result.mints)
+    assert (result.rewards >= result.mints).all()
+
+def test_batched_mining_waits_for_enough_rewards_to_pay_for_gas():
+    target = 2**256 // (10**8 * 600)
+    gas_price = 5 * INITIAL_REWARD / GAS_PER_MINT   # five rewards per mint
+    result = simulate_batched_mining(lambda t: 1e8, lambda t: gas_price, target, n_chains=4,
+                                     time_limit=YEAR // 50, seed=10)
+    assert (result.mints > 0).all()
+    assert (result.rewards_per_mint >= 5).all()
+    assert (result.gas_per_reward <= GAS_PER_MINT / 5).all()
+    assert (result.solutions > result.mints).all()
+
+def test_batched_mining_stops_when_gas_exceeds_maximum_reward():
+    target = 2**256 // (10**8 * 600)
+    gas_price = 73 * INITIAL_REWARD / GAS_PER_MINT
+    result = simulate_batched_mining(lambda t: 1e8, lambda t: gas_price, target,
+                                     time_limit=YEAR // 100, seed=11)
+    assert result.mints[0] == 0
+
+@pytest.mark.usefixtures("fn_isolation")
+def test_adjust_difficulty_matches_contract(token):
+    start = token.contractCreationTime()
+    for target in [2**233, token.MINIMUM_TARGET() + 1, token.MAXIMUM_TARGET() - 1]:
+        for rewards in [1, 2, 72]:
+            for elapsed in [0, 300, 415 * rewards, 416 * rewards, 1200, 10**6]:
+                expected = token._adjustDifficulty(target, start, rewards, start + elapsed)
+                assert adjust_difficulty(target, start, rewards, start + elapsed,
+                                         token.MINIMUM_TARGET(),
+                                         token.MAXIMUM_TARGET()) == expected